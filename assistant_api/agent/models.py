@@ -4,24 +4,34 @@ import sqlite3
 from datetime import datetime
 from typing import Optional
 
+from ..db import connect
+
 DB_PATH = os.environ.get("RAG_DB", "./data/rag.sqlite")
 
 
+_SCHEMA_READY: set = set()
+
+
 def _con():
-    con = sqlite3.connect(DB_PATH)
-    con.execute(
-        """CREATE TABLE IF NOT EXISTS agent_jobs(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        run_id TEXT, task TEXT, status TEXT, started_at TEXT, finished_at TEXT,
-        meta TEXT
-    )"""
-    )
-    con.execute(
-        """CREATE TABLE IF NOT EXISTS agent_events(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        run_id TEXT, ts TEXT, level TEXT, event TEXT, data TEXT
-    )"""
-    )
+    # Pooled RAG_DB connection; agent tables are created once per DB file.
+    con = connect()
+    key = getattr(con, "pool_key", None)
+    if key is None or key not in _SCHEMA_READY:
+        con.execute(
+            """CREATE TABLE IF NOT EXISTS agent_jobs(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT, task TEXT, status TEXT, started_at TEXT, finished_at TEXT,
+            meta TEXT
+        )"""
+        )
+        con.execute(
+            """CREATE TABLE IF NOT EXISTS agent_events(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT, ts TEXT, level TEXT, event TEXT, data TEXT
+        )"""
+        )
+        if key is not None:
+            _SCHEMA_READY.add(key)
     return con
 
 
@@ -5,7 +5,7 @@ from urllib.parse import urlparse
 
 from fastapi import APIRouter, Request
 
-from .db import get_conn
+from . import analytics_labels as lbl
 from .metrics_analytics import (
     agent_feedback,
     agent_requests,
@@ -25,6 +25,8 @@ from .metrics_analytics import (
     sessions_started,
     web_vitals_lcp,
 )
+from .services.analytics_events import get_sink as get_events_sink
+from .services.analytics_events import row as events_row
 from .settings import ANALYTICS_ENABLED, ANALYTICS_PERSIST, ANALYTICS_RESPECT_DNT
 
 try:
@@ -126,14 +128,18 @@ async def collect(req: Request):
     theme = (data.get("theme") or "")[:16]
     path = (data.get("path") or "/")[:256]
     region = req.headers.get("CF-IPCountry", "ZZ")[:4]
+    # Prometheus labels are normalized so client input can't grow /metrics;
+    # the raw values above are only persisted.
+    path_group = _bucket_path(path)
 
     if et == "page_view":
-        page_views.labels(
-            path=path,
-            ref_host=ref_host,
+        lbl.track(
+            page_views,
+            path=path_group,
+            ref_host=lbl.ref_hosts(lbl.host(ref_host), default="direct"),
             device=device,
-            theme=theme,
-            region=region,
+            theme=lbl.choice(theme, lbl.THEMES, "unknown"),
+            region=lbl.region(region),
             ua_is_bot=bot,
         ).inc()
         # Day-of-week / hour-of-day bucketing in configured timezone
@@ -143,7 +149,6 @@ async def collect(req: Request):
             hour = f"{dt.hour:02d}"  # 00..23
             page_view_by_dow_hour.labels(dow=dow, hour=hour).inc()
             # Path group bucketing
-            path_group = _bucket_path(path)
             page_view_by_dow_hour_path.labels(
                 dow=dow, hour=hour, path_group=path_group
             ).inc()
@@ -160,36 +165,42 @@ async def collect(req: Request):
         except Exception:
             pass
     elif et == "scroll_depth":
-        percent = str(int(data.get("percent", 0)))
-        scroll_depth.labels(path=path, percent=percent).inc()
+        percent = lbl.scroll_percent(data.get("percent", 0))
+        lbl.track(scroll_depth, path=path_group, percent=percent).inc()
     elif et == "project_click":
-        project_clicks.labels(project_id=(data.get("project_id") or "unknown")).inc()
+        project_id = lbl.project_ids(data.get("project_id"))
+        lbl.track(project_clicks, project_id=project_id).inc()
     elif et == "project_hover":
-        project_hovers.labels(project_id=(data.get("project_id") or "unknown")).inc()
+        project_id = lbl.project_ids(data.get("project_id"))
+        lbl.track(project_hovers, project_id=project_id).inc()
     elif et == "project_expand":
-        project_expands.labels(project_id=(data.get("project_id") or "unknown")).inc()
+        project_id = lbl.project_ids(data.get("project_id"))
+        lbl.track(project_expands, project_id=project_id).inc()
     elif et == "project_video_play":
-        project_plays.labels(project_id=(data.get("project_id") or "unknown")).inc()
+        project_id = lbl.project_ids(data.get("project_id"))
+        lbl.track(project_plays, project_id=project_id).inc()
     elif et == "agent_request":
-        agent_requests.labels(
-            intent=(data.get("intent") or "unknown"),
-            project_id=(data.get("project_id") or "unknown"),
+        lbl.track(
+            agent_requests,
+            intent=lbl.intents(data.get("intent")),
+            project_id=lbl.project_ids(data.get("project_id")),
         ).inc()
     elif et == "agent_feedback":
-        agent_feedback.labels(
-            sentiment=(data.get("sentiment") or "neutral"),
-            intent=(data.get("intent") or "unknown"),
+        lbl.track(
+            agent_feedback,
+            sentiment=lbl.choice(data.get("sentiment"), lbl.SENTIMENTS, "neutral"),
+            intent=lbl.intents(data.get("intent")),
         ).inc()
     elif et == "frontend_error":
-        frontend_errors.labels(source=(data.get("source") or "unknown")).inc()
+        lbl.track(frontend_errors, source=lbl.error_sources(data.get("source"))).inc()
     elif et == "click_bin":
-        x = str(int(data.get("x", 0)))
-        y = str(int(data.get("y", 0)))
-        click_bins.labels(x_bin=x, y_bin=y, path=path).inc()
+        x = lbl.bin_index(data.get("x", 0))
+        y = lbl.bin_index(data.get("y", 0))
+        lbl.track(click_bins, x_bin=x, y_bin=y, path=path_group).inc()
     elif et == "web_vitals":
         if data.get("name") == "LCP":
             try:
-                web_vitals_lcp.labels(path=path).observe(
+                lbl.track(web_vitals_lcp, path=path_group).observe(
                     float(data.get("value", 0)) / 1000.0
                 )
             except Exception:
@@ -205,38 +216,25 @@ async def collect(req: Request):
             netloc = ""
         if kind not in ("github", "artstation", "resume"):
             kind = "other"
-        link_clicks.labels(kind=kind, href_domain=(netloc or "unknown")).inc()
+        href_domain = lbl.link_hosts(lbl.host(netloc))
+        lbl.track(link_clicks, kind=kind, href_domain=href_domain).inc()
 
     if ANALYTICS_PERSIST and data.get("persist"):
-        con = get_conn()
-        with con:
-            con.execute(
-                """
-                CREATE TABLE IF NOT EXISTS events(
-                  id INTEGER PRIMARY KEY,
-                  ts REAL NOT NULL,
-                  type TEXT NOT NULL,
-                  path TEXT, ref_host TEXT, project_id TEXT, intent TEXT,
-                  seconds REAL, ua_bot INTEGER, device TEXT, theme TEXT, region TEXT
-                )
-                """
-            )
-            con.execute(
-                """INSERT INTO events(ts,type,path,ref_host,project_id,intent,seconds,ua_bot,device,theme,region)
-                           VALUES(?,?,?,?,?,?,?,?,?,?,?)""",
-                (
-                    ts,
-                    et,
-                    path,
-                    ref_host,
-                    data.get("project_id"),
-                    data.get("intent"),
-                    float(data.get("seconds") or 0),
-                    1 if bot == "1" else 0,
-                    device,
-                    theme,
-                    region,
-                ),
+        # write-behind: queued here, flushed in batches by a background task
+        get_events_sink().submit(
+            events_row(
+                ts,
+                type=et,
+                path=path,
+                ref_host=ref_host,
+                project_id=data.get("project_id"),
+                intent=data.get("intent"),
+                seconds=float(data.get("seconds") or 0),
+                ua_bot=1 if bot == "1" else 0,
+                device=device,
+                theme=theme,
+                region=region,
             )
+        )
 
     return {"ok": True}
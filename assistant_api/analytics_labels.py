@@ -0,0 +1,135 @@
+"""Label normalization for the /analytics/collect Prometheus metrics.
+
+Every label value that originates from the client passes through here so each
+metric has a bounded number of series: paths map to ``_bucket_path`` groups,
+free-form ids/hosts go through a bounded registry with an ``other`` overflow
+bucket, and numeric bins are clamped. ``track`` keeps the per-metric series
+count behind the ``analytics_label_series`` gauge.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+
+from .metrics_analytics import label_series
+
+OTHER = "other"
+_SAFE = re.compile(r"[^a-z0-9_.:-]+")
+
+
+def _env_list(name: str) -> list[str]:
+    return [v.strip().lower() for v in os.getenv(name, "").split(",") if v.strip()]
+
+
+def clean(value, default: str = "unknown", limit: int = 64) -> str:
+    """Lowercase and strip anything outside [a-z0-9_.:-]."""
+    v = _SAFE.sub("-", str(value or "").strip().lower()).strip("-")[:limit]
+    return v or default
+
+
+class BoundedLabels:
+    """Admits at most ``limit`` distinct values; later ones map to ``other``.
+
+    Values in ``allow`` always pass and do not use up slots. With
+    ``strict=True`` only allowlisted values pass. Admission is first-come, so
+    the series that already exist in /metrics never change label.
+    """
+
+    def __init__(self, limit: int, allow=(), strict: bool = False):
+        self.limit = limit
+        self.allow = {clean(v) for v in allow}
+        self.strict = strict and bool(self.allow)
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value, default: str = "unknown") -> str:
+        v = clean(value, default)
+        if v in self.allow or v == default:
+            return v
+        if not self.strict:
+            with self._lock:
+                if v in self._seen:
+                    return v
+                if len(self._seen) < self.limit:
+                    self._seen.add(v)
+                    return v
+        return OTHER
+
+
+project_ids = BoundedLabels(
+    int(os.getenv("ANALYTICS_PROJECT_TOPN", "50")),
+    _env_list("ANALYTICS_PROJECT_IDS"),
+    strict=bool(_env_list("ANALYTICS_PROJECT_IDS")),
+)
+ref_hosts = BoundedLabels(int(os.getenv("ANALYTICS_REF_HOST_TOPN", "50")), ["direct"])
+link_hosts = BoundedLabels(int(os.getenv("ANALYTICS_LINK_HOST_TOPN", "50")))
+intents = BoundedLabels(int(os.getenv("ANALYTICS_INTENT_TOPN", "20")))
+error_sources = BoundedLabels(int(os.getenv("ANALYTICS_ERROR_SOURCE_TOPN", "20")))
+
+CLICK_BINS = max(1, int(os.getenv("ANALYTICS_CLICK_BINS", "20")))
+THEMES = ("light", "dark", "system")
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+def host(value) -> str:
+    """Hostname part of a referrer/host value (no port, no userinfo)."""
+    v = str(value or "").strip().lower()
+    if "//" in v:
+        v = v.split("//", 1)[1]
+    v = v.split("/", 1)[0].rsplit("@", 1)[-1].split(":", 1)[0]
+    return v
+
+
+def bin_index(value, bins: int = CLICK_BINS) -> str:
+    try:
+        i = int(float(value))
+    except Exception:
+        i = 0
+    return str(min(max(i, 0), bins - 1))
+
+
+def scroll_percent(value) -> str:
+    """Round down to a 25% step in 0..100."""
+    try:
+        p = int(float(value))
+    except Exception:
+        p = 0
+    return str(min(max(p, 0), 100) // 25 * 25)
+
+
+def choice(value, allowed, default: str) -> str:
+    v = clean(value, default)
+    return v if v in allowed else default
+
+
+def region(value) -> str:
+    v = str(value or "").strip().upper()
+    return v if len(v) == 2 and v.isalpha() else "ZZ"
+
+
+_series: dict[str, set[tuple]] = {}
+_series_lock = threading.Lock()
+
+
+def _sample_name(metric) -> str:
+    fam = metric.describe()[0]
+    return fam.name + "_total" if fam.type == "counter" else fam.name
+
+
+def track(metric, **labels):
+    """``metric.labels(**labels)`` that also counts distinct series per metric."""
+    name = _sample_name(metric)
+    key = tuple(sorted(labels.items()))
+    with _series_lock:
+        seen = _series.setdefault(name, set())
+        if key not in seen:
+            seen.add(key)
+            label_series.labels(metric=name).set(len(seen))
+    return metric.labels(**labels)
+
+
+def series_counts() -> dict[str, int]:
+    with _series_lock:
+        return {k: len(v) for k, v in _series.items()}
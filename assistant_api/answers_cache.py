@@ -0,0 +1,186 @@
+"""Maintenance for the RAG ``answers_cache`` table.
+
+``rag_query`` reads and writes through ``get``/``put``. Rows older than
+``ANSWERS_CACHE_TTL_S`` are treated as misses (and deleted) at read time, and
+hits refresh ``last_hit_at``. ``compact`` drops expired rows and evicts the
+least recently hit beyond ``ANSWERS_CACHE_MAX_ROWS`` / ``ANSWERS_CACHE_MAX_BYTES``;
+lifespan runs it every ``ANSWERS_CACHE_COMPACT_S``. ``invalidate`` is the hook
+every ingest/build_index path calls; it also clears the /chat answer cache.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+ANSWERS_CACHE_TTL_S = float(os.getenv("ANSWERS_CACHE_TTL_S", "86400"))
+ANSWERS_CACHE_MAX_ROWS = int(os.getenv("ANSWERS_CACHE_MAX_ROWS", "5000"))
+ANSWERS_CACHE_MAX_BYTES = int(os.getenv("ANSWERS_CACHE_MAX_BYTES", "0"))  # 0 = off
+ANSWERS_CACHE_COMPACT_S = float(os.getenv("ANSWERS_CACHE_COMPACT_S", "600"))
+# Hot keys only rewrite last_hit_at once per window (keeps reads mostly read-only)
+_HIT_RESOLUTION_S = 60.0
+
+_lock = threading.Lock()
+_stats: Counter = Counter()
+_last: dict[str, Any] = {}
+
+
+def _bump(key: str, n: int = 1) -> None:
+    with _lock:
+        _stats[key] += n
+
+
+def get(con: sqlite3.Connection, pj: str, h: str, now: float | None = None):
+    now = time.time() if now is None else now
+    row = con.execute(
+        "SELECT answer, CAST(strftime('%s', created_at) AS REAL), last_hit_at"
+        " FROM answers_cache WHERE project_id=? AND query_hash=?",
+        (pj, h),
+    ).fetchone()
+    if not row:
+        _bump("misses")
+        return None
+    answer, created, last_hit = row
+    if ANSWERS_CACHE_TTL_S > 0 and created is not None:
+        if now - created > ANSWERS_CACHE_TTL_S:
+            with con:
+                con.execute("DELETE FROM answers_cache WHERE query_hash=?", (h,))
+            _bump("expired")
+            _bump("misses")
+            return None
+    if last_hit is None or now - last_hit >= _HIT_RESOLUTION_S:
+        with con:
+            con.execute(
+                "UPDATE answers_cache SET last_hit_at=? WHERE query_hash=?", (now, h)
+            )
+    _bump("hits")
+    return json.loads(answer)
+
+
+def put(
+    con: sqlite3.Connection, pj: str, h: str, ans: dict, now: float | None = None
+) -> None:
+    now = time.time() if now is None else now
+    with con:
+        con.execute(
+            "REPLACE INTO answers_cache(project_id, query_hash, answer, created_at, last_hit_at)"
+            " VALUES (?, ?, ?, datetime(?, 'unixepoch'), ?)",
+            (pj, h, json.dumps(ans), int(now), now),
+        )
+    _bump("stores")
+
+
+def _delete(con: sqlite3.Connection, where: str, args: tuple = ()) -> int:
+    return con.execute(f"DELETE FROM answers_cache {where}", args).rowcount
+
+
+def compact(con: sqlite3.Connection | None = None, now: float | None = None) -> dict:
+    """Drop expired rows, then evict least recently hit rows over the caps."""
+    from .db import connect
+
+    own = con is None
+    con = connect() if own else con
+    t0 = time.perf_counter()
+    now = time.time() if now is None else now
+    try:
+        with con:
+            expired = 0
+            if ANSWERS_CACHE_TTL_S > 0:
+                expired = _delete(
+                    con,
+                    "WHERE CAST(strftime('%s', created_at) AS INTEGER) < ?",
+                    (int(now - ANSWERS_CACHE_TTL_S),),
+                )
+            evicted = 0
+            if ANSWERS_CACHE_MAX_ROWS > 0:
+                evicted += _delete(
+                    con,
+                    "WHERE query_hash IN (SELECT query_hash FROM answers_cache"
+                    " ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?)",
+                    (ANSWERS_CACHE_MAX_ROWS,),
+                )
+            if ANSWERS_CACHE_MAX_BYTES > 0:
+                evicted += _delete(
+                    con,
+                    "WHERE query_hash IN (SELECT query_hash FROM ("
+                    " SELECT query_hash, SUM(length(answer)) OVER ("
+                    "  ORDER BY last_hit_at DESC, query_hash) AS running"
+                    " FROM answers_cache) WHERE running > ?)",
+                    (ANSWERS_CACHE_MAX_BYTES,),
+                )
+        rows, size = con.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(answer)), 0) FROM answers_cache"
+        ).fetchone()
+    finally:
+        if own:
+            con.close()
+    _bump("expired", expired)
+    _bump("evicted", evicted)
+    _bump("compactions")
+    res = {
+        "rows": rows,
+        "bytes": size,
+        "expired": expired,
+        "evicted": evicted,
+        "ms": round((time.perf_counter() - t0) * 1000.0, 2),
+    }
+    with _lock:
+        _last.update(res, at=now)
+    return res
+
+
+def invalidate(
+    project_id: str | None = None, con: sqlite3.Connection | None = None
+) -> int:
+    """Drop cached answers touching ``project_id`` (plus unscoped queries), or
+    all of them; the /chat answer cache follows the same rule."""
+    from .db import connect
+
+    own = con is None
+    n = 0
+    try:
+        con = connect() if own else con
+        if not con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='answers_cache'"
+        ).fetchone():
+            n = 0
+        elif project_id is None:
+            n = _delete(con, "")
+        else:
+            n = _delete(
+                con,
+                "WHERE project_id = '' OR project_id IS NULL"
+                " OR ',' || project_id || ',' LIKE '%,' || ? || ',%'",
+                (project_id,),
+            )
+        if own:
+            con.commit()
+    except Exception as e:
+        print(f"[answers_cache] invalidate failed: {e}")
+    finally:
+        if own and con is not None:
+            con.close()
+    _bump("invalidated", n)
+    try:
+        from .chat_cache import invalidate as chat_invalidate
+
+        chat_invalidate(project_id)
+    except Exception:
+        pass
+    return n
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "ttl_s": ANSWERS_CACHE_TTL_S,
+            "max_rows": ANSWERS_CACHE_MAX_ROWS,
+            "max_bytes": ANSWERS_CACHE_MAX_BYTES,
+            "last_compaction": dict(_last) or None,
+        }
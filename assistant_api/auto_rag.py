@@ -4,8 +4,12 @@ import re
 import httpx
 
 from .db import connect, index_dim, search
-from .rag_query import embed_query_matching_dim
+from .metrics import timer
+from .rag_query import QueryIn, embed_query_matching_dim, retrieve
 
+# Retrieval runs in-process by default. RAG_MODE=http opts into POSTing to RAG_URL
+# for split deployments where the RAG index lives in a separate service.
+RAG_MODE = os.getenv("RAG_MODE", "inproc").strip().lower()
 # Default to the backend service URL in containerized/prod; allow override via env.
 # Local dev keeps using 127.0.0.1:8001 when RAG_URL is set by tasks.
 RAG_URL = os.getenv("RAG_URL", "http://backend:8000/api/rag/query")
@@ -24,21 +28,33 @@ def needs_repo_context(user_text: str) -> bool:
     return any(re.search(p, t) for p in PROJECT_HINTS) or ("repo" in t) or ("code" in t)
 
 
-async def fetch_context(question: str, k=6):
-    # Try HTTP first (works in prod/compose), else fall back to in-process search.
-    try:
+async def _fetch_http(question: str, k: int) -> list[dict]:
+    with timer("retrieval", "http"):
         async with httpx.AsyncClient(timeout=10) as client:
             r = await client.post(RAG_URL, json={"question": question, "k": k})
             r.raise_for_status()
             return (r.json() or {}).get("matches", [])[:k]
+
+
+async def fetch_context(question: str, k=6):
+    # Primary path: in-process retrieval service (or HTTP when RAG_MODE=http).
+    try:
+        if RAG_MODE == "http":
+            matches = await _fetch_http(question, k)
+        else:
+            res = await retrieve(QueryIn(question=question, k=k))
+            matches = (res or {}).get("matches", [])[:k]
+        return matches
     except Exception:
         pass
+    # Last resort: brute-force vector search over stored embeddings.
     conn = None
     try:
         conn = connect()
         dim = index_dim(conn)
         qv, _mode = await embed_query_matching_dim(question, dim)
-        hits = search(conn, qv, k=k)
+        with timer("retrieval", "bruteforce"):
+            hits = search(conn, qv, k=k)
         # Shape to match external API: include snippet
         out = []
         for h in hits:
@@ -0,0 +1,327 @@
+"""Response cache for single-turn /chat questions.
+
+Answers are scoped by ``(route, project_id, model, context)`` and looked up by
+the normalized question text first, then by cosine similarity among entries of
+the same scope, so "What is LedgerMind?" and "what is ledgermind" share one
+generation. Question vectors come from the query embedder the router and the
+FAQ branch share (``faq.embed_query``: local model first, then OpenAI;
+``CHAT_CACHE_MIN_SIM``), so a routed question is not embedded twice; they are
+cached per normalized question and the module-level ``get``/``put`` compute
+them in a worker thread, off the event loop. When no embedder is available a
+hashed token/trigram bag stands in;
+being purely lexical it needs ``CHAT_CACHE_LEXICAL_MIN_SIM``. Either way a
+semantic match must share the question's negations and entity-like tokens, so
+"Is X open source?" never answers "Is X not open source?".
+Entries expire after ``CHAT_CACHE_TTL_S`` and the least recently hit are
+evicted beyond ``CHAT_CACHE_MAX``. Ingest calls ``invalidate(project_id)``.
+Disabled by default under pytest/TEST_MODE; set ``CHAT_CACHE_ENABLED=1`` to
+force it on.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from .metrics import answer_cache as _counters
+from .metrics import answer_cache_snapshot
+from .util.testmode import is_test_mode
+
+CHAT_CACHE_MAX = int(os.getenv("CHAT_CACHE_MAX", "1000"))
+CHAT_CACHE_TTL_S = float(os.getenv("CHAT_CACHE_TTL_S", "3600"))
+CHAT_CACHE_MIN_SIM = float(os.getenv("CHAT_CACHE_MIN_SIM", "0.92"))
+CHAT_CACHE_LEXICAL_MIN_SIM = float(os.getenv("CHAT_CACHE_LEXICAL_MIN_SIM", "0.97"))
+_DIM = 512
+# After an embedder failure, use the lexical vectors for this long
+_EMBED_RETRY_S = 60.0
+
+# Response fields that describe this request rather than the answer
+_VOLATILE = ("backends", "memory_preview", "scope", "guardrails", "cache")
+
+_WORD = re.compile(r"[^\w\s]+", re.UNICODE)
+_TOKEN = re.compile(r"[\w'’]+", re.UNICODE)
+_NEGATIONS = frozenset(
+    "not no never nor none nothing nobody neither without cannot".split()
+)
+
+_embed_down_until = 0.0
+
+
+def enabled() -> bool:
+    default = "0" if is_test_mode() else "1"
+    return os.getenv("CHAT_CACHE_ENABLED", default).lower() in ("1", "true", "yes")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD.sub(" ", (text or "").lower()).split())
+
+
+def embed(norm: str) -> np.ndarray:
+    """Hashed bag of tokens plus character trigrams, L2-normalized."""
+    vec = np.zeros(_DIM, dtype=np.float32)
+    for tok in norm.split():
+        padded = f" {tok} "
+        grams = [tok] + [padded[i : i + 3] for i in range(len(padded) - 2)]
+        for g in grams:
+            d = hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest()
+            vec[int.from_bytes(d, "big") % _DIM] += 1.0
+    n = float(np.linalg.norm(vec))
+    return vec / n if n else vec
+
+
+def embed_question(question: str) -> tuple[np.ndarray, str]:
+    """``(vector, "model")`` from the query embedder, or ``(embed(norm),
+    "lexical")`` when it is unavailable. Blocking: keep it off the loop."""
+    global _embed_down_until
+    if time.monotonic() >= _embed_down_until:
+        try:
+            from .faq import embed_query
+
+            v = np.asarray(embed_query(question), dtype=np.float32).ravel()
+            if float(np.linalg.norm(v)):
+                return v, "model"
+        except Exception as e:
+            _embed_down_until = time.monotonic() + _EMBED_RETRY_S
+            print(f"[chat_cache] embedder unavailable, using lexical match: {e}")
+    return embed(normalize(question)), "lexical"
+
+
+def marks(question: str) -> frozenset[str]:
+    """Negations and entity-like tokens (capitalized past the first word,
+    mixed case, or with digits) a semantic match has to share."""
+    out = set()
+    for i, tok in enumerate(_TOKEN.findall(question or "")):
+        low = tok.lower()
+        if low in _NEGATIONS or low.endswith(("n't", "n’t")):
+            out.add("not")
+        elif len(tok) > 1 and (
+            (i and tok[0].isupper())
+            or tok[1:] != tok[1:].lower()
+            or any(c.isdigit() for c in tok)
+        ):
+            out.add(low)
+    return frozenset(out)
+
+
+def scope_key(route: str | None, project_id: str | None, model: str, context: Any):
+    ctx = ""
+    if context:
+        ctx = hashlib.sha1(repr(context).encode("utf-8")).hexdigest()[:12]
+    return (route or "chitchat", project_id or "", model, ctx)
+
+
+@dataclass
+class _Entry:
+    scope: tuple
+    norm: str
+    vec: np.ndarray
+    embedder: str  # "model" | "lexical"
+    marks: frozenset
+    payload: dict
+    tag: str
+    gen_ms: float
+    created: float
+
+
+@dataclass
+class Hit:
+    payload: dict
+    tag: str
+    kind: str  # "exact" | "semantic"
+    similarity: float
+    saved_ms: float
+
+
+class ChatAnswerCache:
+    def __init__(
+        self,
+        max_entries: int = CHAT_CACHE_MAX,
+        ttl_s: float = CHAT_CACHE_TTL_S,
+        min_sim: float = CHAT_CACHE_MIN_SIM,
+        lexical_min_sim: float = CHAT_CACHE_LEXICAL_MIN_SIM,
+        embedder=embed_question,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.min_sim = min_sim
+        self.lexical_min_sim = max(min_sim, lexical_min_sim)
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._vecs: OrderedDict[str, tuple[np.ndarray, str]] = OrderedDict()
+
+    def _expired(self, e: _Entry, now: float) -> bool:
+        return now - e.created > self.ttl_s
+
+    def _drop(self, key: tuple, reason: str) -> None:
+        del self._entries[key]
+        _counters[reason] += 1
+
+    def _needs_vec(self, scope: tuple | None, norm: str) -> bool:
+        with self._lock:
+            if self.min_sim > 1.0 or not norm or norm in self._vecs:
+                return False
+            e = self._entries.get((scope, norm)) if scope is not None else None
+            return e is None or self._expired(e, time.monotonic())
+
+    def _embed(self, norm: str, question: str) -> tuple[np.ndarray, str]:
+        # Called outside the lock: the embedder may be a model or an API call
+        with self._lock:
+            got = self._vecs.get(norm)
+            if got is not None:
+                self._vecs.move_to_end(norm)
+                return got
+        got = self.embedder(question)
+        with self._lock:
+            self._vecs[norm] = got
+            while len(self._vecs) > self.max_entries:
+                self._vecs.popitem(last=False)
+        return got
+
+    async def warm(self, scope: tuple | None, question: str) -> None:
+        """Embed ``question`` in a worker thread so the following ``get``/``put``
+        find its vector cached; skipped for exact hits in ``scope``."""
+        norm = normalize(question)
+        if self._needs_vec(scope, norm):
+            await asyncio.to_thread(self._embed, norm, question)
+
+    def _hit(self, e: _Entry, kind: str, sim: float) -> Hit:
+        self._entries.move_to_end((e.scope, e.norm))
+        _counters[f"hits_{kind}"] += 1
+        _counters["saved_ms"] += int(e.gen_ms)
+        return Hit(copy.deepcopy(e.payload), e.tag, kind, sim, e.gen_ms)
+
+    def get(self, scope: tuple, question: str) -> Hit | None:
+        norm = normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            e = self._entries.get((scope, norm))
+            if e is not None and self._expired(e, now):
+                self._drop((scope, norm), "expired")
+                e = None
+            if e is not None:
+                return self._hit(e, "exact", 1.0)
+            if self.min_sim > 1.0 or not norm:
+                _counters["misses"] += 1
+                return None
+        vec, embedder = self._embed(norm, question)
+        with self._lock:
+            e, sim = self._nearest(scope, vec, embedder, marks(question), now)
+            if e is None:
+                _counters["misses"] += 1
+                return None
+            return self._hit(e, "semantic", sim)
+
+    def _nearest(
+        self, scope: tuple, q: np.ndarray, embedder: str, mk: frozenset, now: float
+    ):
+        cands = []
+        for key, e in list(self._entries.items()):
+            if key[0] != scope:
+                continue
+            if self._expired(e, now):
+                self._drop(key, "expired")
+                continue
+            if e.embedder == embedder and e.marks == mk and e.vec.shape == q.shape:
+                cands.append(e)
+        if not cands:
+            return None, 0.0
+        sims = np.stack([e.vec for e in cands]) @ q
+        i = int(np.argmax(sims))
+        floor = self.min_sim if embedder == "model" else self.lexical_min_sim
+        if float(sims[i]) < floor:
+            return None, 0.0
+        return cands[i], float(sims[i])
+
+    def put(
+        self, scope: tuple, question: str, payload: dict, tag: str, gen_ms: float
+    ) -> None:
+        norm = normalize(question)
+        if not norm:
+            return
+        body = {k: v for k, v in payload.items() if k not in _VOLATILE}
+        if self.min_sim <= 1.0:
+            vec, embedder = self._embed(norm, question)
+        else:  # semantic tier off: exact lookups only
+            vec, embedder = np.zeros(0, dtype=np.float32), "none"
+        now = time.monotonic()
+        entry = _Entry(
+            scope,
+            norm,
+            vec,
+            embedder,
+            marks(question),
+            copy.deepcopy(body),
+            tag,
+            gen_ms,
+            now,
+        )
+        with self._lock:
+            self._entries[(scope, norm)] = entry
+            self._entries.move_to_end((scope, norm))
+            _counters["stores"] += 1
+            for key, e in list(self._entries.items()):
+                if self._expired(e, now):
+                    self._drop(key, "expired")
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "evicted")
+
+    def invalidate(self, project_id: str | None = None) -> int:
+        """Drop entries for ``project_id`` plus unscoped ones (their retrieval
+        context may include that project); everything when no id is given."""
+        with self._lock:
+            keys = [
+                k
+                for k in self._entries
+                if project_id is None or k[0][1] in (project_id, "")
+            ]
+            for k in keys:
+                del self._entries[k]
+            _counters["invalidated"] += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self._entries)
+        return {
+            "enabled": enabled(),
+            "entries": n,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "min_sim": self.min_sim,
+            "lexical_min_sim": self.lexical_min_sim,
+            **answer_cache_snapshot(),
+        }
+
+
+_cache = ChatAnswerCache()
+
+
+async def get(scope: tuple, question: str) -> Hit | None:
+    await _cache.warm(scope, question)
+    return _cache.get(scope, question)
+
+
+async def put(
+    scope: tuple, question: str, payload: dict, tag: str, gen_ms: float
+) -> None:
+    await _cache.warm(None, question)
+    _cache.put(scope, question, payload, tag, gen_ms)
+
+
+def invalidate(project_id: str | None = None) -> int:
+    return _cache.invalidate(project_id)
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -27,6 +27,11 @@ def main() -> None:
         "vacuum-analyze", help="Run VACUUM and ANALYZE; print table/index counts"
     )
 
+    abc = sub.add_parser(
+        "ab-compact", help="Truncate old raw A/B events (counts stay in ab_daily)"
+    )
+    abc.add_argument("--keep-days", type=int, default=7, help="Raw days to keep")
+
     args = ap.parse_args()
     if args.cmd == "ingest":
         path = pathlib.Path(args.path)
@@ -86,6 +91,14 @@ def main() -> None:
             print("objects:", len(tbls))
         finally:
             con.close()
+    elif args.cmd == "ab-compact":
+        from .services.ab_store import compact
+
+        res = compact(keep_days=args.keep_days)
+        print(
+            f"ab-compact: ok kept={res['kept']} dropped={res['dropped']} "
+            f"cutoff={res['cutoff']}"
+        )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import json
 import os
 import sqlite3
+import threading
 import time
 from collections.abc import Generator
 from pathlib import Path
@@ -55,125 +56,353 @@ def _configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
     return conn
 
 
-def connect(retries: int = 5, base_sleep: float = 0.2) -> sqlite3.Connection:
-    """Connect to the SQLite DB with retry/backoff when the file is locked."""
-    attempt = 0
-    while True:
+RAG_POOL_SIZE = int(os.getenv("RAG_POOL_SIZE", "8"))
+RAG_STMT_CACHE = int(os.getenv("RAG_STMT_CACHE", "256"))
+
+
+class RagConnection(sqlite3.Connection):
+    """sqlite3.Connection carrying per-connection caches (e.g. schema probes).
+
+    close() hands the connection back to the process pool instead of closing it,
+    so existing ``con = connect() ... con.close()`` call sites get reuse for free.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.schema_cache: dict[str, set[str]] = {}
+        self.pool_key: tuple | None = None
+        self.pool_state = "out"  # out | idle | closed
+
+    def close(self):
+        if self.pool_state == "idle":
+            return  # double close of a pooled connection
+        if self.pool_state == "out" and _POOL.release(self):
+            return
+        self.pool_state = "closed"
+        super().close()
+
+
+def _file_key(db_path: str) -> tuple | None:
+    """Identity of the DB file; changes when the file is deleted/recreated."""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return (os.path.abspath(db_path), st.st_dev, st.st_ino)
+
+
+class _ConnPool:
+    """LIFO pool of idle RagConnections for the current RAG_DB file.
+
+    Connections are handed out exclusively (never shared concurrently) and can
+    cross threads (check_same_thread=False), so it works for sync handlers in the
+    threadpool and async handlers on the loop alike. Schema bootstrap runs once per
+    DB file per process instead of on every connect().
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle: list[RagConnection] = []
+        self._key: tuple | None = None
+        self._bootstrapped: set[tuple] = set()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "returned": 0,
+            "discarded": 0,
+            "bootstraps": 0,
+            "in_use": 0,
+        }
+
+    def _switch(self, key: tuple | None) -> list[RagConnection]:
+        # Caller holds the lock. Idle connections for another file are dropped.
+        if key == self._key:
+            return []
+        stale, self._idle = self._idle, []
+        self._key = key
+        self._stats["discarded"] += len(stale)
+        return stale
+
+    def acquire(self, key: tuple | None) -> RagConnection | None:
+        if key is None:
+            return None
+        with self._lock:
+            stale = self._switch(key)
+            con = self._idle.pop() if self._idle else None
+            if con is not None:
+                con.pool_state = "out"
+                self._stats["reused"] += 1
+                self._stats["in_use"] += 1
+        for c in stale:
+            c.pool_state = "closed"
+            sqlite3.Connection.close(c)
+        return con
+
+    def needs_bootstrap(self, key: tuple | None) -> bool:
+        return key is None or key not in self._bootstrapped
+
+    def mark_bootstrapped(self, key: tuple | None) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._bootstrapped.add(key)
+            self._stats["bootstraps"] += 1
+
+    def adopt(self, con: RagConnection, key: tuple | None) -> None:
+        con.pool_key = key
+        with self._lock:
+            stale = self._switch(key) if key is not None else []
+            self._stats["created"] += 1
+            self._stats["in_use"] += 1
+        for c in stale:
+            c.pool_state = "closed"
+            sqlite3.Connection.close(c)
+
+    def release(self, con: RagConnection) -> bool:
+        with self._lock:
+            self._stats["in_use"] = max(0, self._stats["in_use"] - 1)
         try:
-            # Resolve DB path at call time to honor late env overrides in tests/tools
-            db_path = os.environ.get("RAG_DB", DB_PATH)
+            if con.in_transaction:
+                con.rollback()
+            con.row_factory = None
+            con.set_trace_callback(None)
+        except Exception:
+            return False
+        with self._lock:
+            if (
+                con.pool_key is None
+                or con.pool_key != self._key
+                or len(self._idle) >= self.size
+            ):
+                self._stats["discarded"] += 1
+                return False
+            con.pool_state = "idle"
+            self._idle.append(con)
+            self._stats["returned"] += 1
+            return True
+
+    def reset(self) -> None:
+        """Close idle connections and forget bootstrap state (tests, DB resets)."""
+        with self._lock:
+            stale, self._idle = self._idle, []
+            self._key = None
+            self._bootstrapped.clear()
+        for c in stale:
+            c.pool_state = "closed"
+            sqlite3.Connection.close(c)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "idle": len(self._idle),
+                "size": self.size,
+                "stmt_cache": RAG_STMT_CACHE,
+            }
+
+
+_POOL = _ConnPool(RAG_POOL_SIZE)
+
+
+def pool_stats() -> dict:
+    return _POOL.stats()
+
+
+def reset_pool() -> None:
+    _POOL.reset()
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    """Column names of ``table``; cached on RagConnection so PRAGMA runs once."""
+    cache = getattr(conn, "schema_cache", None)
+    if cache is not None and table in cache:
+        return cache[table]
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info('{table}')").fetchall()}
+    if cache is not None:
+        cache[table] = cols
+    return cols
+
+
+def _bootstrap_schema(conn: sqlite3.Connection) -> None:
+    """Create/extend the RAG tables, indexes and FTS triggers (idempotent)."""
+    # Base tables: docs + vecs (Phase 1)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS docs(
+    id TEXT PRIMARY KEY, repo TEXT, path TEXT, sha TEXT,
+    title TEXT, text TEXT, meta TEXT
+)"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS vecs(
+    id TEXT PRIMARY KEY, embedding BLOB
+)"""
+    )
+    # Hybrid retrieval helper table (Phase 2)
+    conn.execute(
+        """
+    CREATE TABLE IF NOT EXISTS chunks(
+        id INTEGER PRIMARY KEY,
+        content TEXT NOT NULL,
+        source_path TEXT,
+        title TEXT,
+        project_id TEXT
+    )
+"""
+    )
+    # Extend chunks schema for direct ingest if columns are missing (safe ALTERs)
+    try:
+        cols = {r[1] for r in conn.execute("PRAGMA table_info('chunks')").fetchall()}
+        to_add = []
+        if "doc_id" not in cols:
+            to_add.append("ALTER TABLE chunks ADD COLUMN doc_id TEXT")
+        if "ordinal" not in cols:
+            to_add.append("ALTER TABLE chunks ADD COLUMN ordinal INTEGER")
+        if "text" not in cols:
+            to_add.append("ALTER TABLE chunks ADD COLUMN text TEXT")
+        if "meta" not in cols:
+            to_add.append("ALTER TABLE chunks ADD COLUMN meta TEXT")
+        if "created_at" not in cols:
+            to_add.append(
+                "ALTER TABLE chunks ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"
+            )
+        for stmt in to_add:
             try:
-                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                conn.execute(stmt)
             except Exception:
                 pass
-            conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
-            conn = _configure_connection(conn)
-            # Base tables: docs + vecs (Phase 1)
-            conn.execute(
-                """CREATE TABLE IF NOT EXISTS docs(
-            id TEXT PRIMARY KEY, repo TEXT, path TEXT, sha TEXT,
-            title TEXT, text TEXT, meta TEXT
-        )"""
-            )
+    except Exception:
+        pass
+    # Helpful indexes
+    try:
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_project ON chunks(project_id)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_path ON docs(path)")
+    except Exception:
+        pass
+    # Lightweight FTS5 virtual table over chunks.text for offsets() highlighting
+    try:
+        conn.execute(
+            """
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts
+        USING fts5(text, content='chunks', content_rowid='id')
+        """
+        )
+        # Triggers to keep in sync
+        conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+          INSERT INTO chunks_fts(rowid, text) VALUES (new.id, COALESCE(new.text, new.content));
+        END;
+        """
+        )
+        conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+          INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES('delete', old.id, COALESCE(old.text, old.content));
+        END;
+        """
+        )
+        conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
+          INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES('delete', old.id, COALESCE(old.text, old.content));
+          INSERT INTO chunks_fts(rowid, text) VALUES (new.id, COALESCE(new.text, new.content));
+        END;
+        """
+        )
+    except Exception:
+        pass
+    # Answers cache table for fused queries
+    try:
+        conn.execute(
+            """
+        CREATE TABLE IF NOT EXISTS answers_cache(
+          project_id TEXT,
+          query_hash TEXT PRIMARY KEY,
+          answer TEXT,
+          created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        # LRU bookkeeping for answers_cache.compact (backfilled from created_at)
+        if "last_hit_at" not in {
+            r[1] for r in conn.execute("PRAGMA table_info('answers_cache')")
+        }:
+            conn.execute("ALTER TABLE answers_cache ADD COLUMN last_hit_at REAL")
             conn.execute(
-                """CREATE TABLE IF NOT EXISTS vecs(
-            id TEXT PRIMARY KEY, embedding BLOB
-        )"""
+                "UPDATE answers_cache SET last_hit_at = strftime('%s', created_at)"
             )
-            # Hybrid retrieval helper table (Phase 2)
+            conn.commit()
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answers_cache_hit ON answers_cache(last_hit_at)"
+        )
+    except Exception:
+        pass
+    # Per-file content hashes for incremental re-ingest (rag_ingest)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS ingest_manifest(
+    source TEXT NOT NULL, path TEXT NOT NULL, file_hash TEXT NOT NULL,
+    embed TEXT, chunk_ids TEXT NOT NULL, updated_at REAL,
+    PRIMARY KEY(source, path)
+)"""
+    )
+    # Content version of vecs for the saved search matrix: a random id per DB
+    # file plus a counter bumped by every write, whichever process makes it
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vec_meta(key TEXT PRIMARY KEY, value)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO vec_meta VALUES('instance', lower(hex(randomblob(8))))"
+        )
+        conn.execute("INSERT OR IGNORE INTO vec_meta VALUES('version', 0)")
+        for name, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
             conn.execute(
-                """
-            CREATE TABLE IF NOT EXISTS chunks(
-                id INTEGER PRIMARY KEY,
-                content TEXT NOT NULL,
-                source_path TEXT,
-                title TEXT,
-                project_id TEXT
-            )
+                f"""
+        CREATE TRIGGER IF NOT EXISTS vecs_{name} AFTER {event} ON vecs BEGIN
+          UPDATE vec_meta SET value = value + 1 WHERE key = 'version';
+        END;
         """
             )
-            # Extend chunks schema for direct ingest if columns are missing (safe ALTERs)
-            try:
-                cols = {
-                    r[1] for r in conn.execute("PRAGMA table_info('chunks')").fetchall()
-                }
-                to_add = []
-                if "doc_id" not in cols:
-                    to_add.append("ALTER TABLE chunks ADD COLUMN doc_id TEXT")
-                if "ordinal" not in cols:
-                    to_add.append("ALTER TABLE chunks ADD COLUMN ordinal INTEGER")
-                if "text" not in cols:
-                    to_add.append("ALTER TABLE chunks ADD COLUMN text TEXT")
-                if "meta" not in cols:
-                    to_add.append("ALTER TABLE chunks ADD COLUMN meta TEXT")
-                if "created_at" not in cols:
-                    to_add.append(
-                        "ALTER TABLE chunks ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"
-                    )
-                for stmt in to_add:
-                    try:
-                        conn.execute(stmt)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-            # Helpful indexes
-            try:
-                conn.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_chunks_project ON chunks(project_id)"
-                )
-                conn.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id)"
-                )
-            except Exception:
-                pass
-            # Lightweight FTS5 virtual table over chunks.text for offsets() highlighting
-            try:
-                conn.execute(
-                    """
-                CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts
-                USING fts5(text, content='chunks', content_rowid='id')
-                """
-                )
-                # Triggers to keep in sync
-                conn.execute(
-                    """
-                CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
-                  INSERT INTO chunks_fts(rowid, text) VALUES (new.id, COALESCE(new.text, new.content));
-                END;
-                """
-                )
-                conn.execute(
-                    """
-                CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
-                  INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES('delete', old.id, COALESCE(old.text, old.content));
-                END;
-                """
-                )
-                conn.execute(
-                    """
-                CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
-                  INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES('delete', old.id, COALESCE(old.text, old.content));
-                  INSERT INTO chunks_fts(rowid, text) VALUES (new.id, COALESCE(new.text, new.content));
-                END;
-                """
-                )
-            except Exception:
-                pass
-            # Answers cache table for fused queries
+        conn.commit()
+    except Exception:
+        pass
+
+
+def connect(retries: int = 5, base_sleep: float = 0.2) -> sqlite3.Connection:
+    """Get a pooled connection to the RAG DB, with retry/backoff when locked.
+
+    Callers keep calling ``close()``; that returns the connection to the pool.
+    """
+    # Resolve DB path at call time to honor late env overrides in tests/tools
+    db_path = os.environ.get("RAG_DB", DB_PATH)
+    key = _file_key(db_path)
+    pooled = _POOL.acquire(key)
+    if pooled is not None:
+        return pooled
+    attempt = 0
+    while True:
+        try:
             try:
-                conn.execute(
-                    """
-                CREATE TABLE IF NOT EXISTS answers_cache(
-                  project_id TEXT,
-                  query_hash TEXT PRIMARY KEY,
-                  answer TEXT,
-                  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-                )
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
             except Exception:
                 pass
+            conn = sqlite3.connect(
+                db_path,
+                timeout=30.0,
+                check_same_thread=False,
+                factory=RagConnection,
+                cached_statements=RAG_STMT_CACHE,
+            )
+            conn = _configure_connection(conn)
+            if _POOL.needs_bootstrap(key):
+                _bootstrap_schema(conn)
+                key = _file_key(db_path)
+                _POOL.mark_bootstrapped(key)
+            _POOL.adopt(conn, key)
             return conn
         except sqlite3.OperationalError as exc:
             if _LOCK_MSG not in str(exc) or attempt >= retries:
@@ -218,6 +447,33 @@ def upsert_vec(conn, id, emb: np.ndarray):
     )
 
 
+def upsert_docs(conn, rows):
+    """Bulk variant of ``upsert_doc`` (one executemany)."""
+    conn.executemany(
+        "REPLACE INTO docs(id,repo,path,sha,title,text,meta) VALUES(?,?,?,?,?,?,?)",
+        [
+            (
+                row["id"],
+                row["repo"],
+                row["path"],
+                row["sha"],
+                row["title"],
+                row["text"],
+                json.dumps(row.get("meta", {})),
+            )
+            for row in rows
+        ],
+    )
+
+
+def upsert_vecs(conn, items):
+    """Bulk variant of ``upsert_vec``; items are (id, embedding) pairs."""
+    conn.executemany(
+        "REPLACE INTO vecs(id,embedding) VALUES(?,?)",
+        [(id, emb.astype(np.float32).tobytes()) for id, emb in items],
+    )
+
+
 def insert_chunk(
     conn,
     content: str,
@@ -232,35 +488,179 @@ def insert_chunk(
     return int(cur.lastrowid)
 
 
+class _VecMatrix:
+    """Pre-normalized float32 embedding matrix for the brute-force ``search``.
+
+    Keyed on the DB file identity and the ``vec_meta`` content version
+    (instance id + write counter bumped by triggers), read in the same snapshot
+    as the rows, so committed writes from any process rebuild it;
+    ``bump_vec_generation`` forces a rebuild in-process. DBs without
+    ``vec_meta`` fall back to a (COUNT, MAX(rowid)) fingerprint. With
+    ``RAG_VEC_MMAP=1`` the matrix is also saved next to the DB as ``.npy`` and
+    memory-mapped on the next start while that key still matches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: tuple | None = None
+        self._groups: dict[int, tuple[list[str], np.ndarray]] = {}  # dim -> (ids, X)
+        self.generation = 0
+        self.builds = 0
+
+    def bump(self) -> None:
+        with self._lock:
+            self.generation += 1
+
+    def _fingerprint(self, conn) -> tuple:
+        row = conn.execute("SELECT COUNT(*), MAX(rowid) FROM vecs").fetchone()
+        return (row[0], row[1])
+
+    def _version(self, conn) -> tuple | None:
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM vec_meta"))
+            return (meta["instance"], int(meta["version"]))
+        except Exception:
+            return None  # vec_meta not bootstrapped on this DB
+
+    def get(self, conn, dim: int) -> tuple[list[str], np.ndarray] | None:
+        db_path = os.environ.get("RAG_DB", DB_PATH)
+        # One read snapshot for the version and the rows it describes. A
+        # caller's open write transaction is read as-is but never cached, since
+        # it may still roll back.
+        own_tx = not conn.in_transaction
+        if own_tx:
+            conn.execute("BEGIN")
+        try:
+            version = self._version(conn)
+            content = version if version is not None else self._fingerprint(conn)
+            key = (_file_key(db_path), self.generation, content)
+            with self._lock:
+                if key != self._key:
+                    persist = own_tx and version is not None
+                    self._groups = self._load(conn, db_path, key, persist)
+                    self._key = key if own_tx else None
+                    self.builds += 1
+                return self._groups.get(dim)
+        finally:
+            if own_tx:
+                conn.commit()
+
+    def _load(self, conn, db_path: str, key: tuple, persist: bool) -> dict:
+        mmap = os.getenv("RAG_VEC_MMAP", "0").lower() in ("1", "true", "yes")
+        side = Path(db_path + ".vecs.json")
+        # File identity + vec_meta version; the in-process generation is left out
+        saved = json.loads(json.dumps([key[0], key[2]]))
+        save = mmap and persist
+        if save:
+            try:
+                meta = json.loads(side.read_text(encoding="utf-8"))
+                if meta["content"] == saved:
+                    groups = {}
+                    for dim, ids in meta["groups"].items():
+                        X = np.load(f"{db_path}.vecs{dim}.npy", mmap_mode="r")
+                        if X.shape != (len(ids), int(dim)):
+                            raise ValueError("saved matrix does not match its meta")
+                        groups[int(dim)] = (ids, X)
+                    return groups
+            except Exception:
+                pass
+        by_dim: dict[int, tuple[list[str], list[bytes]]] = {}
+        for did, blob in conn.execute("SELECT id, embedding FROM vecs"):
+            if not blob:
+                continue
+            ids, blobs = by_dim.setdefault(len(blob) // 4, ([], []))
+            ids.append(did)
+            blobs.append(blob)
+        groups = {}
+        for dim, (ids, blobs) in by_dim.items():
+            X = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(ids), dim)
+            X = X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
+            groups[dim] = (ids, X.astype(np.float32, copy=False))
+        if save:
+            # Drop the old meta first and swap every file in via os.replace: a
+            # reader never pairs stale meta with new arrays, and pages already
+            # mapped by other processes keep pointing at the old inode.
+            try:
+                side.unlink(missing_ok=True)
+                for dim, (_, X) in groups.items():
+                    tmp = f"{db_path}.vecs{dim}.npy.tmp"
+                    with open(tmp, "wb") as f:
+                        np.save(f, X)
+                    os.replace(tmp, f"{db_path}.vecs{dim}.npy")
+                tmp = f"{side}.tmp"
+                Path(tmp).write_text(
+                    json.dumps(
+                        {
+                            "content": saved,
+                            "groups": {str(d): ids for d, (ids, _) in groups.items()},
+                        }
+                    ),
+                    encoding="utf-8",
+                )
+                os.replace(tmp, side)
+            except Exception:
+                pass
+        return groups
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "builds": self.builds,
+                "rows": sum(len(ids) for ids, _ in self._groups.values()),
+                "dims": sorted(self._groups),
+            }
+
+
+_VECS = _VecMatrix()
+
+
+def bump_vec_generation() -> None:
+    """Force a rebuild of the cached search matrix (committed ``vecs`` writes
+    already change its ``vec_meta`` key)."""
+    _VECS.bump()
+
+
+def vec_cache_stats() -> dict:
+    return _VECS.stats()
+
+
 def search(conn, query_vec: np.ndarray, k=8):
-    # brute-force cosine (fast enough <50k chunks). Swap later for FAISS index table.
-    cur = conn.execute("SELECT id, embedding FROM vecs")
-    rows = cur.fetchall()
-    if not rows:
+    # brute-force cosine over the cached matrix (fast enough <50k chunks)
+    q = np.asarray(query_vec, dtype=np.float32).ravel()
+    group = _VECS.get(conn, q.shape[0])
+    if group is None or k <= 0:
         return []
-    ids, mats = zip(*rows)
-    X = np.vstack([np.frombuffer(b, dtype=np.float32) for b in mats])
-    q = query_vec / (np.linalg.norm(query_vec) + 1e-9)
-    Xn = X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
+    ids, Xn = group
+    q = q / (np.linalg.norm(q) + 1e-9)
     sims = Xn @ q
-    top = np.argsort(-sims)[:k]
+    if k < len(ids):
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+    else:
+        top = np.argsort(-sims)
+    scores = {ids[int(i)]: float(sims[int(i)]) for i in top}
+    docs = {
+        d[0]: d
+        for d in conn.execute(
+            "SELECT id,repo,path,title,text,meta FROM docs "
+            "WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(scores)),),
+        )
+    }
     res = []
-    for i in top:
-        did = ids[int(i)]
-        sim = float(sims[int(i)])
-        d = conn.execute(
-            "SELECT repo,path,title,text,meta FROM docs WHERE id=?", (did,)
-        ).fetchone()
+    for did, sim in scores.items():
+        d = docs.get(did)
         if d:
             res.append(
                 {
                     "id": did,
                     "score": sim,
-                    "repo": d[0],
-                    "path": d[1],
-                    "title": d[2],
-                    "text": d[3],
-                    "meta": json.loads(d[4] or "{}"),
+                    "repo": d[1],
+                    "path": d[2],
+                    "title": d[3],
+                    "text": d[4],
+                    "meta": json.loads(d[5] or "{}"),
                 }
             )
     return res
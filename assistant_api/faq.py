@@ -1,5 +1,8 @@
+import hashlib
 import json
 import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -17,44 +20,152 @@ class FaqHit:
     score: float
 
 
-_cache: dict[str, Any] = {"ready": False, "items": [], "E": None}
+# items: normalized FAQ entries; E: (n, d) float32 row-normalized question matrix;
+# fp: fingerprint of faq.json bytes + embed model that E was computed for.
+_cache: dict[str, Any] = {
+    "ready": False,
+    "items": [],
+    "E": None,
+    "fp": None,
+    "stat": None,
+}
+_lock = threading.Lock()
+# Query text -> row-normalized vector, shared by the router, the /chat FAQ
+# branch and the answer cache so one question is embedded once. Cleared
+# whenever the matrix is reloaded (FAQ or embed model changed).
+_QUERY_MEMO_MAX = 512
+_query_memo: OrderedDict[str, Any] = OrderedDict()
 
 
-def _load() -> None:
-    if _cache["ready"]:
-        return
-    if FAQ_PATH.exists():
-        items = json.loads(FAQ_PATH.read_text(encoding="utf-8"))
-        # normalize
-        _cache["items"] = [
-            {"q": i["q"], "a": i["a"], "project_id": i.get("project_id")} for i in items
+def _faq_path() -> Path:
+    env = os.getenv("FAQ_PATH")
+    return Path(env) if env else FAQ_PATH
+
+
+def _model_tag() -> str:
+    return "|".join(
+        [
+            os.getenv("PREFER_LOCAL", "1"),
+            os.getenv("EMBED_MODEL", "BAAI/bge-m3"),
+            os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small"),
         ]
-    else:
-        _cache["items"] = []
-    _cache["ready"] = True
+    )
 
 
-def faq_search_best(query: str) -> FaqHit | None:
+def _sidecar(path: Path, fp: str) -> Path:
+    return path.with_name(f"{path.stem}.emb-{fp[:16]}.npy")
+
+
+def _normalize(m):
+    import numpy as np
+
+    m = np.asarray(m, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    n = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.maximum(n, 1e-9)
+
+
+def _embed_matrix(path: Path, fp: str, items: list[dict], warm: bool = True):
+    """Load the question matrix from the .npy sidecar, or embed and persist it."""
+    import numpy as np
+
+    side = _sidecar(path, fp)
+    if warm:
+        try:
+            E = np.load(side, allow_pickle=False)
+            if E.ndim == 2 and E.shape[0] == len(items):
+                return E.astype(np.float32, copy=False)
+        except Exception:
+            pass
+    E = _normalize(embed_texts_local_first([it["q"] for it in items]))
+    try:
+        for old in path.parent.glob(f"{path.stem}.emb-*.npy"):
+            if old != side:
+                old.unlink(missing_ok=True)
+        tmp = side.with_suffix(".tmp.npy")
+        np.save(tmp, E, allow_pickle=False)
+        os.replace(tmp, side)
+    except Exception as e:  # read-only data dir etc. — in-memory cache still works
+        print(f"[faq] sidecar write skipped: {e}")
+    return E
+
+
+def _load(force: bool = False) -> None:
+    path = _faq_path()
+    try:
+        st = path.stat()
+        stat = (str(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        stat = (str(path), None, None)
+    if not force and _cache["ready"] and _cache["stat"] == stat:
+        return
+    with _lock:
+        if not force and _cache["ready"] and _cache["stat"] == stat:
+            return
+        if stat[1] is not None:
+            raw = path.read_bytes()
+            items = json.loads(raw.decode("utf-8"))
+            # normalize
+            items = [
+                {"q": i["q"], "a": i["a"], "project_id": i.get("project_id")}
+                for i in items
+            ]
+            fp = hashlib.sha1(raw + b"\0" + _model_tag().encode()).hexdigest()
+        else:
+            items, fp = [], None
+        E = _embed_matrix(path, fp, items, warm=not force) if items else None
+        _cache.update(items=items, E=E, fp=fp, stat=stat, ready=True)
+        _query_memo.clear()
+
+
+def embed_query(query: str):
+    """Row-normalized embedding of ``query``, memoized per text."""
+    with _lock:
+        qv = _query_memo.get(query)
+        if qv is not None:
+            _query_memo.move_to_end(query)
+            return qv
+    qv = _normalize(embed_texts_local_first([query]))[0]
+    with _lock:
+        _query_memo[query] = qv
+        while len(_query_memo) > _QUERY_MEMO_MAX:
+            _query_memo.popitem(last=False)
+    return qv
+
+
+def faq_search_topk(query: str, k: int = 3) -> list[FaqHit]:
+    """Top-k FAQ entries by cosine similarity; only the query is embedded."""
+    import numpy as np
+
     _load()
-    if not _cache["items"]:
-        return None
-    texts = [query] + [it["q"] for it in _cache["items"]]
-    vecs = embed_texts_local_first(texts)
-    qv, docvs = vecs[0], vecs[1:]
-
-    def cos(a, b):
-        import numpy as np
-
-        na = float(np.linalg.norm(a))
-        nb = float(np.linalg.norm(b))
-        return float((a @ b) / (na * nb + 1e-9))
-
-    scores = [cos(qv, dv) for dv in docvs]
-    best_i = max(range(len(scores)), key=lambda i: scores[i])
-    best = _cache["items"][best_i]
-    return FaqHit(
-        q=best["q"],
-        a=best["a"],
-        project_id=best.get("project_id"),
-        score=float(scores[best_i]),
+    items, E = _cache["items"], _cache["E"]
+    if not items or E is None:
+        return []
+    qv = embed_query(query)
+    if qv.shape[0] != E.shape[1]:
+        # Embedding backend changed underneath us (e.g. local -> OpenAI fallback)
+        _load(force=True)
+        items, E = _cache["items"], _cache["E"]
+        if E is None or qv.shape[0] != E.shape[1]:
+            return []
+    scores = E @ qv
+    k = max(1, min(int(k), len(items)))
+    top = (
+        np.argpartition(-scores, k - 1)[:k] if k < len(items) else np.arange(len(items))
     )
+    top = top[np.argsort(-scores[top])]
+    return [
+        FaqHit(
+            q=items[i]["q"],
+            a=items[i]["a"],
+            project_id=items[i].get("project_id"),
+            score=float(scores[i]),
+        )
+        for i in top
+    ]
+
+
+def faq_search_best(query: str) -> FaqHit | None:
+    hits = faq_search_topk(query, k=1)
+    return hits[0] if hits else None
@@ -8,9 +8,9 @@ def _db():
     path = os.environ.get("RAG_DB")
     if not path:
         raise RuntimeError("RAG_DB not set")
-    con = sqlite3.connect(path)
-    con.execute("PRAGMA journal_mode=WAL")
-    return con
+    from .db import connect
+
+    return connect()
 
 
 def ensure_fts_schema():
@@ -54,6 +54,10 @@ def backfill_chunks_from_docs():
             to_ins,
         )
         con.commit()
+        from .answers_cache import invalidate
+
+        invalidate(con=con)
+        con.commit()
         return {"ok": True, "inserted": len(to_ins)}
     finally:
         con.close()
@@ -3,6 +3,7 @@ from __future__ import annotations
 from collections.abc import Iterable
 from typing import Dict
 
+from . import answers_cache
 from .db import get_conn
 
 
@@ -48,10 +49,7 @@ def ingest_direct(
             )
             inserted += 1
         # Invalidate cached answers for this project
-        try:
-            con.execute("DELETE FROM answers_cache WHERE project_id = ?", (project_id,))
-        except Exception:
-            pass
+        answers_cache.invalidate(project_id, con=con)
     return {"ok": True, "inserted": inserted}
 
 
@@ -0,0 +1,227 @@
+"""Streaming latency histograms shared by ``metrics`` and the latency routes.
+
+Samples land in fixed log-linear buckets (``SUB_BUCKETS`` linear steps per
+power of two between ``2**MIN_EXP`` and ``2**MAX_EXP`` ms, so a quantile is off
+by at most one bucket width, ~6%). ``record`` is O(1); ``quantile`` walks the
+buckets once. Besides the all-time counts each histogram keeps rings of slots
+for the 1m/5m/1h windows, and every histogram has its own lock so readers only
+ever block one series for a list copy.
+
+``series(kind, name)`` returns the shared histogram for a route/provider; the
+registered Prometheus collector exports all of them as
+``assistant_latency_seconds`` with power-of-two ``le`` bounds.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections.abc import Iterable
+from itertools import accumulate
+
+MIN_EXP = -4  # 0.0625 ms; smaller samples share the first bucket
+MAX_EXP = 19  # ~524 s; larger samples share the last bucket
+SUB_BUCKETS = 16
+NBUCKETS = (MAX_EXP - MIN_EXP) * SUB_BUCKETS
+
+# window name -> (slot seconds, slots)
+WINDOWS: dict[str, tuple[float, int]] = {
+    "1m": (10.0, 6),
+    "5m": (60.0, 5),
+    "1h": (300.0, 12),
+}
+
+
+def bucket_index(ms: float) -> int:
+    if ms <= 0 or ms != ms:
+        return 0
+    m, e = math.frexp(ms)  # ms = m * 2**e, 0.5 <= m < 1
+    i = (e - 1 - MIN_EXP) * SUB_BUCKETS + int((2.0 * m - 1.0) * SUB_BUCKETS)
+    return min(max(i, 0), NBUCKETS - 1)
+
+
+def bucket_lower(i: int) -> float:
+    octave, sub = divmod(i, SUB_BUCKETS)
+    return math.ldexp(1.0 + sub / SUB_BUCKETS, octave + MIN_EXP)
+
+
+class _Counts:
+    __slots__ = ("buckets", "count", "total", "min", "max", "epoch")
+
+    def __init__(self, epoch: int = 0):
+        self.buckets = [0] * NBUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.epoch = epoch
+
+    def add(self, i: int, ms: float) -> None:
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += ms
+        if ms < self.min:
+            self.min = ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other: _Counts) -> None:
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> _Counts:
+        c = _Counts(self.epoch)
+        c.buckets = list(self.buckets)
+        c.count, c.total, c.min, c.max = self.count, self.total, self.min, self.max
+        return c
+
+    def quantile(self, q: float) -> float:
+        """Rank ``q`` interpolated linearly inside its bucket, clamped to the
+        bucket edges and to min/max."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n > rank:
+                lo = bucket_lower(i)
+                hi = bucket_lower(i + 1)
+                v = lo + (hi - lo) * ((rank - seen) / n)  # rank - seen < n
+                return min(max(v, lo, self.min), hi, self.max)
+            seen += n
+        return self.max
+
+    def stats(self) -> dict:
+        if not self.count:
+            return {
+                "count": 0,
+                "min_ms": 0.0,
+                "p50_ms": 0.0,
+                "p95_ms": 0.0,
+                "p99_ms": 0.0,
+                "max_ms": 0.0,
+                "avg_ms": 0.0,
+            }
+        return {
+            "count": self.count,
+            "min_ms": self.min,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max,
+            "avg_ms": self.total / self.count,
+        }
+
+
+class LatencyHistogram:
+    """All-time plus 1m/5m/1h windowed latency buckets for one series."""
+
+    def __init__(self, windows: dict[str, tuple[float, int]] = WINDOWS):
+        self.windows = windows
+        self._lock = threading.Lock()
+        self._all = _Counts()
+        self._rings = {w: [None] * n for w, (_, n) in windows.items()}
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> LatencyHistogram:
+        h = cls(windows={})
+        for v in values:
+            h.record(v)
+        return h
+
+    def record(self, ms: float, now: float | None = None) -> None:
+        ms = float(ms)
+        i = bucket_index(ms)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._all.add(i, ms)
+            for w, (slot_s, n) in self.windows.items():
+                epoch = int(now // slot_s)
+                ring = self._rings[w]
+                slot = ring[epoch % n]
+                if slot is None or slot.epoch != epoch:
+                    # Slot belongs to an older lap: reuse it for this interval
+                    slot = ring[epoch % n] = _Counts(epoch)
+                slot.add(i, ms)
+
+    def counts(self, window: str | None = None, now: float | None = None) -> _Counts:
+        """Merged counts for ``window`` (None = since start)."""
+        if window is None:
+            with self._lock:
+                return self._all.copy()
+        slot_s, n = self.windows[window]
+        now = time.time() if now is None else now
+        epoch = int(now // slot_s)
+        with self._lock:
+            live = [
+                s.copy()
+                for s in self._rings[window]
+                if s is not None and epoch - n < s.epoch <= epoch
+            ]
+        out = _Counts(epoch)
+        for s in live:
+            out.merge(s)
+        return out
+
+    def quantile(self, q: float, window: str | None = None) -> float:
+        return self.counts(window).quantile(q)
+
+    def stats(self, window: str | None = None) -> dict:
+        return self.counts(window).stats()
+
+
+_registry_lock = threading.Lock()
+_registry: dict[tuple[str, str], LatencyHistogram] = {}
+
+
+def series(kind: str, name: str) -> LatencyHistogram:
+    """Shared histogram for ``(kind, name)``, e.g. ``("provider", "primary")``."""
+    h = _registry.get((kind, name))
+    if h is None:
+        with _registry_lock:
+            h = _registry.setdefault((kind, name), LatencyHistogram())
+    return h
+
+
+def all_series(kind: str | None = None) -> dict[tuple[str, str], LatencyHistogram]:
+    with _registry_lock:
+        return {k: h for k, h in _registry.items() if kind is None or k[0] == kind}
+
+
+# Prometheus ``le`` bounds: powers of two from 1 ms, each one a bucket edge
+_PROM_EDGES = [
+    (str(math.ldexp(1.0, e) / 1000.0), (e - MIN_EXP) * SUB_BUCKETS)
+    for e in range(0, MAX_EXP + 1)
+]
+
+
+class _PromCollector:
+    def collect(self):
+        from prometheus_client.core import HistogramMetricFamily
+
+        fam = HistogramMetricFamily(
+            "assistant_latency_seconds",
+            "Request/LLM latency by series (route, provider, all)",
+            labels=["kind", "name"],
+        )
+        for (kind, name), h in sorted(all_series().items()):
+            c = h.counts()
+            cum = [0, *accumulate(c.buckets)]
+            bounds = [(le, cum[i]) for le, i in _PROM_EDGES]
+            bounds.append(("+Inf", c.count))
+            fam.add_metric([kind, name], bounds, c.total / 1000.0)
+        yield fam
+
+
+def register_prometheus() -> None:
+    try:
+        from prometheus_client import REGISTRY
+
+        REGISTRY.register(_PromCollector())
+    except Exception:
+        # prometheus_client missing or collector already registered
+        pass
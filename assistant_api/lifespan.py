@@ -75,6 +75,26 @@ async def _poll_primary_models(
             pass
 
 
+async def _compact_answers_cache(stopper: asyncio.Event) -> None:
+    """Background task: TTL + LRU compaction of the RAG answers_cache table."""
+    from .answers_cache import ANSWERS_CACHE_COMPACT_S, compact
+
+    while not stopper.is_set():
+        try:
+            res = await asyncio.to_thread(compact)
+            if res["expired"] or res["evicted"]:
+                _log(
+                    f"answers_cache: compacted expired={res['expired']} "
+                    f"evicted={res['evicted']} rows={res['rows']}"
+                )
+        except Exception as e:
+            _log(f"answers_cache: compaction error (tolerated): {e}")
+        try:
+            await asyncio.wait_for(stopper.wait(), timeout=ANSWERS_CACHE_COMPACT_S)
+        except TimeoutError:
+            pass
+
+
 def _log(msg: str) -> None:
     print(f"[lifespan] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
 
@@ -124,21 +144,31 @@ async def lifespan(app) -> AsyncIterator[None]:  # type: ignore[override]
     except Exception as exc:
         _log(f"telemetry: config check error: {exc!r}")
 
+    # Long-lived pooled HTTP clients for LLM providers (keep-alive reuse)
+    try:
+        from .llm_client import open_clients
+
+        await open_clients()
+        _log("startup: llm http clients opened")
+    except Exception as exc:
+        _log(f"startup: llm http clients error: {exc!r}")
+
     stopper = asyncio.Event()
     hold_task = asyncio.create_task(_hold_open(stopper))
     poll_task: asyncio.Task | None = None
     scheduler_task: asyncio.Task | None = None
+    compact_task: asyncio.Task | None = None
+    ab_snapshot_task: asyncio.Task | None = None
+    status_task: asyncio.Task | None = None
 
-    # Optional: create analytics SQL views if persistence enabled
+    # Optional: create the analytics events DB + SQL views if persistence enabled
     try:
         from .settings import ANALYTICS_PERSIST
 
         if ANALYTICS_PERSIST:
-            from .db import get_conn
-            from .sql_views import ensure_views
+            from .services.analytics_events import connect as events_connect
 
-            con = get_conn()
-            ensure_views(con)
+            events_connect().close()
     except Exception:
         pass
 
@@ -158,6 +188,33 @@ async def lifespan(app) -> AsyncIterator[None]:  # type: ignore[override]
     except Exception as exc:
         _log(f"startup: scheduler initialization error: {exc!r}")
 
+    # Periodic answers_cache compaction (ANSWERS_CACHE_COMPACT_S<=0 disables)
+    try:
+        from .answers_cache import ANSWERS_CACHE_COMPACT_S
+
+        if ANSWERS_CACHE_COMPACT_S > 0:
+            compact_task = asyncio.create_task(_compact_answers_cache(stopper))
+    except Exception as exc:
+        _log(f"startup: answers_cache compaction error: {exc!r}")
+
+    # A/B counters live in memory; snapshot them to disk on an interval + at exit
+    try:
+        from .services.layout_ab import snapshot_loop
+
+        ab_snapshot_task = asyncio.create_task(snapshot_loop(stopper))
+    except Exception as exc:
+        _log(f"startup: ab snapshot task error: {exc!r}")
+
+    # /status/summary serves a snapshot refreshed per probe in the background
+    try:
+        from .status_common import aggregator, snapshot_enabled
+
+        if snapshot_enabled():
+            base = os.getenv("BASE_URL_PUBLIC", "http://127.0.0.1:8001")
+            status_task = asyncio.create_task(aggregator.run(base, stopper))
+    except Exception as exc:
+        _log(f"startup: status snapshot task error: {exc!r}")
+
     try:
         _log("startup: ready (loop held)")
         yield
@@ -170,6 +227,12 @@ async def lifespan(app) -> AsyncIterator[None]:  # type: ignore[override]
             tasks.append(poll_task)
         if scheduler_task is not None:
             tasks.append(scheduler_task)
+        if compact_task is not None:
+            tasks.append(compact_task)
+        if ab_snapshot_task is not None:
+            tasks.append(ab_snapshot_task)
+        if status_task is not None:
+            tasks.append(status_task)
         for t in tasks:
             if not t.done():
                 t.cancel()
@@ -177,6 +240,31 @@ async def lifespan(app) -> AsyncIterator[None]:  # type: ignore[override]
             await asyncio.gather(*tasks, return_exceptions=True)
         except Exception as exc:  # pragma: no cover - defensive logging
             _log(f"shutdown: tasks cleanup error: {exc!r}")
+        try:
+            from .llm_client import close_clients
+
+            await close_clients()
+        except Exception as exc:
+            _log(f"shutdown: llm http clients close error: {exc!r}")
+        try:
+            from .services.ingest_jobs import shutdown as ingest_jobs_shutdown
+
+            ingest_jobs_shutdown()
+        except Exception as exc:
+            _log(f"shutdown: ingest jobs error: {exc!r}")
+        try:
+            from .rag_query import shutdown_recall
+
+            shutdown_recall()
+        except Exception as exc:
+            _log(f"shutdown: rag recall pool error: {exc!r}")
+        # Drain buffered JSONL sinks (metrics events) before exit
+        try:
+            from .services.metrics_sink import close_all
+
+            await close_all()
+        except Exception as exc:
+            _log(f"shutdown: metrics sink flush error: {exc!r}")
         _log("shutdown: done")
 
 
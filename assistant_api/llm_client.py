@@ -1,12 +1,22 @@
+import asyncio
+import importlib.util
 import os
 import time
 from collections.abc import Iterable
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
 import httpx
 
-from .metrics import primary_fail_reason, providers, record, stage_record_ms
+from . import tracing
+from .metrics import (
+    llm_pool,
+    primary_fail_reason,
+    providers,
+    record,
+    stage_record_ms,
+)
 
 
 @dataclass
@@ -83,6 +93,97 @@ LAST_PRIMARY_STATUS: int | None = None
 LAST_PRIMARY_ERROR: str | None = None
 DISABLE_PRIMARY = os.getenv("DISABLE_PRIMARY", "").lower() in ("1", "true", "yes")
 
+# Pooled HTTP clients -------------------------------------------------------------
+# One long-lived AsyncClient per provider so chat turns reuse keep-alive (and for
+# the fallback, TLS/HTTP2) connections. Opened/closed by lifespan; created lazily
+# when used outside the app loop (scripts, tests).
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY_S = float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "30"))
+LLM_POOL_TIMEOUT_S = float(os.getenv("LLM_POOL_TIMEOUT_S", "5"))
+PRIMARY_CONNECT_TIMEOUT_S = float(os.getenv("PRIMARY_CONNECT_TIMEOUT_S", "5"))
+FALLBACK_TIMEOUT_S = float(os.getenv("FALLBACK_TIMEOUT_S", str(REQ_TIMEOUT_S)))
+FALLBACK_CONNECT_TIMEOUT_S = float(os.getenv("FALLBACK_CONNECT_TIMEOUT_S", "10"))
+# HTTP/2 needs the optional `h2` package (httpx[http2])
+FALLBACK_HTTP2 = (
+    os.getenv("FALLBACK_HTTP2", "1").lower() in ("1", "true", "yes")
+    and importlib.util.find_spec("h2") is not None
+)
+
+_clients: dict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+
+def _provider_timeout(
+    provider: str, read: float | None = None, stream: bool = False
+) -> httpx.Timeout:
+    """Per-provider timeouts; streams keep a bounded connect but no read limit."""
+    if provider == "fallback":
+        read = FALLBACK_TIMEOUT_S if read is None else read
+        connect = FALLBACK_CONNECT_TIMEOUT_S
+    else:
+        read = REQ_TIMEOUT_S if read is None else read
+        connect = PRIMARY_CONNECT_TIMEOUT_S
+    return httpx.Timeout(
+        None if stream else read, connect=connect, pool=LLM_POOL_TIMEOUT_S
+    )
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    """Shared client for 'primary' or 'fallback', bound to the running loop."""
+    loop = asyncio.get_running_loop()
+    cur = _clients.get(provider)
+    if cur is not None and cur[1] is loop and not cur[0].is_closed:
+        return cur[0]
+    client = httpx.AsyncClient(
+        timeout=_provider_timeout(provider),
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_S,
+        ),
+        http2=provider == "fallback" and FALLBACK_HTTP2,
+    )
+    _clients[provider] = (client, loop)
+    llm_pool[provider]["max_connections"] = LLM_MAX_CONNECTIONS
+    return client
+
+
+async def open_clients() -> None:
+    for provider in ("primary", "fallback"):
+        get_client(provider)
+
+
+async def close_clients() -> None:
+    loop = asyncio.get_running_loop()
+    for provider, (client, owner) in list(_clients.items()):
+        _clients.pop(provider, None)
+        if owner is loop:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+
+@asynccontextmanager
+async def _tracked(provider: str):
+    """Count a pooled request; yields request extensions that record new connects."""
+    c = llm_pool[provider]
+
+    async def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            c["connects"] += 1
+
+    c["requests"] += 1
+    c["in_flight"] += 1
+    c["max_in_flight"] = max(c["max_in_flight"], c["in_flight"])
+    try:
+        yield {"trace": trace}
+    except httpx.PoolTimeout:
+        c["pool_timeouts"] += 1
+        raise
+    finally:
+        c["in_flight"] -= 1
+
 
 def set_primary_model_present(value: bool | None) -> bool | None:
     global PRIMARY_MODEL_PRESENT
@@ -134,8 +235,11 @@ async def ping_primary_once(timeout_s: float = 0.5) -> int:
     Raises httpx exceptions on network issues."""
     base = get_primary_base_url().rstrip("/")
     url = f"{base}/models"
-    async with httpx.AsyncClient(timeout=timeout_s) as client:
-        r = await client.get(url)
+    async with _tracked("primary") as ext:
+        # One budget for connect + read so the probe timeout bounds the whole call
+        r = await get_client("primary").get(
+            url, timeout=httpx.Timeout(timeout_s), extensions=ext
+        )
         return r.status_code
 
 
@@ -174,8 +278,12 @@ async def primary_list_models() -> list[str]:
         return []
     base = get_primary_base_url()
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(f"{base}/models")
+        async with _tracked("primary") as ext:
+            r = await get_client("primary").get(
+                f"{base}/models",
+                timeout=_provider_timeout("primary", 10.0),
+                extensions=ext,
+            )
             r.raise_for_status()
             try:
                 j = r.json() or {}
@@ -237,11 +345,12 @@ async def primary_chat(
     body = {"model": PRIMARY_MODEL, "messages": messages, "max_tokens": max_tokens}
     t0 = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=REQ_TIMEOUT_S) as client:
-            r = await client.post(
+        async with _tracked("primary") as ext:
+            r = await get_client("primary").post(
                 f"{PRIMARY_BASE}/chat/completions",
                 json=body,
                 headers={"Authorization": f"Bearer {PRIMARY_KEY}"},
+                extensions=ext,
             )
             LAST_PRIMARY_STATUS = r.status_code
             if r.status_code >= 400:
@@ -300,11 +409,12 @@ async def fallback_chat(messages: list[dict], max_tokens: int = 64) -> dict:
         raise RuntimeError("Fallback key missing; cannot complete request")
     body = {"model": FALLBACK_MODEL, "messages": messages, "max_tokens": max_tokens}
     t0 = time.perf_counter()
-    async with httpx.AsyncClient(timeout=REQ_TIMEOUT_S) as client:
-        r = await client.post(
+    async with _tracked("fallback") as ext:
+        r = await get_client("fallback").post(
             f"{FALLBACK_BASE}/chat/completions",
             json=body,
             headers={"Authorization": f"Bearer {FALLBACK_KEY}"},
+            extensions=ext,
         )
         r.raise_for_status()
         in_toks = out_toks = 0
@@ -327,11 +437,15 @@ async def chat(messages, stream=False):
         # delegate to stream implementation for backward compatibility
         async for item in chat_stream(messages):  # pragma: no cover
             return item
-    j, reason, status = await primary_chat(messages, max_tokens=512)
+    with tracing.span("primary") as sp:
+        j, reason, status = await primary_chat(messages, max_tokens=512)
+        if sp is not None and reason:
+            sp.set(reason=reason)
     if j is not None:
         return ("primary", DummyResponse(j))
     # Fallback
-    fj = await fallback_chat(messages, max_tokens=512)
+    with tracing.span("fallback"):
+        fj = await fallback_chat(messages, max_tokens=512)
     return ("fallback", DummyResponse(fj))
 
 
@@ -350,12 +464,14 @@ async def chat_stream(messages):
     # Try primary streaming
     if not DISABLE_PRIMARY and PRIMARY_MODEL_PRESENT is not False:
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream(
+            async with _tracked("primary") as ext:
+                async with get_client("primary").stream(
                     "POST",
                     f"{PRIMARY_BASE}/chat/completions",
                     headers={"Authorization": f"Bearer {PRIMARY_KEY}"},
                     json={"model": PRIMARY_MODEL, "messages": messages, "stream": True},
+                    timeout=_provider_timeout("primary", stream=True),
+                    extensions=ext,
                 ) as r:
                     if r.status_code >= 400:
                         _debug_log(f"primary stream status {r.status_code}")
@@ -377,12 +493,14 @@ async def chat_stream(messages):
     FALLBACK_KEY = _get_fallback_key()
     if not FALLBACK_KEY:
         return
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream(
+    async with _tracked("fallback") as ext:
+        async with get_client("fallback").stream(
             "POST",
             f"{FALLBACK_BASE}/chat/completions",
             headers={"Authorization": f"Bearer {FALLBACK_KEY}"},
             json={"model": FALLBACK_MODEL, "messages": messages, "stream": True},
+            timeout=_provider_timeout("fallback", stream=True),
+            extensions=ext,
         ) as r:
             r.raise_for_status()
             record(r.status_code, 0.0, provider="fallback")
@@ -7,7 +7,7 @@ from pathlib import Path
 import httpx
 from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from .actions import execute_plan, plan_actions
@@ -25,12 +25,12 @@ from .llm_client import (
     diag as llm_diag,
 )
 from .memory import recall, remember
-from .rag_ingest import ingest
 from .rag_query import QueryIn
-from .rag_query import rag_query as rag_query_direct
+from .rag_query import retrieve as rag_query_direct
 from .rag_query import router as rag_router
 from .router import route_query
 from .routers import rag_projects
+from .services import ingest_jobs
 from .tools import base as tools_base  # ensure registry is importable
 from .tools import (
     create_todo,
@@ -51,6 +51,7 @@ import time
 from fastapi import APIRouter
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from . import chat_cache, tracing
 from . import db as db_helpers
 from . import fts as fts_helpers
 from .analytics import router as analytics_router
@@ -63,6 +64,7 @@ from .ready import router as ready_router
 from .routes import llm as llm_routes
 from .routes import llm_latency as llm_latency_routes
 from .routes import status as status_routes
+from .routes import trace as trace_routes
 from .state import LAST_SERVED_BY, sse_dec, sse_inc
 
 try:
@@ -355,7 +357,20 @@ async def quick_ready():
 @_ping_router.get("/api/metrics")
 async def metrics_json():
     """Lightweight JSON metrics for embeddings/rerank/gen (counts, last latency, last backend)."""
-    return {"ok": True, "metrics": stage_snapshot()}
+    from . import answers_cache, chat_cache, memory
+    from .db import pool_stats, vec_cache_stats
+    from .services import analytics_events
+
+    return {
+        "ok": True,
+        "metrics": stage_snapshot(),
+        "db_pool": pool_stats(),
+        "vec_cache": vec_cache_stats(),
+        "analytics_events": analytics_events.stats(),
+        "memory": memory.stats(),
+        "answer_cache": chat_cache.stats(),
+        "answers_cache": answers_cache.stats(),
+    }
 
 
 @_ping_router.get("/api/metrics.csv")
@@ -382,6 +397,7 @@ app.include_router(llm_routes.router)
 app.include_router(health_router)
 app.include_router(llm_latency_routes.router)
 app.include_router(feedback_router)
+app.include_router(trace_routes.router)
 
 ## Startup logic migrated to lifespan context in lifespan.py
 
@@ -401,6 +417,29 @@ async def _metrics_middleware(request, call_next):
         record(status, duration_ms)
 
 
+@app.middleware("http")
+async def _trace_middleware(request, call_next):
+    # Root span for traced paths; chat() and helpers nest stage spans under it
+    if request.url.path not in tracing.TRACE_PATHS:
+        return await call_next(request)
+    tr = tracing.start(
+        request.url.path,
+        force=request.headers.get("x-trace") == "1",
+        method=request.method,
+    )
+    if tr is None:
+        return await call_next(request)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        timing = tracing.finish(tr, status=status)
+    response.headers["Server-Timing"] = timing
+    response.headers["X-Trace-Id"] = tr.id
+    return response
+
+
 # Conditional preflight (CORS) logging middleware
 if os.getenv("CORS_LOG_PREFLIGHT", "0") in {"1", "true", "TRUE", "yes", "on"}:
 
@@ -749,6 +788,24 @@ def _guess_source_url(path: str | None, ref: str | None = None) -> str | None:
         return None
 
 
+def _single_turn_question(req: ChatReq) -> str | None:
+    """The user's question when it opens the conversation (cacheable), else None."""
+    try:
+        roles = [m.get("role") for m in req.messages]
+        if roles.count("user") != 1 or "assistant" in roles:
+            return None
+        q = next(m.get("content") for m in req.messages if m.get("role") == "user")
+        return q if isinstance(q, str) and q.strip() else None
+    except Exception:
+        return None
+
+
+def _chat_model_key() -> str:
+    from . import llm_client as _llm
+
+    return f"{_llm.PRIMARY_MODEL}|{_llm.FALLBACK_MODEL}"
+
+
 def _is_affirmative(text: str | None) -> bool:
     try:
         t = (text or "").strip().lower()
@@ -841,46 +898,51 @@ async def chat(req: ChatReq):
     user_last = next((m for m in reversed(messages) if m.get("role") == "user"), None)
     sources: list[dict] = []
     grounded = False
-    # Always attempt retrieval on JSON path; harmless if empty
-    if user_last:
-        try:
-            matches = await fetch_context(user_last.get("content", ""), k=5)
-        except Exception:
-            matches = []
-        if matches:
+
+    async def _retrieve() -> None:
+        # Skipped when the answer cache already has this question
+        nonlocal messages, sources, grounded
+        # Always attempt retrieval on JSON path; harmless if empty
+        if user_last:
             try:
-                messages = [build_context_message(matches)] + messages
+                with tracing.span("retrieve"):
+                    matches = await fetch_context(user_last.get("content", ""), k=5)
             except Exception:
-                pass
-            # capture sources for response/meta
-            for m in matches or []:
-                path = m.get("path") or ""
-                sid = m.get("id") or ""
-                title = (
-                    m.get("title")
-                    or (_ospath.basename(path) if path else "")
-                    or sid
-                    or "Untitled"
-                )
-                url = _guess_source_url(path, m.get("ref"))
-                src: dict = {"title": title, "id": sid, "path": path}
-                if url:
-                    src["url"] = url
-                sources.append(src)
-            grounded = len(sources) > 0
-
-    # Test-mode backstop: guarantee at least one source for grounded fallback tests
-    from assistant_api.util.testmode import is_test_mode
-
-    if is_test_mode() and not sources:
-        sources = [
-            {
-                "title": "Test Fixture",
-                "url": "https://example.com/test",
-                "snippet": "Deterministic test source to satisfy grounded fallback.",
-            }
-        ]
-        grounded = True
+                matches = []
+            if matches:
+                try:
+                    messages = [build_context_message(matches)] + messages
+                except Exception:
+                    pass
+                # capture sources for response/meta
+                for m in matches or []:
+                    path = m.get("path") or ""
+                    sid = m.get("id") or ""
+                    title = (
+                        m.get("title")
+                        or (_ospath.basename(path) if path else "")
+                        or sid
+                        or "Untitled"
+                    )
+                    url = _guess_source_url(path, m.get("ref"))
+                    src: dict = {"title": title, "id": sid, "path": path}
+                    if url:
+                        src["url"] = url
+                    sources.append(src)
+                grounded = len(sources) > 0
+
+        # Test-mode backstop: guarantee at least one source for grounded fallback tests
+        from assistant_api.util.testmode import is_test_mode
+
+        if is_test_mode() and not sources:
+            sources = [
+                {
+                    "title": "Test Fixture",
+                    "url": "https://example.com/test",
+                    "snippet": "Deterministic test source to satisfy grounded fallback.",
+                }
+            ]
+            grounded = True
 
     def _ensure_followup_question(data: dict) -> dict:
         try:
@@ -915,7 +977,8 @@ async def chat(req: ChatReq):
                 break
     except Exception:
         user_text = ""
-    flagged, patterns = detect_injection(user_text)
+    with tracing.span("guardrails"):
+        flagged, patterns = detect_injection(user_text)
     guardrails_info = {
         "flagged": bool(flagged),
         "blocked": False,
@@ -969,7 +1032,8 @@ async def chat(req: ChatReq):
         route = None
         try:
             if question_txt:
-                route = route_query(question_txt)
+                with tracing.span("route"):
+                    route = route_query(question_txt)
         except Exception:
             route = None
         if question_txt:
@@ -983,9 +1047,35 @@ async def chat(req: ChatReq):
             "reason": getattr(route, "reason", None),
             "project_id": getattr(route, "project_id", None),
         }
-
+        tracing.annotate(route=scope["route"] or "chitchat")
+
+        # Answer cache: single-turn questions, keyed by route/project/model
+        cache_hit = None
+        cache_q = _single_turn_question(req)
+        cache_scope = None
+        if cache_q and chat_cache.enabled() and not flagged:
+            cache_scope = chat_cache.scope_key(
+                scope["route"], scope["project_id"], _chat_model_key(), req.context
+            )
+            with tracing.span("cache") as sp:
+                cache_hit = await chat_cache.get(cache_scope, cache_q)
+                if sp is not None:
+                    sp.set(hit=cache_hit.kind if cache_hit else None)
+        if cache_hit is None:
+            await _retrieve()
+        gen_t0 = time.perf_counter()
+
+        if cache_hit is not None:
+            data, tag = cache_hit.payload, cache_hit.tag
+            sources = data.get("sources") or []
+            grounded = bool(data.get("grounded"))
+            data["cache"] = {
+                "hit": cache_hit.kind,
+                "similarity": round(cache_hit.similarity, 4),
+                "saved_ms": round(cache_hit.saved_ms, 1),
+            }
         # Special handling: if assistant offered a case study and user said "yes", deliver concise case-study now
-        if _assistant_offered_case_study(messages) and _is_affirmative(
+        elif _assistant_offered_case_study(messages) and _is_affirmative(
             (user_last or {}).get("content")
         ):
             topic = _topic_from_messages(messages) or "LedgerMind"
@@ -1062,7 +1152,8 @@ async def chat(req: ChatReq):
                 # Apply routing branches when not in no-LLM mode
                 if route and route.route == "faq":
                     try:
-                        hit = faq_search_best(question_txt)
+                        with tracing.span("faq"):
+                            hit = faq_search_best(question_txt)
                         content = hit.a if hit else ""
                         sources = [
                             {
@@ -1100,7 +1191,8 @@ async def chat(req: ChatReq):
                         import time as _t
 
                         _t0 = _t.perf_counter()
-                        tag, resp = await llm_chat(messages, stream=False)
+                        with tracing.span("generate"):
+                            tag, resp = await llm_chat(messages, stream=False)
                         try:
                             from .metrics_analytics import (
                                 agent_latency as _agent_latency,
@@ -1124,13 +1216,14 @@ async def chat(req: ChatReq):
                             k = int(getattr(req, "k", 5))  # optional future param
                         except Exception:
                             k = 5
-                        res = await rag_query_direct(
-                            QueryIn(
-                                question=question_txt,
-                                k=k,
-                                project_id=getattr(route, "project_id", None),
+                        with tracing.span("rag"):
+                            res = await rag_query_direct(
+                                QueryIn(
+                                    question=question_txt,
+                                    k=k,
+                                    project_id=getattr(route, "project_id", None),
+                                )
                             )
-                        )
                         # Shape minimal assistant-like response if needed
                         data = {"ok": True, **res}
                         tag = "rag"
@@ -1138,7 +1231,8 @@ async def chat(req: ChatReq):
                         import time as _t
 
                         _t0 = _t.perf_counter()
-                        tag, resp = await llm_chat(messages, stream=False)
+                        with tracing.span("generate"):
+                            tag, resp = await llm_chat(messages, stream=False)
                         try:
                             from .metrics_analytics import (
                                 agent_latency as _agent_latency,
@@ -1183,8 +1277,9 @@ async def chat(req: ChatReq):
                         actions: dict | None = None
                         if looks_tooly(question_txt):
                             try:
-                                plan = await plan_actions(question_txt)
-                                actions = execute_plan(plan)
+                                with tracing.span("plan"):
+                                    plan = await plan_actions(question_txt)
+                                    actions = execute_plan(plan)
                             except Exception:
                                 actions = None
 
@@ -1195,9 +1290,10 @@ async def chat(req: ChatReq):
                         ):
                             # summarize tool result into a brief answer
                             try:
-                                summary, tag2 = await generate_brief_answer(
-                                    f"Summarize for user:\n{json.dumps(actions)[:4000]}\nKeep to 2-4 sentences with file paths and line numbers."
-                                )
+                                with tracing.span("generate"):
+                                    summary, tag2 = await generate_brief_answer(
+                                        f"Summarize for user:\n{json.dumps(actions)[:4000]}\nKeep to 2-4 sentences with file paths and line numbers."
+                                    )
                             except Exception:
                                 summary, tag2 = (
                                     "Here is what I found in the repo.",
@@ -1227,7 +1323,10 @@ async def chat(req: ChatReq):
                             }
                             tag = tag2 or "fallback"
                         else:
-                            content, tag2 = await generate_brief_answer(question_txt)
+                            with tracing.span("generate"):
+                                content, tag2 = await generate_brief_answer(
+                                    question_txt
+                                )
                             data = {
                                 "id": "chitchat-inline",
                                 "object": "chat.completion",
@@ -1254,7 +1353,8 @@ async def chat(req: ChatReq):
                         import time as _t
 
                         _t0 = _t.perf_counter()
-                        tag, resp = await llm_chat(messages, stream=False)
+                        with tracing.span("generate"):
+                            tag, resp = await llm_chat(messages, stream=False)
                         try:
                             from .metrics_analytics import (
                                 agent_latency as _agent_latency,
@@ -1375,6 +1475,17 @@ async def chat(req: ChatReq):
                 data["guardrails"] = guardrails_info
         except Exception:
             pass
+        if (
+            cache_scope is not None
+            and cache_hit is None
+            and tag != "case-study"
+            and data.get("content")
+        ):
+            try:
+                gen_ms = (time.perf_counter() - gen_t0) * 1000.0
+                await chat_cache.put(cache_scope, cache_q, data, tag, gen_ms)
+            except Exception:
+                pass
         return data
     except Exception as e:
         # Gather rich debug info when provider calls fail
@@ -1616,14 +1727,45 @@ async def chat_stream_ep(req: ChatReq):
 
 @app.post("/api/rag/ingest")
 @app.post("/rag/ingest")
-async def trigger_ingest(body: dict | None = None):
+async def trigger_ingest(body: dict | None = None, wait: bool = True):
+    """Run ingest as a background job (off the event loop).
+
+    By default the response waits for the job and returns its result (plus job_id);
+    with ?wait=false or {"async": true} it returns 202 and the job id to poll.
+    Identical concurrent requests are coalesced onto one job.
+    """
+    body = dict(body or {})
+    if body.pop("async", False):
+        wait = False
+    job, coalesced = ingest_jobs.submit(body)
+    if not wait:
+        return JSONResponse(
+            status_code=202,
+            content={
+                "ok": True,
+                "job_id": job.id,
+                "status": job.status,
+                "coalesced": coalesced,
+                "status_url": f"/api/rag/ingest/{job.id}",
+            },
+        )
     try:
-        result = await ingest(body or {})
-        return result
+        result = await ingest_jobs.wait(job)
+        return {**result, "job_id": job.id, "coalesced": coalesced}
     except Exception as e:
         # Return structured error to aid quick diagnosis
         return {
             "ok": False,
             "error": str(e),
             "hint": "Try dry_run=true or type=fs mode. You can also set reset=true once to clear broken state.",
+            "job_id": job.id,
         }
+
+
+@app.get("/api/rag/ingest/{job_id}")
+@app.get("/rag/ingest/{job_id}")
+async def ingest_job_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job.to_dict()
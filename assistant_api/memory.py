@@ -1,19 +1,303 @@
-from collections import deque
-from typing import Deque, Dict, List, Tuple
+"""Short-term conversation memory for /chat.
 
-# in-proc short-term memory: user_id -> deque of (role, content)
-_MAX = 12
-_mem: dict[str, deque[tuple[str, str]]] = {}
+Each user keeps the most recent messages that fit ``MEMORY_TOKEN_BUDGET``
+(estimated at ~4 chars per token), capped at ``MEMORY_MAX_MESSAGES``. The
+default in-process store is an LRU over users: at most ``MEMORY_MAX_USERS``
+sessions, and sessions idle for longer than ``MEMORY_TTL_S`` are dropped.
+``MEMORY_BACKEND=sqlite`` keeps the same windows in ``MEMORY_DB`` so several
+uvicorn workers share recall.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "memory").lower()
+MEMORY_DB = os.getenv("MEMORY_DB", "./data/memory.sqlite")
+MEMORY_MAX_USERS = int(os.getenv("MEMORY_MAX_USERS", "5000"))
+MEMORY_TTL_S = float(os.getenv("MEMORY_TTL_S", "3600"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+MEMORY_MAX_MESSAGES = int(os.getenv("MEMORY_MAX_MESSAGES", "24"))
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, (len(text or "") + 3) // 4)
+
+
+@dataclass
+class _Session:
+    messages: deque = field(default_factory=deque)  # (role, content, tokens)
+    tokens: int = 0
+    touched: float = field(default_factory=time.monotonic)
+
+
+class MemoryStore:
+    """In-process LRU of per-user token-budgeted message windows."""
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        max_users: int = MEMORY_MAX_USERS,
+        ttl_s: float = MEMORY_TTL_S,
+        token_budget: int = MEMORY_TOKEN_BUDGET,
+        max_messages: int = MEMORY_MAX_MESSAGES,
+    ):
+        self.max_users = max(1, max_users)
+        self.ttl_s = ttl_s
+        self.token_budget = token_budget
+        self.max_messages = max(1, max_messages)
+        self._lock = threading.Lock()
+        self._users: OrderedDict[str, _Session] = OrderedDict()
+        self._evicted = 0
+        self._expired = 0
+
+    def _sweep(self, now: float) -> None:
+        # LRU order is also idle order, so expired sessions sit at the front
+        while self._users:
+            uid, s = next(iter(self._users.items()))
+            if now - s.touched <= self.ttl_s:
+                break
+            del self._users[uid]
+            self._expired += 1
+
+    def remember(self, user_id: str, role: str, content: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            s = self._users.get(user_id)
+            if s is None:
+                s = self._users[user_id] = _Session()
+            self._users.move_to_end(user_id)
+            s.touched = now
+            n = approx_tokens(content)
+            s.messages.append((role, content, n))
+            s.tokens += n
+            # always keep the newest message, even if it alone exceeds the budget
+            while len(s.messages) > 1 and (
+                s.tokens > self.token_budget or len(s.messages) > self.max_messages
+            ):
+                s.tokens -= s.messages.popleft()[2]
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._evicted += 1
+
+    def recall(self, user_id: str) -> list[tuple[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            s = self._users.get(user_id)
+            if s is None:
+                return []
+            self._users.move_to_end(user_id)
+            s.touched = now
+            return [(role, content) for role, content, _ in s.messages]
+
+    def clear(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return {
+                "backend": self.backend,
+                "users": len(self._users),
+                "messages": sum(len(s.messages) for s in self._users.values()),
+                "tokens": sum(s.tokens for s in self._users.values()),
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "max_users": self.max_users,
+                "ttl_s": self.ttl_s,
+                "token_budget": self.token_budget,
+            }
+
+
+class SqliteMemoryStore(MemoryStore):
+    """Same windows and limits, persisted in SQLite and shared across workers."""
+
+    backend = "sqlite"
+    _SWEEP_EVERY_S = 30.0
+
+    def __init__(self, path: str | Path = MEMORY_DB, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self._con: sqlite3.Connection | None = None
+        self._last_sweep = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._con is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            with con:
+                con.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS memory_messages(
+                      id INTEGER PRIMARY KEY,
+                      user_id TEXT NOT NULL,
+                      role TEXT NOT NULL,
+                      content TEXT NOT NULL,
+                      tokens INTEGER NOT NULL
+                    )
+                    """
+                )
+                con.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_memory_user ON memory_messages(user_id, id)"
+                )
+                con.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS memory_sessions(
+                      user_id TEXT PRIMARY KEY,
+                      last_seen REAL NOT NULL
+                    )
+                    """
+                )
+                con.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_memory_seen ON memory_sessions(last_seen)"
+                )
+            self._con = con
+        return self._con
+
+    def _drop_users(self, con, where: str, args: tuple) -> int:
+        uids = [
+            r[0]
+            for r in con.execute(f"SELECT user_id FROM memory_sessions {where}", args)
+        ]
+        if uids:
+            con.executemany(
+                "DELETE FROM memory_messages WHERE user_id=?", [(u,) for u in uids]
+            )
+            con.executemany(
+                "DELETE FROM memory_sessions WHERE user_id=?", [(u,) for u in uids]
+            )
+        return len(uids)
+
+    def _sweep_db(self, con, now: float, force: bool = False) -> None:
+        if not force and now - self._last_sweep < self._SWEEP_EVERY_S:
+            return
+        self._last_sweep = now
+        self._expired += self._drop_users(
+            con, "WHERE last_seen < ?", (now - self.ttl_s,)
+        )
+        self._evicted += self._drop_users(
+            con,
+            "ORDER BY last_seen DESC LIMIT -1 OFFSET ?",
+            (self.max_users,),
+        )
+
+    def _absent_or_expired(self, con, user_id: str, now: float) -> bool:
+        row = con.execute(
+            "SELECT last_seen FROM memory_sessions WHERE user_id=?", (user_id,)
+        ).fetchone()
+        if row and now - row[0] > self.ttl_s:
+            self._expired += self._drop_users(con, "WHERE user_id=?", (user_id,))
+            return True
+        return row is None
+
+    def remember(self, user_id: str, role: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            con = self._db()
+            with con:
+                self._absent_or_expired(con, user_id, now)
+                con.execute(
+                    "INSERT INTO memory_messages(user_id, role, content, tokens) VALUES(?,?,?,?)",
+                    (user_id, role, content, approx_tokens(content)),
+                )
+                con.execute(
+                    "REPLACE INTO memory_sessions(user_id, last_seen) VALUES(?,?)",
+                    (user_id, now),
+                )
+                keep, total = 0, 0
+                rows = con.execute(
+                    "SELECT id, tokens FROM memory_messages WHERE user_id=? ORDER BY id DESC",
+                    (user_id,),
+                ).fetchall()
+                for _, n in rows:
+                    if keep and (
+                        total + n > self.token_budget or keep >= self.max_messages
+                    ):
+                        break
+                    keep += 1
+                    total += n
+                if keep < len(rows):
+                    con.execute(
+                        "DELETE FROM memory_messages WHERE user_id=? AND id<=?",
+                        (user_id, rows[keep][0]),
+                    )
+                self._sweep_db(con, now)
+
+    def recall(self, user_id: str) -> list[tuple[str, str]]:
+        now = time.time()
+        with self._lock:
+            con = self._db()
+            with con:
+                if self._absent_or_expired(con, user_id, now):
+                    return []
+                con.execute(
+                    "UPDATE memory_sessions SET last_seen=? WHERE user_id=?",
+                    (now, user_id),
+                )
+                return [
+                    (r[0], r[1])
+                    for r in con.execute(
+                        "SELECT role, content FROM memory_messages WHERE user_id=? ORDER BY id",
+                        (user_id,),
+                    )
+                ]
+
+    def clear(self, user_id: str) -> None:
+        with self._lock:
+            con = self._db()
+            with con:
+                self._drop_users(con, "WHERE user_id=?", (user_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            con = self._db()
+            with con:
+                self._sweep_db(con, time.time(), force=True)
+            users = con.execute("SELECT COUNT(*) FROM memory_sessions").fetchone()[0]
+            msgs, tokens = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM memory_messages"
+            ).fetchone()
+            return {
+                "backend": self.backend,
+                "users": users,
+                "messages": msgs,
+                "tokens": tokens,
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "max_users": self.max_users,
+                "ttl_s": self.ttl_s,
+                "token_budget": self.token_budget,
+            }
+
+
+_store: MemoryStore = (
+    SqliteMemoryStore(MEMORY_DB) if MEMORY_BACKEND == "sqlite" else MemoryStore()
+)
 
 
 def remember(user_id: str, role: str, content: str) -> None:
-    q = _mem.setdefault(user_id, deque(maxlen=_MAX))
-    q.append((role, content))
+    _store.remember(user_id, role, content)
 
 
 def recall(user_id: str) -> list[tuple[str, str]]:
-    return list(_mem.get(user_id, []))
+    return _store.recall(user_id)
 
 
 def clear(user_id: str) -> None:
-    _mem.pop(user_id, None)
+    _store.clear(user_id)
+
+
+def stats() -> dict:
+    return _store.stats()
@@ -1,17 +1,11 @@
 import threading
 import time
-from collections import Counter, defaultdict, deque
+from collections import Counter, defaultdict
 from typing import Deque, Tuple
 
-_lock = threading.Lock()
-_events: deque[tuple[float, int, float, str, int, int]] = deque(
-    maxlen=5000
-)  # (ts, status, ms, provider, in_toks, out_toks)
-# Recent latency window (lightweight) for status summary (default ~ last 200 requests)
-_recent_lat: deque[float] = deque(maxlen=200)
-_recent_lat_by_provider: dict[str, deque[float]] = defaultdict(
-    lambda: deque(maxlen=200)
-)
+from .latency_hist import all_series, register_prometheus, series
+
+_lock = threading.Lock()  # counters/totals only; latency series lock per histogram
 _totals = defaultdict(int)
 router_route_total = Counter()
 
@@ -19,6 +13,12 @@ router_route_total = Counter()
 # NB: We retain legacy snapshot aggregation so external API stays stable.
 providers = Counter()  # overall provider request counts (primary, fallback, etc.)
 primary_fail_reason = Counter()  # classification for primary failures
+# Pooled LLM HTTP clients (llm_client): per-provider requests/connects/pool_timeouts
+# counters and in_flight/max_in_flight/max_connections gauges
+llm_pool: dict[str, Counter] = defaultdict(Counter)
+# /chat answer cache (chat_cache): hits_exact/hits_semantic/misses/stores,
+# expired/evicted/invalidated and saved_ms (generation time not spent)
+answer_cache = Counter()
 # Pre-create a guardrails bucket in providers-style counters for easy bumps
 try:
     providers["guardrails-flagged"] += 0
@@ -27,27 +27,10 @@ except Exception:
     pass
 
 
-class RollingP95:
-    """Lightweight rolling P95 window for optional per-route latencies."""
-
-    def __init__(self, n: int = 50):
-        self.n = n
-        self.samples: list[float] = []
-
-    def observe(self, v: float):
-        self.samples.append(v)
-        if len(self.samples) > self.n:
-            self.samples = self.samples[-self.n :]
-
-    def value(self) -> float:
-        if not self.samples:
-            return 0.0
-        arr = sorted(self.samples)
-        idx = int(0.95 * (len(arr) - 1))
-        return float(arr[idx])
-
-
-route_p95 = defaultdict(lambda: RollingP95(50))
+# Latency windows served by recent_latency_stats*/snapshot (see latency_hist.WINDOWS)
+RECENT_WINDOW = "5m"
+SNAPSHOT_WINDOW = "1h"
+register_prometheus()
 
 
 def record(
@@ -58,11 +41,15 @@ def record(
     out_toks: int = 0,
     route: str | None = None,
 ):
+    prov = provider or "-"
+    now = time.time()
+    series("all", "-").record(ms, now)
+    if prov != "-":
+        series("provider", prov).record(ms, now)
+    # chat() bumps the router counter with ms=0.0; only real timings are sampled
+    if route and ms > 0:
+        series("route", route).record(ms, now)
     with _lock:
-        prov = provider or "-"
-        _events.append((time.time(), status, ms, prov, in_toks, out_toks))
-        _recent_lat.append(ms)
-        _recent_lat_by_provider[prov].append(ms)
         _totals["req"] += 1
         if status >= 500:
             _totals["5xx"] += 1
@@ -72,21 +59,24 @@ def record(
         _totals["tok:in"] += int(in_toks)
         _totals["tok:out"] += int(out_toks)
         if route:
-            try:
-                route_p95[route].observe(ms)
-                router_route_total[route] += 1
-            except Exception:
-                pass
+            router_route_total[route] += 1
+
+
+def answer_cache_snapshot() -> dict:
+    c = dict(answer_cache)
+    hits = c.get("hits_exact", 0) + c.get("hits_semantic", 0)
+    total = hits + c.get("misses", 0)
+    c["hit_ratio"] = round(hits / total, 4) if total else 0.0
+    return c
 
 
 def snapshot():
+    p95 = series("all", "-").quantile(0.95, SNAPSHOT_WINDOW)
+    route_p95 = {
+        name: round(h.quantile(0.95, SNAPSHOT_WINDOW), 1)
+        for (_, name), h in all_series("route").items()
+    }
     with _lock:
-        latencies = [ms for _, _, ms, _, _, _ in _events]
-        p95 = 0.0
-        if latencies:
-            s = sorted(latencies)
-            idx = max(0, int(0.95 * len(s)) - 1)
-            p95 = s[idx]
         providers_legacy = {
             k.split("by_provider:")[1].split(":")[0]: v
             for k, v in _totals.items()
@@ -98,6 +88,10 @@ def snapshot():
             merged_providers[k] = v
         # Optional: expose top failure reasons (keep small)
         top_fail = dict(primary_fail_reason.most_common(8))
+        pools = {
+            p: {**c, "reused": max(0, c["requests"] - c["connects"])}
+            for p, c in llm_pool.items()
+        }
         return {
             "req": _totals.get("req", 0),
             "5xx": _totals.get("5xx", 0),
@@ -107,88 +101,25 @@ def snapshot():
             "providers": merged_providers,
             "primary_fail_reason": top_fail,
             "router": dict(router_route_total),
+            "route_p95_ms": route_p95,
+            "llm_pool": pools,
+            "answer_cache": answer_cache_snapshot(),
         }
 
 
-def recent_latency_stats() -> dict:
-    """Return rolling latency distribution for last N requests (cheap computation)."""
-    with _lock:
-        data = list(_recent_lat)
-    if not data:
-        return {
-            "count": 0,
-            "min_ms": 0.0,
-            "p50_ms": 0.0,
-            "p95_ms": 0.0,
-            "p99_ms": 0.0,
-            "max_ms": 0.0,
-            "avg_ms": 0.0,
-        }
-    s = sorted(data)
-
-    def _pct(p: float):
-        if not s:
-            return 0.0
-        k = (len(s) - 1) * (p / 100.0)
-        f = int(k)
-        c = min(f + 1, len(s) - 1)
-        if f == c:
-            return s[f]
-        return s[f] + (s[c] - s[f]) * (k - f)
-
-    import statistics as _st
-
-    return {
-        "count": len(s),
-        "min_ms": s[0],
-        "p50_ms": _pct(50.0),
-        "p95_ms": _pct(95.0),
-        "p99_ms": _pct(99.0),
-        "max_ms": s[-1],
-        "avg_ms": _st.fmean(s),
-    }
+def recent_latency_stats(window: str = RECENT_WINDOW) -> dict:
+    """Latency distribution over the last ``window`` (1m/5m/1h) of requests."""
+    return series("all", "-").stats(window)
 
 
-def recent_latency_stats_by_provider() -> dict:
-    """Return rolling latency stats split by provider (primary, fallback, etc.)."""
-    with _lock:
-        snap = {k: list(v) for k, v in _recent_lat_by_provider.items()}
-    out: dict[str, dict] = {}
-    import statistics as _st
-
-    def _dist(arr: list[float]):
-        if not arr:
-            return {
-                "count": 0,
-                "min_ms": 0.0,
-                "p50_ms": 0.0,
-                "p95_ms": 0.0,
-                "p99_ms": 0.0,
-                "max_ms": 0.0,
-                "avg_ms": 0.0,
-            }
-        s = sorted(arr)
-
-        def _pct(p: float):
-            k = (len(s) - 1) * (p / 100.0)
-            f = int(k)
-            c = min(f + 1, len(s) - 1)
-            return s[f] if f == c else s[f] + (s[c] - s[f]) * (k - f)
+def recent_latency_stats_by_provider(window: str = RECENT_WINDOW) -> dict:
+    """Rolling latency stats split by provider (primary, fallback, etc.)."""
+    return {name: h.stats(window) for (_, name), h in all_series("provider").items()}
 
-        return {
-            "count": len(s),
-            "min_ms": s[0],
-            "p50_ms": _pct(50.0),
-            "p95_ms": _pct(95.0),
-            "p99_ms": _pct(99.0),
-            "max_ms": s[-1],
-            "avg_ms": _st.fmean(s),
-        }
 
-    for prov, arr in snap.items():
-        if prov != "-":
-            out[prov] = _dist(arr)
-    return out
+def route_latency_stats(window: str = RECENT_WINDOW) -> dict:
+    """Rolling latency stats per router route (rag, faq, chitchat, ...)."""
+    return {name: h.stats(window) for (_, name), h in all_series("route").items()}
 
 
 # ---------------- Stage metrics (embeddings/rerank/gen) -----------------------
@@ -199,6 +130,7 @@ _STAGE_METRICS = {
     "embeddings": {"count": 0, "last_ms": None, "last_backend": None},
     "rerank": {"count": 0, "last_ms": None, "last_backend": None},
     "gen": {"count": 0, "last_ms": None, "last_backend": None},
+    "retrieval": {"count": 0, "last_ms": None, "last_backend": None},
 }
 
 
@@ -225,6 +157,20 @@ def stage_record_ms(stage: str, backend: str, ms: float) -> None:
         pass
 
 
+def stage_annotate(stage: str, **fields) -> None:
+    """Attach extra gauge-style fields (e.g. bytes, rows) to a stage entry.
+
+    Keeps the count/last_ms/last_backend shape intact so CSV/JSON views still work.
+    """
+    try:
+        m = _STAGE_METRICS.setdefault(
+            stage, {"count": 0, "last_ms": None, "last_backend": None}
+        )
+        m.update(fields)
+    except Exception:
+        pass
+
+
 @contextmanager
 def timer(stage: str, backend: str):
     t0 = time.perf_counter()
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 page_views = Counter(
     "page_view_total",
@@ -79,3 +79,10 @@ page_view_by_dow_hour_path_device = Counter(
     "Page views bucketed by DOW (0..6), hour (00..23), low-cardinality path_group, and device",
     ["dow", "hour", "path_group", "device"],
 )
+
+# Distinct label sets per analytics metric (see analytics_labels); alert on growth
+label_series = Gauge(
+    "analytics_label_series",
+    "Distinct label combinations emitted per analytics metric",
+    ["metric"],
+)
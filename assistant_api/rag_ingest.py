@@ -15,7 +15,14 @@ from dotenv import load_dotenv
 
 from .chunker import chunk_markdown, html_to_text
 from .chunkers import chunk_for_path
-from .db import DB_PATH, commit_with_retry, connect, upsert_doc, upsert_vec
+from .db import (
+    DB_PATH,
+    commit_with_retry,
+    connect,
+    reset_pool,
+    upsert_docs,
+    upsert_vecs,
+)
 
 try:
     import yaml  # type: ignore
@@ -71,6 +78,7 @@ def file_list(repo_dir):
 
 def _reset_index():
     # Remove DB file to clear incompatible schemas/dimensions
+    reset_pool()
     try:
         if os.path.exists(DB_PATH):
             os.remove(DB_PATH)
@@ -210,7 +218,175 @@ def _match_project_id(projects: list[dict[str, Any]], file_path: str) -> str:
     return ""
 
 
-async def ingest(req: dict | None = None):
+def _report(progress, event: str, **fields) -> None:
+    """Best-effort progress callback (used by services.ingest_jobs)."""
+    if progress is None:
+        return
+    try:
+        progress(event, fields)
+    except Exception:
+        pass
+
+
+def _invalidate_answers(conn, stats: dict, reset: bool) -> None:
+    """Drop cached RAG and /chat answers when this run changed the corpus."""
+    if not reset and not any(stats.get(k) for k in ("added", "updated", "deleted")):
+        return
+    from .answers_cache import invalidate
+
+    invalidate(con=conn)
+    commit_with_retry(conn, retries=6)
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()
+
+
+def _embed_tag() -> str:
+    """Identify the embedding backend so a model switch re-embeds everything."""
+    return f"st:{MODEL_I}" if _model is not None else "hash:256"
+
+
+class _Manifest:
+    """Per-file content hashes and chunk ids from previous ingests.
+
+    Rows live in ``ingest_manifest`` keyed by (source, path); ``docs.sha`` holds
+    the sha1 of each chunk's text so unchanged chunks can keep their embedding.
+    """
+
+    def __init__(self, conn, embed_tag: str, batch: int | None = None):
+        self.conn = conn
+        self.embed_tag = embed_tag
+        self.batch = max(1, batch or int(os.getenv("EMBED_BATCH", "256")))
+        # files queued for the next flush: (source, path, file_hash, rows, stale ids)
+        self._pending: list[tuple[str, str, str, list[dict], list[str]]] = []
+        self._todo: dict[str, str] = {}  # chunk sha -> text awaiting embedding
+        self._known: dict[str, np.ndarray] = {}  # chunk sha -> embedding
+        self.stats = {
+            "skipped": 0,
+            "added": 0,
+            "updated": 0,
+            "deleted": 0,
+            "embedded": 0,
+            "reused": 0,
+        }
+
+    def get(self, source: str, path: str) -> dict | None:
+        row = self.conn.execute(
+            "SELECT file_hash, embed, chunk_ids FROM ingest_manifest WHERE source=? AND path=?",
+            (source, path),
+        ).fetchone()
+        if not row:
+            return None
+        return {"file_hash": row[0], "embed": row[1], "chunk_ids": json.loads(row[2])}
+
+    def unchanged(self, source: str, path: str, file_hash: str) -> bool:
+        prev = self.get(source, path)
+        if prev and prev["file_hash"] == file_hash and prev["embed"] == self.embed_tag:
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def _stored(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """chunk text sha -> stored embedding for the given doc ids."""
+        out: dict[str, np.ndarray] = {}
+        for sha, blob in self.conn.execute(
+            "SELECT d.sha, v.embedding FROM docs d JOIN vecs v ON v.id = d.id "
+            "WHERE d.id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),),
+        ):
+            if sha and blob:
+                out[sha] = np.frombuffer(blob, dtype=np.float32)
+        return out
+
+    def _drop(self, ids) -> None:
+        ids = json.dumps(list(ids))
+        self.conn.execute(
+            "DELETE FROM docs WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+        )
+        self.conn.execute(
+            "DELETE FROM vecs WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+        )
+
+    async def sync_file(
+        self, source: str, path: str, file_hash: str, rows: list[dict]
+    ) -> int:
+        """Queue one file's chunk rows (``docs`` rows without ``sha``).
+
+        Texts not stored before are embedded in ``EMBED_BATCH``-sized batches
+        across files by ``flush``; chunks of the previous version that no
+        longer exist are deleted then. Returns the number of chunks queued.
+        """
+        prev = self.get(source, path)
+        old_ids = prev["chunk_ids"] if prev else []
+        stored: dict[str, np.ndarray] = {}
+        if old_ids and prev["embed"] == self.embed_tag:
+            stored = self._stored(old_ids)
+        for row in rows:
+            sha = row["sha"] = _sha1(row["text"])
+            if sha in stored:
+                self._known[sha] = stored[sha]
+                self.stats["reused"] += 1
+            elif sha in self._known or sha in self._todo:
+                self.stats["reused"] += 1
+            else:
+                self._todo[sha] = row["text"]
+        new_ids = {row["id"] for row in rows}
+        stale = [i for i in old_ids if i not in new_ids]
+        self._pending.append((source, path, file_hash, rows, stale))
+        self.stats["updated" if prev else "added"] += 1
+        if len(self._todo) >= self.batch:
+            await self.flush()
+        return len(rows)
+
+    async def flush(self) -> None:
+        """Embed queued texts in fixed-size batches and write the queued files
+        with bulk statements in one transaction."""
+        if not self._pending:
+            return
+        shas = list(self._todo)
+        for i in range(0, len(shas), self.batch):
+            part = shas[i : i + self.batch]
+            embs = await embed([self._todo[s] for s in part])
+            self._known.update(zip(part, embs))
+        self.stats["embedded"] += len(shas)
+        rows = [row for _, _, _, file_rows, _ in self._pending for row in file_rows]
+        upsert_docs(self.conn, rows)
+        upsert_vecs(self.conn, [(row["id"], self._known[row["sha"]]) for row in rows])
+        self._drop([i for *_, stale in self._pending for i in stale])
+        now = time.time()
+        self.conn.executemany(
+            "REPLACE INTO ingest_manifest(source, path, file_hash, embed, chunk_ids, updated_at) "
+            "VALUES(?,?,?,?,?,?)",
+            [
+                (src, path, fh, self.embed_tag, json.dumps([r["id"] for r in rs]), now)
+                for src, path, fh, rs, _ in self._pending
+            ],
+        )
+        commit_with_retry(self.conn, retries=6)
+        self._pending.clear()
+        self._todo.clear()
+        self._known.clear()
+
+    def prune(self, source: str, seen: set[str]) -> int:
+        """Remove rows for files of ``source`` not seen in this run (deleted or
+        no longer matched by the include globs)."""
+        gone = []
+        for path, chunk_ids in self.conn.execute(
+            "SELECT path, chunk_ids FROM ingest_manifest WHERE source=?", (source,)
+        ).fetchall():
+            if path not in seen:
+                self._drop(json.loads(chunk_ids))
+                gone.append(path)
+        for path in gone:
+            self.conn.execute(
+                "DELETE FROM ingest_manifest WHERE source=? AND path=?", (source, path)
+            )
+        self.stats["deleted"] += len(gone)
+        return len(gone)
+
+
+async def ingest(req: dict | None = None, progress=None):
     """Flexible ingest.
 
     req schema:
@@ -222,6 +398,7 @@ async def ingest(req: dict | None = None):
         {"type":"git","url":"https://...","ref":"main","include":[...]}]
     }
     If req is None, falls back to env RAG_REPOS (git shorthand: owner/repo).
+    ``progress(event, fields)`` is called with "source", "files" and "file" events.
     """
     if req is None:
         req = {}
@@ -251,9 +428,13 @@ async def ingest(req: dict | None = None):
                 )
         return {"ok": True, "dry_run": True, "preview": preview}
 
+    # Settle the embedding backend first (before taking a pooled connection):
+    # the manifest keys reuse on it
+    await embed(["warmup"])
     conn = connect()
     total_chunks = 0
     used = []
+    man = _Manifest(conn, _embed_tag())
     try:
         # If no repos provided, use RAG_REPOS (git shorthand)
         if not repos:
@@ -261,6 +442,7 @@ async def ingest(req: dict | None = None):
                 r.strip() for r in os.getenv("RAG_REPOS", "").split(",") if r.strip()
             ]
             for repo in env_repos:
+                _report(progress, "source", type="git", repo=repo)
                 with tempfile.TemporaryDirectory() as tmp:
                     dst = os.path.join(tmp, repo.replace("/", "__"))
                     subprocess.run(
@@ -274,41 +456,57 @@ async def ingest(req: dict | None = None):
                         ],
                         check=True,
                     )
-                    for p in file_list(dst):
+                    files = list(file_list(dst))
+                    _report(progress, "files", total=len(files))
+                    seen: set[str] = set()
+                    before = dict(man.stats)
+                    for p in files:
                         rel = os.path.relpath(p, dst)
+                        _report(progress, "file", path=rel)
                         try:
                             content = open(p, encoding="utf-8", errors="ignore").read()
                         except Exception:
                             continue
-                        chunks = chunk_for_path(rel, content) or []
-                        if not chunks:
+                        seen.add(rel)
+                        fh = _sha1(content)
+                        if man.unchanged(repo, rel, fh):
                             continue
-                        embs = await embed(chunks)
-                        for i, (ck, em) in enumerate(zip(chunks, embs)):
-                            did = hashlib.sha1(f"{repo}:{rel}:{i}".encode()).hexdigest()
-                            upsert_doc(
-                                conn,
-                                {
-                                    "id": did,
-                                    "repo": repo,
-                                    "path": rel,
-                                    "sha": "head",
-                                    "title": rel,
-                                    "text": ck,
-                                    "meta": {"repo": repo, "path": rel, "i": i},
-                                },
-                            )
-                            upsert_vec(conn, did, em)
-                            total_chunks += 1
-                    used.append({"type": "git", "repo": repo})
+                        chunks = chunk_for_path(rel, content) or []
+                        rows = [
+                            {
+                                "id": hashlib.sha1(
+                                    f"{repo}:{rel}:{i}".encode()
+                                ).hexdigest(),
+                                "repo": repo,
+                                "path": rel,
+                                "title": rel,
+                                "text": ck,
+                                "meta": {"repo": repo, "path": rel, "i": i},
+                            }
+                            for i, ck in enumerate(chunks)
+                        ]
+                        total_chunks += await man.sync_file(repo, rel, fh, rows)
+                    await man.flush()
+                    man.prune(repo, seen)
+                    used.append(
+                        {
+                            "type": "git",
+                            "repo": repo,
+                            **{k: man.stats[k] - before[k] for k in before},
+                        }
+                    )
             commit_with_retry(conn, retries=6)
-            return {"ok": True, "chunks": total_chunks, "sources": used}
+            _invalidate_answers(conn, man.stats, reset)
+            return {"ok": True, "chunks": total_chunks, "sources": used, **man.stats}
 
         # Structured repos: kb, fs or git
         with tempfile.TemporaryDirectory() as tmp:
             kb_projects: list[dict[str, Any]] = []
             for r in repos:
                 rtype = (r or {}).get("type", "fs")
+                _report(
+                    progress, "source", type=rtype, path=r.get("path"), url=r.get("url")
+                )
                 if rtype == "kb":
                     # Load structured KB definitions and optionally persist to DB
                     try:
@@ -333,6 +531,7 @@ async def ingest(req: dict | None = None):
                     continue
                 if rtype == "fs":
                     base = os.path.abspath(r.get("path") or ".")
+                    source = f"fs:{base}"
                     includes = r.get("include") or [
                         "README.md",
                         "docs/**/*.md",
@@ -341,12 +540,25 @@ async def ingest(req: dict | None = None):
                         "docs/ARCHITECTURE.md",
                     ]
                     files = _collect_fs_files(base, includes)
+                    _report(progress, "files", total=len(files))
+                    seen = set()
+                    before = dict(man.stats)
                     for fp in files:
                         rel = os.path.relpath(fp, base)
+                        _report(progress, "file", path=rel)
                         try:
                             content = open(fp, encoding="utf-8", errors="ignore").read()
                         except Exception:
                             continue
+                        seen.add(rel)
+                        # Optional project tagging based on KB patterns
+                        project_id = (
+                            _match_project_id(kb_projects, rel) if kb_projects else ""
+                        )
+                        # project tag is part of the stored meta, so part of the hash
+                        fh = _sha1(f"{project_id}\0{content}")
+                        if man.unchanged(source, rel, fh):
+                            continue
                         # Enhanced chunking and titles
                         ext = os.path.splitext(fp)[1].lower()
                         if ext in (".md", ".mdx"):
@@ -359,42 +571,40 @@ async def ingest(req: dict | None = None):
                             chunk_objs = [
                                 {"title": rel, "content": ck} for ck in parts_fallback
                             ]
-                        if not chunk_objs:
-                            continue
-                        parts = [c.get("content", "") for c in chunk_objs]
-                        titles = [c.get("title") or rel for c in chunk_objs]
-                        embs = await embed(parts)
-                        # Optional project tagging based on KB patterns
-                        project_id = (
-                            _match_project_id(kb_projects, rel) if kb_projects else ""
-                        )
-                        for i, (ck, em, ttl) in enumerate(zip(parts, embs, titles)):
-                            did = hashlib.sha1(
-                                f"fs:{base}:{rel}:{i}".encode()
-                            ).hexdigest()
+                        rows = []
+                        for i, c in enumerate(chunk_objs):
                             meta = {"path": rel, "base": base, "i": i}
                             if project_id:
                                 meta["project_id"] = project_id
-                            upsert_doc(
-                                conn,
+                            rows.append(
                                 {
-                                    "id": did,
+                                    "id": hashlib.sha1(
+                                        f"fs:{base}:{rel}:{i}".encode()
+                                    ).hexdigest(),
                                     "repo": "local-fs",
                                     "path": rel,
-                                    "sha": "fs",
-                                    "title": ttl,
-                                    "text": ck,
+                                    "title": c.get("title") or rel,
+                                    "text": c.get("content", ""),
                                     "meta": meta,
-                                },
+                                }
                             )
-                            upsert_vec(conn, did, em)
-                            total_chunks += 1
-                    used.append({"type": "fs", "path": base, "count": len(files)})
+                        total_chunks += await man.sync_file(source, rel, fh, rows)
+                    await man.flush()
+                    man.prune(source, seen)
+                    used.append(
+                        {
+                            "type": "fs",
+                            "path": base,
+                            "count": len(files),
+                            **{k: man.stats[k] - before[k] for k in before},
+                        }
+                    )
                 elif rtype == "git":
                     url = r.get("url")
                     ref = r.get("ref") or "HEAD"
                     if not url:
                         continue
+                    source = f"git:{url}"
                     dst = os.path.join(tmp, hashlib.sha1(url.encode()).hexdigest()[:8])
                     try:
                         subprocess.run(
@@ -411,39 +621,49 @@ async def ingest(req: dict | None = None):
                         continue
                     includes = r.get("include") or ["**/*.md"]
                     files = _collect_fs_files(dst, includes)
+                    _report(progress, "files", total=len(files))
+                    seen = set()
+                    before = dict(man.stats)
                     for fp in files:
                         rel = os.path.relpath(fp, dst)
+                        _report(progress, "file", path=rel)
                         try:
                             content = open(fp, encoding="utf-8", errors="ignore").read()
                         except Exception:
                             continue
-                        chunks = chunk_for_path(rel, content) or []
-                        if not chunks:
+                        seen.add(rel)
+                        fh = _sha1(content)
+                        if man.unchanged(source, rel, fh):
                             continue
-                        embs = await embed(chunks)
-                        for i, (ck, em) in enumerate(zip(chunks, embs)):
-                            did = hashlib.sha1(
-                                f"git:{url}:{rel}:{i}".encode()
-                            ).hexdigest()
-                            upsert_doc(
-                                conn,
-                                {
-                                    "id": did,
-                                    "repo": url,
-                                    "path": rel,
-                                    "sha": ref,
-                                    "title": rel,
-                                    "text": ck,
-                                    "meta": {"url": url, "path": rel, "i": i},
-                                },
-                            )
-                            upsert_vec(conn, did, em)
-                            total_chunks += 1
+                        chunks = chunk_for_path(rel, content) or []
+                        rows = [
+                            {
+                                "id": hashlib.sha1(
+                                    f"git:{url}:{rel}:{i}".encode()
+                                ).hexdigest(),
+                                "repo": url,
+                                "path": rel,
+                                "title": rel,
+                                "text": ck,
+                                "meta": {"url": url, "ref": ref, "path": rel, "i": i},
+                            }
+                            for i, ck in enumerate(chunks)
+                        ]
+                        total_chunks += await man.sync_file(source, rel, fh, rows)
+                    await man.flush()
+                    man.prune(source, seen)
                     used.append(
-                        {"type": "git", "url": url, "ref": ref, "count": len(files)}
+                        {
+                            "type": "git",
+                            "url": url,
+                            "ref": ref,
+                            "count": len(files),
+                            **{k: man.stats[k] - before[k] for k in before},
+                        }
                     )
             commit_with_retry(conn, retries=6)
-        return {"ok": True, "chunks": total_chunks, "sources": used}
+        _invalidate_answers(conn, man.stats, reset)
+        return {"ok": True, "chunks": total_chunks, "sources": used, **man.stats}
     finally:
         try:
             conn.close()
@@ -1,8 +1,11 @@
+import asyncio
 import hashlib
 import json
 import math
 import os
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List
 
@@ -10,9 +13,11 @@ import numpy as np
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
-from .db import connect, index_dim, search
+from . import answers_cache, tracing
+from .db import connect, index_dim, search, table_columns
 from .fts import _sanitize_match_query, bm25_search
 from .guardrails import sanitize_snippet
+from .metrics import stage_annotate, stage_record_ms, timer
 from .reranker import rerank
 from .vector_store import dense_search
 
@@ -22,6 +27,14 @@ router = APIRouter()
 RAG_ENABLE_CACHE: bool = os.getenv("RAG_ENABLE_CACHE", "1") != "0"
 RAG_ENABLE_FUSION: bool = os.getenv("RAG_ENABLE_FUSION", "1") != "0"
 MAX_LIMIT: int = int(os.getenv("RAG_MAX_LIMIT", "100"))
+# Recall stage: BM25 and dense run concurrently on a bounded pool; a branch that
+# misses its budget contributes nothing and the query goes on with the other.
+RAG_RECALL_WORKERS: int = int(os.getenv("RAG_RECALL_WORKERS", "4"))
+RAG_BM25_TIMEOUT_MS: float = float(os.getenv("RAG_BM25_TIMEOUT_MS", "1500"))
+RAG_DENSE_TIMEOUT_MS: float = float(os.getenv("RAG_DENSE_TIMEOUT_MS", "2500"))
+
+_recall_executor: ThreadPoolExecutor | None = None
+_recall_failures: Counter = Counter()  # (branch, "timeout"|"error") -> n
 
 
 class QueryIn(BaseModel):
@@ -90,51 +103,187 @@ async def embed_query_matching_dim(
         return _hash_embed(text, dim), "local-fallback"
 
 
+def _recall_pool() -> ThreadPoolExecutor:
+    global _recall_executor
+    if _recall_executor is None:
+        _recall_executor = ThreadPoolExecutor(
+            max_workers=max(2, RAG_RECALL_WORKERS), thread_name_prefix="rag-recall"
+        )
+    return _recall_executor
+
+
+def shutdown_recall() -> None:
+    global _recall_executor
+    if _recall_executor is not None:
+        _recall_executor.shutdown(wait=False, cancel_futures=True)
+        _recall_executor = None
+
+
+async def _recall_branch(
+    name: str, fn, question: str, timeout_ms: float
+) -> tuple[list[int], dict]:
+    t0 = time.perf_counter()
+    fut = asyncio.get_running_loop().run_in_executor(_recall_pool(), fn, question, 50)
+    with tracing.span(f"recall_{name}") as sp:
+        try:
+            ids = list(await asyncio.wait_for(fut, timeout=timeout_ms / 1000.0))
+            status = "ok"
+        except TimeoutError:
+            # The worker finishes in the background; its result is dropped
+            ids, status = [], "timeout"
+        except Exception:
+            ids, status = [], "error"
+        if sp is not None:
+            sp.set(status=status, hits=len(ids))
+    ms = (time.perf_counter() - t0) * 1000.0
+    stage = f"recall_{name}"
+    stage_record_ms(stage, status, ms)
+    if status != "ok":
+        _recall_failures[(name, status)] += 1
+        stage_annotate(stage, **{f"{status}s": _recall_failures[(name, status)]})
+    return ids, {"ms": round(ms, 2), "status": status, "hits": len(ids)}
+
+
+async def _recall(question: str) -> tuple[list[int], list[int], dict]:
+    """BM25 + dense recall in parallel; returns (bm25_ids, dense_ids, meta)."""
+    (bm, bm_meta), (dn, dn_meta) = await asyncio.gather(
+        _recall_branch("bm25", bm25_search, question, RAG_BM25_TIMEOUT_MS),
+        _recall_branch("dense", dense_search, question, RAG_DENSE_TIMEOUT_MS),
+    )
+    return bm, dn, {"bm25": bm_meta, "dense": dn_meta}
+
+
 def _qkey(project_ids: list[str], q: str) -> tuple[str, str]:
     pj = ",".join(sorted(project_ids or []))
     return pj, hashlib.sha1((pj + "|" + q).encode()).hexdigest()
 
 
 def _get_cache(con, pj: str, h: str):
-    row = con.execute(
-        "SELECT answer FROM answers_cache WHERE project_id=? AND query_hash=?", (pj, h)
-    ).fetchone()
-    return row and json.loads(row[0])
+    return answers_cache.get(con, pj, h)
 
 
 def _put_cache(con, pj: str, h: str, ans: dict) -> None:
-    con.execute(
-        "REPLACE INTO answers_cache(project_id,query_hash,answer) VALUES (?,?,?)",
-        (pj, h, json.dumps(ans)),
+    answers_cache.put(con, pj, h, ans)
+
+
+def _crop_snippet(snip: str, txt: str) -> str:
+    if not snip:
+        return sanitize_snippet((txt or "")[:300])
+    # Crop around first highlight to keep snippet compact
+    i = snip.find("<mark>")
+    if i == -1:
+        return sanitize_snippet(snip[:300])
+    start = max(0, i - 80)
+    end = min(len(snip), i + 220)
+    return sanitize_snippet(snip[start:end])
+
+
+def _build_snippets(
+    con, items: list[tuple[int, str]], match_expr: str
+) -> dict[int, str]:
+    """Highlighted snippets for a whole page of hits in a single FTS5 query.
+
+    Hits that don't match the FTS expression (e.g. dense-only recall) fall back to
+    a sanitized prefix of the already-loaded text.
+    """
+    marked: dict[int, str] = {}
+    if items:
+        try:
+            q = _sanitize_match_query(match_expr)
+            rows = con.execute(
+                "SELECT rowid, highlight(chunks_fts, 0, '<mark>', '</mark>') "
+                "FROM chunks_fts WHERE chunks_fts MATCH ? "
+                "AND rowid IN (SELECT value FROM json_each(?))",
+                (q, json.dumps([int(cid) for cid, _ in items])),
+            ).fetchall()
+            marked = {int(r[0]): r[1] or "" for r in rows}
+        except Exception:
+            # fallback: sanitized prefixes
+            marked = {}
+    return {cid: _crop_snippet(marked.get(cid, ""), txt) for cid, txt in items}
+
+
+def _hydrate_candidates(
+    con, ids: list[int], projects: list[str] | None = None
+) -> list[dict]:
+    """Fetch chunk + docs metadata for every candidate id in one query.
+
+    Ids are passed as a JSON array (json_each) so the statement text is stable and
+    reused from the statement cache; input order is preserved via json_each.key.
+    """
+    sql = (
+        "SELECT c.id, c.content, c.title, c.source_path, c.text, "
+        "d.repo, d.path, d.title, d.text "
+        "FROM json_each(?) j "
+        "JOIN chunks c ON c.id = j.value "
+        "LEFT JOIN docs d ON d.rowid = ("
+        "  SELECT rowid FROM docs WHERE path = c.source_path AND path <> '' LIMIT 1"
+        ")"
     )
-    try:
-        con.commit()
-    except Exception:
-        pass
+    params: list = [json.dumps([int(i) for i in ids])]
+    if projects:
+        sql += " WHERE c.project_id IN (" + ",".join("?" * len(projects)) + ")"
+        params += list(projects)
+    sql += " ORDER BY j.key"
+    out: list[dict] = []
+    for cid, content, title, src, text, d_repo, d_path, d_title, d_text in con.execute(
+        sql, params
+    ):
+        if d_path is not None:
+            out.append(
+                {
+                    "id": cid,
+                    "repo": d_repo,
+                    "path": d_path,
+                    "title": d_title or title,
+                    "text": d_text or (text or content),
+                }
+            )
+        else:
+            out.append(
+                {
+                    "id": cid,
+                    "repo": None,
+                    "path": src,
+                    "title": title,
+                    "text": (text or content),
+                }
+            )
+    return out
 
 
-def _build_snippet(con, chunk_id: int, txt: str, match_expr: str) -> str:
+def _hydrate_meta(con, ids: list[int]) -> dict[int, dict]:
+    """Ordinal/created_at/project/doc/text for scored ids in one query."""
+    if not ids:
+        return {}
+    has_created = False
     try:
-        q = _sanitize_match_query(match_expr)
-        # Use FTS5 highlight() to wrap matching terms
-        sql = (
-            "SELECT highlight(chunks_fts, 0, '<mark>', '</mark>') AS snip "
-            "FROM chunks_fts WHERE rowid = ? AND chunks_fts MATCH '" + q + "'"
-        )
-        row = con.execute(sql, (chunk_id,)).fetchone()
-        snip = (row and row[0]) or ""
-        if not snip:
-            return sanitize_snippet((txt or "")[:300])
-        # Crop around first highlight to keep snippet compact
-        i = snip.find("<mark>")
-        if i == -1:
-            return sanitize_snippet(snip[:300])
-        start = max(0, i - 80)
-        end = min(len(snip), i + 220)
-        return sanitize_snippet(snip[start:end])
+        has_created = "created_at" in table_columns(con, "chunks")
     except Exception:
-        # fallback: sanitized prefix
-        return sanitize_snippet((txt or "")[:300])
+        has_created = False
+    created = "created_at" if has_created else "NULL"
+    rows = con.execute(
+        f"SELECT c.id, c.ordinal, {created}, c.project_id, c.doc_id, "
+        "COALESCE(c.text, c.content) "
+        "FROM json_each(?) j JOIN chunks c ON c.id = j.value",
+        (json.dumps([int(i) for i in ids]),),
+    ).fetchall()
+    out: dict[int, dict] = {}
+    for cid, ordinal, created_at, pid, did, txt in rows:
+        ts = 0.0
+        try:
+            if created_at:
+                ts = datetime.strptime(str(created_at), "%Y-%m-%d %H:%M:%S").timestamp()
+        except Exception:
+            ts = 0.0
+        out[int(cid)] = {
+            "ordinal": ordinal,
+            "ts": ts,
+            "project_id": pid,
+            "doc_id": did,
+            "text": txt,
+        }
+    return out
 
 
 @router.post("/rag/query")
@@ -147,6 +296,46 @@ async def rag_query(
     near_boost: float = Query(0.4, ge=0, le=2.0),
     k: int = Query(30, ge=1, le=200),
 ):
+    return await retrieve(
+        q,
+        project_id=project_id,
+        limit=limit,
+        offset=offset,
+        phrase_boost=phrase_boost,
+        near_boost=near_boost,
+        k=k,
+    )
+
+
+async def retrieve(
+    q: QueryIn,
+    project_id: list[str] | None = None,
+    limit: int = 20,
+    offset: int = 0,
+    phrase_boost: float = 0.6,
+    near_boost: float = 0.4,
+    k: int = 30,
+) -> dict:
+    """In-process retrieval service behind /api/rag/query.
+
+    /chat, /chat/stream (via auto_rag.fetch_context) and the HTTP router all call
+    this directly so a chat turn doesn't loop back through HTTP/JSON.
+    """
+    with timer("retrieval", "inproc"):
+        return await _retrieve(
+            q, project_id or [], limit, offset, phrase_boost, near_boost, k
+        )
+
+
+async def _retrieve(
+    q: QueryIn,
+    project_id: list[str],
+    limit: int,
+    offset: int,
+    phrase_boost: float,
+    near_boost: float,
+    k: int,
+) -> dict:
     con = connect()
     try:
         # If explicit project_id list provided via query param, it overrides body single project_id
@@ -166,20 +355,14 @@ async def rag_query(
                     pass
                 return cached
         t0 = time.perf_counter()
-        # 1) Recall: BM25 + dense
-        bm = bm25_search(q.question, topk=50)
-        dn = dense_search(q.question, topk=50)
+        # 1) Recall: BM25 + dense, concurrently with per-branch budgets
+        bm, dn, recall_meta = await _recall(q.question)
         pool_ids = list(dict.fromkeys(bm + dn))  # stable dedupe
 
-        # Optional filter by project_id(s) if provided (if chunks table exists)
-        if projects and pool_ids:
-            ph = ",".join("?" for _ in pool_ids)
-            pph = ",".join("?" for _ in projects)
-            rows = con.execute(
-                f"SELECT id FROM chunks WHERE id IN ({ph}) AND project_id IN ({pph})",
-                (*pool_ids, *projects),
-            ).fetchall()
-            pool_ids = [r[0] for r in rows]
+        # Hydrate the candidate pool (chunk + docs metadata) in one set-based query;
+        # the optional project filter is applied in the same statement.
+        doc_rows = _hydrate_candidates(con, pool_ids, projects) if pool_ids else []
+        pool_ids = [d["id"] for d in doc_rows]
 
         # If no index built yet, fall back to existing brute-force vector search
         if not pool_ids:
@@ -198,50 +381,13 @@ async def rag_query(
                     for h in hits
                 ],
                 "mode": mode,
+                "meta": {"recall": recall_meta},
             }
 
-        # 2) Load texts from chunks; map metadata via docs when possible
-        doc_rows: list[dict] = []
-        for cid in pool_ids:
-            c = con.execute(
-                "SELECT id, content, title, source_path, text FROM chunks WHERE id= ?",
-                (cid,),
-            ).fetchone()
-            if not c:
-                continue
-            # Try to find a docs row to enrich repo/path/title; fallback to chunk fields
-            d = (
-                con.execute(
-                    "SELECT repo, path, title, text FROM docs WHERE path=? LIMIT 1",
-                    (c[3],),
-                ).fetchone()
-                if c[3]
-                else None
-            )
-            if d:
-                doc_rows.append(
-                    {
-                        "id": c[0],
-                        "repo": d[0],
-                        "path": d[1],
-                        "title": d[2] or c[2],
-                        "text": d[3] or (c[4] or c[1]),
-                    }
-                )
-            else:
-                doc_rows.append(
-                    {
-                        "id": c[0],
-                        "repo": None,
-                        "path": c[3],
-                        "title": c[2],
-                        "text": (c[4] or c[1]),
-                    }
-                )
-
         # 3) Rerank by cross-encoder; if unavailable, keep order
         pairs = [(str(d["id"]), d.get("text") or "") for d in doc_rows]
-        ranked = rerank(q.question, pairs, topk=max(q.k, 5))
+        with tracing.span("rerank", candidates=len(pairs)):
+            ranked = rerank(q.question, pairs, topk=max(q.k, 5))
         order = {cid: i for i, (cid, _) in enumerate(ranked)}
         final = [d for d in doc_rows if str(d["id"]) in order]
         final.sort(key=lambda d: order[str(d["id"])])
@@ -289,46 +435,9 @@ async def rag_query(
                         scores[int(rid)] = scores.get(int(rid), 0.0) + contrib
         # Tie-break stability: order by score DESC, ordinal ASC, created_at DESC
         ids_all = list(scores.keys()) if scores else [d["id"] for d in final]
-        ord_map: dict[int, int | None] = {}
-        ts_map: dict[int, float] = {}
-        if ids_all:
-            # Check if created_at exists
-            has_created = False
-            try:
-                cols = {
-                    row[1]
-                    for row in con.execute("PRAGMA table_info('chunks')").fetchall()
-                }
-                has_created = "created_at" in cols
-            except Exception:
-                has_created = False
-            placeholders = ",".join(["?"] * len(ids_all))
-            if has_created:
-                rows_meta = con.execute(
-                    f"SELECT id, ordinal, created_at FROM chunks WHERE id IN ({placeholders})",
-                    ids_all,
-                ).fetchall()
-                for r in rows_meta:
-                    cid = int(r[0])
-                    ord_map[cid] = r[1]
-                    ts = 0.0
-                    try:
-                        if r[2]:
-                            ts = datetime.strptime(
-                                str(r[2]), "%Y-%m-%d %H:%M:%S"
-                            ).timestamp()
-                    except Exception:
-                        ts = 0.0
-                    ts_map[cid] = ts
-            else:
-                rows_meta = con.execute(
-                    f"SELECT id, ordinal FROM chunks WHERE id IN ({placeholders})",
-                    ids_all,
-                ).fetchall()
-                for r in rows_meta:
-                    cid = int(r[0])
-                    ord_map[cid] = r[1]
-                    ts_map[cid] = 0.0
+        meta = _hydrate_meta(con, ids_all)
+        ord_map: dict[int, int | None] = {cid: m["ordinal"] for cid, m in meta.items()}
+        ts_map: dict[int, float] = {cid: m["ts"] for cid, m in meta.items()}
 
         def _sort_key(cid: int):
             score = scores.get(cid, 0.0)
@@ -340,28 +449,18 @@ async def rag_query(
         ids_sorted = sorted(ids_all, key=_sort_key)
         # Pagination
         paged_ids = ids_sorted[offset : offset + limit]
-        rows = (
-            con.execute(
-                "SELECT id, project_id, doc_id, COALESCE(text, content) FROM chunks WHERE id IN ("
-                + ",".join(["?"] * len(paged_ids))
-                + ")",
-                paged_ids,
-            ).fetchall()
-            if paged_ids
-            else []
-        )
-        hits = []
-        for r in rows:
-            cid, pid, did, txt = int(r[0]), r[1], r[2], r[3]
-            hits.append(
-                {
-                    "id": cid,
-                    "project_id": pid,
-                    "doc_id": did,
-                    "snippet": _build_snippet(con, cid, txt, base),
-                    "text": None,
-                }
-            )
+        paged = [(cid, meta[cid]) for cid in paged_ids if cid in meta]
+        snippets = _build_snippets(con, [(cid, m["text"]) for cid, m in paged], base)
+        hits = [
+            {
+                "id": cid,
+                "project_id": m["project_id"],
+                "doc_id": m["doc_id"],
+                "snippet": snippets[cid],
+                "text": None,
+            }
+            for cid, m in paged
+        ]
         elapsed_ms = (time.perf_counter() - t0) * 1000.0
         resp = {
             "ok": True,
@@ -381,6 +480,7 @@ async def rag_query(
                 "elapsed_ms": round(elapsed_ms, 2),
                 "variants": len(variants or []),
                 "candidates": k,
+                "recall": recall_meta,
             },
         }
         if RAG_ENABLE_CACHE:
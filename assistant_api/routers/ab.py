@@ -36,7 +36,7 @@ def ab_assign(
 
 
 @router.post("/event/{bucket}/{event}")
-def ab_event(bucket: str, event: str):
+async def ab_event(bucket: str, event: str):
     """
     Record an event for a bucket.
 
@@ -47,8 +47,8 @@ def ab_event(bucket: str, event: str):
     Returns:
         Updated state dict
     """
-    result = record_event(bucket, event)  # existing counters
-    ab_store.append_event(bucket, event)  # new JSONL log
+    result = record_event(bucket, event)  # in-memory counters (snapshotted)
+    ab_store.enqueue_event(bucket, event)  # batched JSONL log
     return result
 
 
@@ -1,9 +1,7 @@
 import csv
 import io
-import json
 import os
-from collections import defaultdict
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
@@ -11,8 +9,9 @@ from fastapi.responses import HTMLResponse, StreamingResponse
 
 from ..models.metrics import MetricIngestRequest
 from ..security.dev_access import ensure_dev_access
+from ..services.analytics_rollup import since_day
 from ..services.analytics_store import AnalyticsStore
-from ..services.behavior_learning import analyze, order_sections
+from ..services.behavior_learning import analyze_counts, order_sections
 from ..services.geo import anonymize_prefix, lookup_country
 from ..services.retention import run_retention
 from ..settings import get_settings
@@ -109,18 +108,9 @@ async def ingest(
 @router.post("/analyze/behavior")
 async def analyze_behavior(store: AnalyticsStore = Depends(get_store)):
     settings = get_settings()
-    files = sorted(Path(store.dir).glob("events-*.jsonl"))[-14:]
-    events = []
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    events.append(json.loads(line))
-                except Exception:
-                    continue
     prev = store.load_weights()
-    weights = analyze(
-        events,
+    weights = analyze_counts(
+        store.rollup.by_section(since_day(14)),
         prev,
         settings["LAYOUT_SECTIONS_DEFAULT"],
         settings["LEARNING_EMA_ALPHA"],
@@ -149,52 +139,17 @@ async def get_layout(store: AnalyticsStore = Depends(get_store)):
 async def metrics_summary(store: AnalyticsStore = Depends(get_store)):
     """Aggregated 14d summary for dashboard: per-section views/clicks/dwell/CTR."""
     settings = get_settings()
-    files = sorted(Path(store.dir).glob("events-*.jsonl"))[-14:]
-    counts_view = defaultdict(int)
-    counts_click = defaultdict(int)
-    dwell_ms = defaultdict(int)
-
-    cutoff = datetime.now(UTC) - timedelta(days=14)
-    total_events = 0
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    e = json.loads(line)
-                except Exception:
-                    continue
-                ts = e.get("ts")
-                if isinstance(ts, str):
-                    try:
-                        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                    except Exception:
-                        continue
-                if not ts or ts < cutoff:
-                    continue
-                s = e.get("section")
-                et = e.get("event_type")
-                if not s or not et:
-                    continue
-                total_events += 1
-                if et == "view":
-                    counts_view[s] += 1
-                if et == "click":
-                    counts_click[s] += 1
-                if et == "dwell":
-                    dwell_ms[s] += int(e.get("dwell_ms") or 0)
-
+    counts = store.rollup.by_section(since_day(14))
+    total_events = sum(c["typed"] for c in counts.values())
     weights = store.load_weights().get("sections", {})
-    sections = sorted(
-        set(settings["LAYOUT_SECTIONS_DEFAULT"])
-        | set(counts_view)
-        | set(counts_click)
-        | set(dwell_ms)
-    )
+    sections = sorted(set(settings["LAYOUT_SECTIONS_DEFAULT"]) | set(counts))
     rows = []
+    zero = {"views": 0, "clicks": 0, "dwell_ms": 0}
     for s in sections:
-        v = counts_view[s]
-        c = counts_click[s]
-        d = dwell_ms[s]
+        agg = counts.get(s, zero)
+        v = agg["views"]
+        c = agg["clicks"]
+        d = agg["dwell_ms"]
         ctr = (c / v) if v else 0.0
         avg_dwell = (d / v) if v else 0.0
         rows.append(
@@ -223,18 +178,7 @@ async def metrics_countries(
     """Top countries by events (14d by default)."""
     settings = get_settings()
     days = max(1, min(days, settings["METRICS_EXPORT_MAX_DAYS"]))
-    files = sorted(Path(store.dir).glob("events-*.jsonl"))[-days:]
-    counts = defaultdict(int)
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    e = json.loads(line)
-                except:
-                    continue
-                ctry = e.get("country")
-                if ctry:
-                    counts[ctry] += 1
+    counts = store.rollup.countries(since_day(days))
     rows = [{"country": k, "events": v} for k, v in counts.items()]
     rows.sort(key=lambda r: -r["events"])
     return {"updated": datetime.now(UTC).isoformat(), "rows": rows[: max(1, top)]}
@@ -310,41 +254,13 @@ async def metrics_timeseries(
     """
     settings = get_settings()
     days = max(1, min(days, settings["METRICS_EXPORT_MAX_DAYS"]))
-    files = sorted(Path(store.dir).glob("events-*.jsonl"))[-days:]
-    # Aggregate per-day per-section
-    by_day = defaultdict(lambda: {"views": 0, "clicks": 0, "dwell_ms": 0})
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    e = json.loads(line)
-                except:
-                    continue
-                if section and e.get("section") != section:
-                    continue
-                ts = e.get("ts")
-                if isinstance(ts, str):
-                    try:
-                        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                    except:
-                        continue
-                dkey = ts.strftime("%Y-%m-%d")
-                if e.get("event_type") == "view":
-                    by_day[dkey]["views"] += 1
-                elif e.get("event_type") == "click":
-                    by_day[dkey]["clicks"] += 1
-                elif e.get("event_type") == "dwell":
-                    by_day[dkey]["dwell_ms"] += int(e.get("dwell_ms") or 0)
-    # Build series sorted by date
-    keys = sorted(by_day.keys())
     series = []
-    for k in keys:
-        v = by_day[k]
+    for v in store.rollup.daily(since_day(days), section):
         ctr = (v["clicks"] / v["views"]) if v["views"] else 0.0
         avg_dwell = (v["dwell_ms"] / v["views"]) if v["views"] else 0.0
         series.append(
             {
-                "date": k,
+                "date": v["date"],
                 "views": v["views"],
                 "clicks": v["clicks"],
                 "ctr": ctr,
@@ -428,33 +344,11 @@ async def metrics_export_pdf(store: AnalyticsStore = Depends(get_store)):
 @router.get("/metrics/ab")
 async def metrics_ab(section: str, store: AnalyticsStore = Depends(get_store)):
     """Compare variants within a section: returns views/clicks/ctr/dwell by variant."""
-    files = sorted(Path(store.dir).glob("events-*.jsonl"))[-14:]
-    views = defaultdict(lambda: defaultdict(int))  # variant -> counts
-    clicks = defaultdict(lambda: defaultdict(int))
-    dwell = defaultdict(lambda: defaultdict(int))
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    e = json.loads(line)
-                except:
-                    continue
-                if e.get("section") != section:
-                    continue
-                v = e.get("variant") or "default"
-                et = e.get("event_type")
-                if et == "view":
-                    views[v]["n"] += 1
-                elif et == "click":
-                    clicks[v]["n"] += 1
-                elif et == "dwell":
-                    dwell[v]["ms"] += int(e.get("dwell_ms") or 0)
     rows = []
-    variants = set(views.keys()) | set(clicks.keys()) | set(dwell.keys())
-    for v in sorted(variants):
-        n = views[v]["n"]
-        c = clicks[v]["n"]
-        ms = dwell[v]["ms"]
+    for v, agg in sorted(store.rollup.variants(section, since_day(14)).items()):
+        n = agg["views"]
+        c = agg["clicks"]
+        ms = agg["dwell_ms"]
         rows.append(
             {
                 "variant": v,
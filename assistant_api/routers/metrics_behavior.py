@@ -6,7 +6,7 @@ from collections import Counter, deque
 from pathlib import Path
 from typing import Deque
 
-from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi import APIRouter, Header, Query
 
 from assistant_api.models.metrics import (
     BehaviorAggBucket,
@@ -14,6 +14,7 @@ from assistant_api.models.metrics import (
     BehaviorSnapshot,
     EventIngestResult,
 )
+from assistant_api.services.metrics_sink import JsonlSink
 
 router = APIRouter(prefix="/api/metrics", tags=["metrics"])
 
@@ -24,9 +25,17 @@ _ring: deque[BehaviorEvent] = deque(maxlen=_RING_CAPACITY)
 # Server-side sampling (0.0 to 1.0)
 _SAMPLE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
 
-# JSONL sink (append-only). Keep small, rotate externally if needed.
+# JSONL sink (append-only). Writes are batched off the event loop; set
+# METRICS_SINK_MAX_MB to rotate by size (or rotate externally).
 _SINK_PATH = Path(os.getenv("METRICS_JSONL", "./data/metrics.jsonl")).resolve()
 _SINK_PATH.parent.mkdir(parents=True, exist_ok=True)
+_sink = JsonlSink(
+    _SINK_PATH,
+    batch=int(os.getenv("METRICS_SINK_BATCH", "256")),
+    flush_ms=float(os.getenv("METRICS_SINK_FLUSH_MS", "200")),
+    max_queue=int(os.getenv("METRICS_SINK_MAX_QUEUE", "10000")),
+    max_bytes=int(float(os.getenv("METRICS_SINK_MAX_MB", "0")) * 1024 * 1024),
+)
 
 
 def _serialize_event(ev: BehaviorEvent) -> str:
@@ -55,15 +64,9 @@ async def ingest_event(
     # Append to in-memory ring for quick debug views
     _ring.append(payload)
 
-    # Append to JSONL sink
-    try:
-        with _SINK_PATH.open("a", encoding="utf-8") as f:
-            f.write(_serialize_event(payload) + "\n")
-    except OSError as e:
-        # Keep in-memory path working even if disk fails
-        raise HTTPException(status_code=500, detail=f"metrics_sink_write_failed: {e}")
-
-    return EventIngestResult(ok=True, stored=1, file=str(_SINK_PATH))
+    # Queue for the batched JSONL writer; a full queue drops (and counts) the event
+    stored = 1 if _sink.submit(_serialize_event(payload)) else 0
+    return EventIngestResult(ok=True, stored=stored, file=str(_SINK_PATH))
 
 
 @router.get("/behavior", response_model=BehaviorSnapshot)
@@ -92,4 +95,9 @@ async def behavior_snapshot(limit: int = Query(50, ge=1, le=_RING_CAPACITY)):
 async def behavior_health():
     """Lightweight health for the metrics subsystem."""
     exists = _SINK_PATH.exists()
-    return {"ok": True, "ring_capacity": _RING_CAPACITY, "sink_exists": exists}
+    return {
+        "ok": True,
+        "ring_capacity": _RING_CAPACITY,
+        "sink_exists": exists,
+        "sink": _sink.stats(),
+    }
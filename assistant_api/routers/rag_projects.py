@@ -13,6 +13,7 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
+from assistant_api import answers_cache
 from assistant_api.utils.auth import get_current_user
 
 RAG_DB = os.environ.get("RAG_DB") or os.path.join(os.getcwd(), "data", "rag.sqlite")
@@ -198,6 +199,8 @@ def _ingest_projects(projects: list[dict[str, Any]]) -> int:
             )
             count += 1
         con.commit()
+        for p in projects:
+            answers_cache.invalidate(p["slug"], con=con)
         return count
     finally:
         con.close()
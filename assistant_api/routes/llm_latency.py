@@ -4,6 +4,7 @@ from typing import Dict, List
 
 from fastapi import APIRouter, Query
 
+from ..latency_hist import series
 from ..llm_client import get_primary_base_url, ping_primary_once
 
 router = APIRouter(prefix="/llm/primary", tags=["llm"])
@@ -49,6 +50,11 @@ async def primary_latency(
         samples_ms.append(dt_ms)
     eff = samples_ms[warmup:] if warmup < len(samples_ms) else []
     eff_statuses = statuses[warmup:] if warmup < len(statuses) else []
+    # Probe samples also feed the shared series (exported to Prometheus)
+    shared = series("probe", "primary_models")
+    for ms in eff:
+        shared.record(ms)
+    # Exact percentiles for this handful of samples
     stats = {
         "count": len(eff),
         "ok_rate": (
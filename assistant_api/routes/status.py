@@ -11,7 +11,7 @@ from ..metrics import (
     stage_snapshot,
 )
 from ..state import LAST_SERVED_BY, SSE_CONNECTIONS
-from ..status_common import build_status
+from ..status_common import aggregator
 
 router = APIRouter()
 
@@ -66,13 +66,15 @@ class Status(BaseModel):
     primary: dict | None = None
     last_served_by: dict | None = None
     build: dict | None = None  # build metadata (sha, time)
+    snapshot: dict | None = None  # probe ages/staleness of the served snapshot
 
 
 @router.get("/status/summary", response_model=Status)
-async def status_summary():
+async def status_summary(fresh: bool = False):
+    """Serve the aggregator's last snapshot; ``?fresh=1`` re-runs every probe."""
     base = os.getenv("BASE_URL_PUBLIC", "http://127.0.0.1:8001")
-    data = await build_status(base)
-    # Enrich with transient latency + last served provider (not persisted in build_status core)
+    data = await aggregator.get(base, fresh=fresh)
+    # Enrich with transient latency + last served provider (not part of the probe snapshot)
     data["latency_recent"] = recent_latency_stats()
     data["latency_recent_by_provider"] = recent_latency_stats_by_provider()
     # Shallow copy to avoid Pydantic mutation side effects
@@ -83,8 +85,8 @@ async def status_summary():
 
 # Alias under /api prefix so callers using /api/status/summary get the same response
 @router.get("/api/status/summary", include_in_schema=False)
-async def status_summary_api_alias():
-    return await status_summary()
+async def status_summary_api_alias(fresh: bool = False):
+    return await status_summary(fresh=fresh)
 
 
 @router.get("/status/cors")
@@ -166,7 +168,20 @@ async def api_metrics_json():
 
     Alias to ensure availability under /api/ prefix regardless of app wiring order.
     """
-    return {"ok": True, "metrics": stage_snapshot()}
+    from .. import answers_cache, chat_cache, memory
+    from ..db import pool_stats, vec_cache_stats
+    from ..services import analytics_events
+
+    return {
+        "ok": True,
+        "metrics": stage_snapshot(),
+        "db_pool": pool_stats(),
+        "vec_cache": vec_cache_stats(),
+        "analytics_events": analytics_events.stats(),
+        "memory": memory.stats(),
+        "answer_cache": chat_cache.stats(),
+        "answers_cache": answers_cache.stats(),
+    }
 
 
 @router.get("/api/metrics.csv", include_in_schema=False)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+
+from .. import tracing
+
+router = APIRouter(tags=["trace"])
+
+
+@router.get("/api/trace/recent")
+async def trace_recent(
+    limit: int = Query(50, ge=1, le=500),
+    name: str | None = Query(None, description="Only traces for this path."),
+    min_ms: float = Query(0.0, ge=0.0, description="Only traces at least this slow."),
+):
+    """Most recent sampled request traces (newest first) with nested spans."""
+    return {
+        **tracing.stats(),
+        "items": tracing.recent(limit=limit, name=name, min_ms=min_ms),
+    }
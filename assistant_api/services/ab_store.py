@@ -2,21 +2,50 @@
 A/B Testing Event Store
 
 Stores view/click events in JSONL format with daily aggregation for analytics.
+
+Every append also bumps a ``(day, bucket)`` row in the ``ab_daily`` SQLite
+sidecar next to the log (committed only together with the log lines, so the
+two never disagree), and ``summary`` answers from that table with a range
+scan, so its cost tracks the number of days, not events. An existing log is
+folded into the sidecar once on first use. ``compact`` (``python -m
+assistant_api.cli ab-compact``) truncates raw events older than a retention
+window; the aggregate already holds their counts.
 """
 
 from __future__ import annotations
 
 import datetime as dt
 import json
+import os
 import pathlib
+import sqlite3
+import threading
 import time
 from collections.abc import Iterable
+from contextlib import contextmanager
 from typing import Any, Dict, Literal
 
+from .metrics_sink import JsonlSink
+
+try:  # POSIX advisory lock shared with other processes (CLI ab-compact)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev boxes
+    fcntl = None  # type: ignore
+
 DATA_DIR = pathlib.Path("data")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 EVENTS = DATA_DIR / "ab_events.jsonl"
 
+_UPSERT = (
+    "INSERT INTO ab_daily(day, bucket, views, clicks) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(day, bucket) DO UPDATE SET "
+    "views = views + excluded.views, clicks = clicks + excluded.clicks"
+)
+
+_lock = threading.Lock()
+_daily_con: tuple[pathlib.Path, sqlite3.Connection] | None = None
+_sink: JsonlSink | None = None
+
 
 def _ts() -> int:
     """Current Unix timestamp."""
@@ -28,17 +57,170 @@ def _daykey(ts: int) -> str:
     return dt.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
 
 
+def _event(bucket: str, event: str, ts: int | None = None) -> dict[str, Any]:
+    ts = ts or _ts()
+    return {"ts": ts, "day": _daykey(ts), "bucket": bucket, "event": event}
+
+
+def _fold(con: sqlite3.Connection, events: Iterable[dict[str, Any]]) -> int:
+    """Add events to the (day, bucket) aggregate; caller owns the transaction."""
+    rows: dict[tuple[str, str], list[int]] = {}  # (day, bucket) -> [views, clicks]
+    n = 0
+    for e in events:
+        r = rows.setdefault((e["day"], e["bucket"]), [0, 0])
+        r[0 if e.get("event") == "view" else 1] += 1
+        n += 1
+    con.executemany(_UPSERT, [(d, b, v, c) for (d, b), (v, c) in rows.items()])
+    return n
+
+
+@contextmanager
+def _log_lock():
+    """Exclusive lock on the raw log across processes: appends (direct and
+    batched) and ``compact``'s read + replace never interleave."""
+    if fcntl is None:
+        yield
+        return
+    EVENTS.parent.mkdir(parents=True, exist_ok=True)
+    with open(EVENTS.with_name(EVENTS.name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _daily() -> sqlite3.Connection:
+    """Open the aggregate next to EVENTS; the first opener folds any existing log.
+
+    Call with ``_lock`` held.
+    """
+    global _daily_con
+    path = EVENTS.with_name("ab_daily.sqlite")
+    if _daily_con is not None and _daily_con[0] == path:
+        return _daily_con[1]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ab_daily(
+          day TEXT NOT NULL,
+          bucket TEXT NOT NULL,
+          views INTEGER NOT NULL DEFAULT 0,
+          clicks INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY(day, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    con.execute("CREATE TABLE IF NOT EXISTS ab_meta(key TEXT PRIMARY KEY, value TEXT)")
+    con.execute("BEGIN IMMEDIATE")  # one process backfills
+    try:
+        if not con.execute("SELECT 1 FROM ab_meta WHERE key='backfilled'").fetchone():
+            n = _fold(con, iter_events())
+            con.execute(
+                "INSERT INTO ab_meta(key, value) VALUES('backfilled', ?)", (str(n),)
+            )
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    if _daily_con is not None:
+        _daily_con[1].close()
+    _daily_con = (path, con)
+    return con
+
+
+def _log_and_fold(events: list[dict[str, Any]], write) -> bool:
+    """Append ``events`` to the log and ``ab_daily`` as one unit.
+
+    The fold runs first in an open transaction that only commits once
+    ``write()`` has appended the lines; ``write`` returns a callable that takes
+    them back out (None if nothing was written), used when the commit fails.
+    Either both stores count the events or neither does; sqlite errors are
+    re-raised after cleanup.
+    """
+    with _lock:
+        con = _daily()  # before the write, so a first-use backfill can't see it
+        # Under the log lock a concurrent compact either sees these lines or
+        # has already replaced the file
+        with _log_lock():
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                _fold(con, events)
+                undo = write()
+            except BaseException:
+                con.rollback()
+                raise
+            if undo is None:
+                con.rollback()
+                return False
+            try:
+                con.commit()
+            except BaseException:
+                con.rollback()
+                undo()
+                raise
+            return True
+
+
 def append_event(
     bucket: Literal["A", "B"], event: Literal["view", "click"], ts: int | None = None
 ):
-    """Append an event to the JSONL log."""
-    ts = ts or _ts()
-    EVENTS.parent.mkdir(parents=True, exist_ok=True)
-    with EVENTS.open("a", encoding="utf-8") as f:
-        f.write(
-            json.dumps({"ts": ts, "day": _daykey(ts), "bucket": bucket, "event": event})
-            + "\n"
+    """Append an event to the JSONL log and the daily aggregate."""
+    e = _event(bucket, event, ts)
+
+    def write():
+        EVENTS.parent.mkdir(parents=True, exist_ok=True)
+        with EVENTS.open("a", encoding="utf-8") as f:
+            start = f.tell()
+            f.write(json.dumps(e) + "\n")
+        return lambda: os.truncate(EVENTS, start)
+
+    _log_and_fold([e], write)
+
+
+class _EventsSink(JsonlSink):
+    """JSONL batch writer that folds each written batch into the aggregate."""
+
+    def _write_batch(self, events: list[dict[str, Any]]) -> bool:
+        lines = [json.dumps(e) + "\n" for e in events]
+        size = sum(len(ln.encode("utf-8")) for ln in lines)
+
+        def write():
+            # The sink reopens the file if compact replaced it meanwhile
+            if not super(_EventsSink, self)._write_batch(lines):
+                return None
+
+            def undo():
+                self._size -= size
+                os.ftruncate(self._fd, self._size)
+
+            return undo
+
+        try:
+            return _log_and_fold(events, write)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[ab_store] batch not recorded: {e}")
+            return False
+
+
+def enqueue_event(bucket: str, event: str, ts: int | None = None) -> bool:
+    """Non-blocking ``append_event`` for request handlers (needs a running loop).
+
+    Events are batched through a ``JsonlSink`` (``AB_EVENTS_FLUSH_MS``), so the
+    log and summary trail the live counters by at most one flush interval.
+    """
+    global _sink
+    if _sink is None or _sink.path != EVENTS:
+        with _lock:
+            _daily()
+        _sink = _EventsSink(
+            EVENTS,
+            batch=int(os.getenv("AB_EVENTS_BATCH", "500")),
+            flush_ms=float(os.getenv("AB_EVENTS_FLUSH_MS", "500")),
         )
+    return _sink.submit(_event(bucket, event, ts))
 
 
 def iter_events() -> Iterable[dict[str, Any]]:
@@ -73,28 +255,33 @@ def summary(from_day: str | None = None, to_day: str | None = None) -> dict[str,
     daily: dict[str, dict[str, dict[str, int]]] = {}  # day -> bucket -> counts
     totals = {"A": {"views": 0, "clicks": 0}, "B": {"views": 0, "clicks": 0}}
 
-    for e in iter_events():
-        d = e["day"]
-        if from_day and d < from_day:
-            continue
-        if to_day and d > to_day:
-            continue
-
-        b = e["bucket"]
-        ev = e["event"]
+    where, args = ["bucket IN ('A', 'B')"], []
+    if from_day:
+        where.append("day >= ?")
+        args.append(from_day)
+    if to_day:
+        where.append("day <= ?")
+        args.append(to_day)
+    with _lock:
+        rows = (
+            _daily()
+            .execute(
+                "SELECT day, bucket, views, clicks FROM ab_daily"
+                f" WHERE {' AND '.join(where)}",
+                args,
+            )
+            .fetchall()
+        )
 
+    for d, b, views, clicks in rows:
         # Initialize day if needed
         daily.setdefault(
             d, {"A": {"views": 0, "clicks": 0}, "B": {"views": 0, "clicks": 0}}
         )
-
-        # Increment counts
-        if ev == "view":
-            daily[d][b]["views"] += 1
-            totals[b]["views"] += 1
-        else:  # click
-            daily[d][b]["clicks"] += 1
-            totals[b]["clicks"] += 1
+        daily[d][b]["views"] += views
+        daily[d][b]["clicks"] += clicks
+        totals[b]["views"] += views
+        totals[b]["clicks"] += clicks
 
     # Build time series
     days_sorted = sorted(daily.keys())
@@ -134,3 +321,24 @@ def summary(from_day: str | None = None, to_day: str | None = None) -> dict[str,
     }
 
     return {"series": series, "overall": overall}
+
+
+def compact(keep_days: int = 7, now: int | None = None) -> dict[str, Any]:
+    """Truncate raw events older than ``keep_days`` (their counts stay in
+    ``ab_daily``); the log is rewritten to a temp file and renamed while
+    holding the cross-process log lock the appenders take."""
+    cutoff = _daykey((now or _ts()) - max(0, keep_days) * 86400)
+    kept = dropped = 0
+    with _lock, _log_lock():
+        _daily()  # make sure a legacy log is folded before anything is dropped
+        if EVENTS.exists():
+            tmp = EVENTS.with_name(EVENTS.name + ".compact.tmp")
+            with tmp.open("w", encoding="utf-8") as out:
+                for e in iter_events():
+                    if str(e.get("day", "")) < cutoff:
+                        dropped += 1
+                        continue
+                    out.write(json.dumps(e) + "\n")
+                    kept += 1
+            os.replace(tmp, EVENTS)
+    return {"kept": kept, "dropped": dropped, "cutoff": cutoff}
@@ -0,0 +1,126 @@
+"""Write-behind persistence for ``/analytics/collect`` events.
+
+Beacons with ``persist`` set are queued on an ``EventsDbSink`` and written with
+one ``executemany`` per batch into a dedicated SQLite file
+(``ANALYTICS_EVENTS_DB``), so the request path never opens a RAG connection or
+commits per event. The ``events`` table carries a ``day`` column and indexes
+on ``ts`` and ``(day, type)`` for time-range queries.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from .metrics_sink import BatchSink
+
+EVENTS_DB = os.getenv("ANALYTICS_EVENTS_DB", "./data/analytics_events.sqlite")
+
+COLUMNS = (
+    "ts",
+    "day",
+    "type",
+    "path",
+    "ref_host",
+    "project_id",
+    "intent",
+    "seconds",
+    "ua_bot",
+    "device",
+    "theme",
+    "region",
+)
+_INSERT = (
+    f"INSERT INTO events({','.join(COLUMNS)}) "
+    f"VALUES({','.join('?' for _ in COLUMNS)})"
+)
+
+
+def connect(path: str | Path | None = None) -> sqlite3.Connection:
+    """Open the events DB, creating the table, indexes and reporting views."""
+    from ..sql_views import ensure_views
+
+    path = Path(path or EVENTS_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    with con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events(
+              id INTEGER PRIMARY KEY,
+              ts REAL NOT NULL,
+              day TEXT NOT NULL,
+              type TEXT NOT NULL,
+              path TEXT, ref_host TEXT, project_id TEXT, intent TEXT,
+              seconds REAL, ua_bot INTEGER, device TEXT, theme TEXT, region TEXT
+            )
+            """
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts)")
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_events_day_type ON events(day, type)"
+        )
+    ensure_views(con)
+    return con
+
+
+def row(ts: float, **fields: Any) -> tuple:
+    """Build an ``events`` row; ``day`` (UTC) is derived from ``ts``."""
+    fields["ts"] = ts
+    fields["day"] = time.strftime("%Y-%m-%d", time.gmtime(ts))
+    return tuple(fields.get(c) for c in COLUMNS)
+
+
+class EventsDbSink(BatchSink):
+    def __init__(self, path: str | Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self._con: sqlite3.Connection | None = None
+
+    def name(self) -> str:
+        return str(self.path)
+
+    def _release(self) -> None:
+        if self._con is not None:
+            try:
+                self._con.close()
+            except Exception:
+                pass
+            self._con = None
+
+    def _write_batch(self, rows: list[tuple]) -> bool:
+        try:
+            if self._con is None:
+                self._con = connect(self.path)
+            with self._con:
+                self._con.executemany(_INSERT, rows)
+            return True
+        except sqlite3.Error as e:
+            self._release()
+            print(f"[analytics_events] write failed ({self.path}): {e}")
+            return False
+
+
+_sink: EventsDbSink | None = None
+
+
+def get_sink() -> EventsDbSink:
+    global _sink
+    if _sink is None:
+        _sink = EventsDbSink(
+            EVENTS_DB,
+            batch=int(os.getenv("ANALYTICS_EVENTS_BATCH", "200")),
+            flush_ms=float(os.getenv("ANALYTICS_EVENTS_FLUSH_MS", "500")),
+            max_queue=int(os.getenv("ANALYTICS_EVENTS_MAX_QUEUE", "10000")),
+        )
+    return _sink
+
+
+def stats() -> dict[str, Any] | None:
+    """Sink stats for /api/metrics (None until the first persisted event)."""
+    return _sink.stats() if _sink is not None else None
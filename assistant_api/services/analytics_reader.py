@@ -0,0 +1,90 @@
+"""Streaming reader over analytics event logs, plain or gzip-rotated.
+
+``events-YYYYMMDD.jsonl`` files are compressed to ``.jsonl.gz`` by retention;
+readers go through here so compressed days stay in the query window. Files are
+pruned by the date in their name before being opened, and lines are parsed
+lazily (with ``orjson`` when installed).
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import re
+from collections.abc import Iterator
+from datetime import date, datetime
+from pathlib import Path
+from typing import IO, Any
+
+try:  # optional fast path
+    import orjson
+except Exception:
+    orjson = None
+
+PATTERN = re.compile(r"^events-(\d{8})\.jsonl(\.gz)?$")
+
+
+def loads(line: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def file_day(p: Path) -> date | None:
+    m = PATTERN.match(p.name)
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(1), "%Y%m%d").date()
+    except Exception:
+        return None
+
+
+def event_files(
+    dir_path: str | Path, since: date | None = None, until: date | None = None
+) -> list[Path]:
+    """Event logs for days in [since, until], oldest first, one file per day.
+
+    If retention is mid-rotation and both ``.jsonl`` and ``.jsonl.gz`` exist,
+    the plain file wins (the gzip may still be incomplete).
+    """
+    by_day: dict[date, Path] = {}
+    for p in Path(dir_path).glob("events-*.jsonl*"):
+        d = file_day(p)
+        if d is None or (since and d < since) or (until and d > until):
+            continue
+        if d not in by_day or p.suffix == ".jsonl":
+            by_day[d] = p
+    return [by_day[d] for d in sorted(by_day)]
+
+
+def open_log(p: Path) -> IO[bytes]:
+    return gzip.open(p, "rb") if p.suffix == ".gz" else p.open("rb")
+
+
+def iter_lines(p: Path, offset: int = 0) -> Iterator[bytes]:
+    """Complete lines of ``p`` starting at (decompressed) byte ``offset``.
+
+    A trailing line without a newline is still being written and is not yielded.
+    """
+    with open_log(p) as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            yield line
+
+
+def iter_events(
+    dir_path: str | Path, since: date | None = None, until: date | None = None
+) -> Iterator[dict[str, Any]]:
+    """Yield event dicts from every log in the date range; bad lines are skipped."""
+    for p in event_files(dir_path, since, until):
+        for line in iter_lines(p):
+            try:
+                e = loads(line)
+            except Exception:
+                continue
+            if isinstance(e, dict):
+                yield e
@@ -0,0 +1,346 @@
+"""Incremental daily rollups over analytics ``events-YYYYMMDD.jsonl[.gz]`` logs.
+
+Counters (events, views, clicks, dwell_ms) are keyed by
+(day, section, variant, country) and persisted in ``rollup.sqlite`` next to the
+raw logs. Each log is consumed once from a stored byte offset: appends made by
+``AnalyticsStore.append_jsonl`` are folded in directly, anything else (other
+workers, pre-existing or gzip-rotated days) is tailed on the next read. Files
+are tracked by their uncompressed name, so rotation never double counts a day,
+and closed days are marked so they are never re-scanned. Dashboard reads are O(days x keys), not O(events).
+
+Every ``AnalyticsRollup`` on a directory shares one bootstrapped connection
+(reopened if ``rollup.sqlite`` is replaced) behind a lock, and reads re-scan the
+directory at most every ``ANALYTICS_ROLLUP_REFRESH_S`` seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from .analytics_reader import event_files, file_day, iter_lines, loads
+
+DB_NAME = "rollup.sqlite"
+ROLLUP_REFRESH_S = float(os.getenv("ANALYTICS_ROLLUP_REFRESH_S", "30"))
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS rollup_daily(
+        day TEXT NOT NULL,
+        section TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        country TEXT NOT NULL,
+        events INTEGER NOT NULL DEFAULT 0,
+        typed INTEGER NOT NULL DEFAULT 0,
+        views INTEGER NOT NULL DEFAULT 0,
+        clicks INTEGER NOT NULL DEFAULT 0,
+        dwell_ms INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY(day, section, variant, country)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS rollup_files(
+        name TEXT PRIMARY KEY,
+        day TEXT NOT NULL,
+        offset INTEGER NOT NULL DEFAULT 0,
+        closed INTEGER NOT NULL DEFAULT 0
+    )""",
+)
+
+_UPSERT = """
+INSERT INTO rollup_daily(day, section, variant, country, events, typed, views, clicks, dwell_ms)
+VALUES (?,?,?,?,?,?,?,?,?)
+ON CONFLICT(day, section, variant, country) DO UPDATE SET
+  events = events + excluded.events,
+  typed = typed + excluded.typed,
+  views = views + excluded.views,
+  clicks = clicks + excluded.clicks,
+  dwell_ms = dwell_ms + excluded.dwell_ms
+"""
+
+
+def _log_key(p: Path) -> tuple[str, str] | None:
+    """(uncompressed file name, ISO day) for an event log, else None."""
+    d = file_day(p)
+    if d is None:
+        return None
+    return p.name.removesuffix(".gz"), d.isoformat()
+
+
+def _event_day(e: dict[str, Any], fallback: str) -> str:
+    ts = e.get("ts")
+    if isinstance(ts, str):
+        try:
+            ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        except Exception:
+            return fallback
+    if isinstance(ts, datetime):
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(UTC)
+        return ts.strftime("%Y-%m-%d")
+    return fallback
+
+
+def _fold(events, fallback_day: str) -> dict[tuple, list[int]]:
+    """Aggregate events into {(day, section, variant, country): counters}."""
+    acc: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+    for e in events:
+        if not isinstance(e, dict):
+            continue
+        section = e.get("section") or ""
+        et = e.get("event_type")
+        key = (
+            _event_day(e, fallback_day),
+            section,
+            e.get("variant") or "",
+            e.get("country") or "",
+        )
+        c = acc[key]
+        c[0] += 1
+        if section and et:
+            c[1] += 1
+        if et == "view":
+            c[2] += 1
+        elif et == "click":
+            c[3] += 1
+        elif et == "dwell":
+            c[4] += int(e.get("dwell_ms") or 0)
+    return acc
+
+
+def since_day(days: int) -> str:
+    """First day (inclusive) of a window of ``days`` days ending today (UTC)."""
+    start = datetime.now(UTC).date() - timedelta(days=max(1, days) - 1)
+    return start.isoformat()
+
+
+def _file_id(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+class _RollupDB:
+    """The shared connection for one ``rollup.sqlite``; hold ``lock`` to use it."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+        self.refreshed = 0.0  # monotonic time of the last catch-up, 0 = never
+        self._con: sqlite3.Connection | None = None
+        self._id: tuple[int, int] | None = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._con is not None and _file_id(self.path) == self._id:
+            return self._con
+        if self._con is not None:
+            self._con.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(
+            self.path, timeout=10.0, isolation_level=None, check_same_thread=False
+        )
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            con.execute(stmt)
+        self._con, self._id = con, _file_id(self.path)
+        self.refreshed = 0.0  # new file: backfill on the next read
+        return con
+
+
+_dbs: dict[Path, _RollupDB] = {}
+_dbs_lock = threading.Lock()
+
+
+def _shared(path: Path) -> _RollupDB:
+    key = path.resolve()
+    with _dbs_lock:
+        db = _dbs.get(key)
+        if db is None:
+            db = _dbs[key] = _RollupDB(path)
+        return db
+
+
+class AnalyticsRollup:
+    def __init__(self, dir_path: str | Path):
+        self.dir = Path(dir_path)
+        self.path = self.dir / DB_NAME
+        self._db = _shared(self.path)
+
+    @contextmanager
+    def _txn(self):
+        with self._db.lock:
+            con = self._db.connection()
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                yield con
+                con.execute("COMMIT")
+            except BaseException:
+                try:
+                    con.execute("ROLLBACK")
+                except Exception:
+                    pass
+                raise
+
+    # ---- writes -------------------------------------------------------------
+    def _offset(self, con, name: str) -> tuple[int, int]:
+        row = con.execute(
+            "SELECT offset, closed FROM rollup_files WHERE name=?", (name,)
+        ).fetchone()
+        return (int(row[0]), int(row[1])) if row else (0, 0)
+
+    def _commit_fold(self, con, name: str, day: str, acc, offset: int, closed: bool):
+        con.executemany(_UPSERT, [(*k, *v) for k, v in acc.items()])
+        con.execute(
+            "INSERT INTO rollup_files(name, day, offset, closed) VALUES (?,?,?,?) "
+            "ON CONFLICT(name) DO UPDATE SET offset=excluded.offset, closed=excluded.closed",
+            (name, day, offset, int(closed)),
+        )
+
+    def _tail(self, con, p: Path, today: str) -> None:
+        """Consume complete lines of ``p`` past the stored offset (in a txn)."""
+        key = _log_key(p)
+        if not key:
+            return
+        name, day = key
+        offset, closed = self._offset(con, name)
+        if closed:
+            return
+        consumed = 0
+
+        def _events():
+            nonlocal consumed
+            for line in iter_lines(p, offset):
+                consumed += len(line)
+                try:
+                    yield loads(line)
+                except Exception:
+                    continue
+
+        acc = _fold(_events(), day)
+        # rotated .gz files are complete; plain ones must be read to EOF
+        eof = p.suffix == ".gz" or offset + consumed == p.stat().st_size
+        is_closed = day < today and eof
+        if consumed or is_closed:
+            self._commit_fold(con, name, day, acc, offset + consumed, is_closed)
+
+    def record_append(
+        self, file: Path, start: int, end: int, events: list[dict[str, Any]]
+    ) -> None:
+        """Fold events just appended to ``file`` at bytes [start, end).
+
+        If the stored offset doesn't line up (another writer got in between), the
+        file is tailed from the stored offset instead so nothing is double counted.
+        """
+        key = _log_key(file)
+        if not key:
+            return
+        name, day = key
+        with self._txn() as con:
+            offset, _closed = self._offset(con, name)
+            if offset == start:
+                self._commit_fold(con, name, day, _fold(events, day), end, False)
+            else:
+                self._tail(con, file, datetime.now(UTC).strftime("%Y-%m-%d"))
+
+    def refresh(self) -> None:
+        """Catch up with every log file (backfills unseen days once)."""
+        today = datetime.now(UTC).strftime("%Y-%m-%d")
+        with self._db.lock:
+            con = self._db.connection()
+            closed = {
+                r[0]
+                for r in con.execute("SELECT name FROM rollup_files WHERE closed=1")
+            }
+        for p in event_files(self.dir):
+            if p.name.removesuffix(".gz") in closed:
+                continue
+            try:
+                with self._txn() as con:
+                    self._tail(con, p, today)
+            except Exception:
+                pass
+        self._db.refreshed = time.monotonic()
+
+    def _catch_up(self) -> None:
+        """``refresh()`` for reads, at most every ROLLUP_REFRESH_S and by one
+        caller at a time; the first read of a file waits for its backfill."""
+        db = self._db
+
+        def due() -> bool:
+            with db.lock:
+                db.connection()  # reopening a replaced file clears ``refreshed``
+                return not db.refreshed or (
+                    time.monotonic() - db.refreshed >= ROLLUP_REFRESH_S
+                )
+
+        if not due() or not db.refreshing.acquire(blocking=not db.refreshed):
+            return
+        try:
+            if due():
+                self.refresh()
+        finally:
+            db.refreshing.release()
+
+    # ---- reads --------------------------------------------------------------
+    def _rows(self, sql: str, params: tuple) -> list[tuple]:
+        self._catch_up()
+        with self._db.lock:
+            return self._db.connection().execute(sql, params).fetchall()
+
+    def by_section(self, since: str) -> dict[str, dict[str, int]]:
+        rows = self._rows(
+            "SELECT section, SUM(typed), SUM(views), SUM(clicks), SUM(dwell_ms) "
+            "FROM rollup_daily WHERE day >= ? AND section <> '' GROUP BY section",
+            (since,),
+        )
+        return {
+            s: {"typed": t, "views": v, "clicks": c, "dwell_ms": d}
+            for s, t, v, c, d in rows
+        }
+
+    def daily(self, since: str, section: str | None = None) -> list[dict[str, Any]]:
+        sql = (
+            "SELECT day, SUM(views), SUM(clicks), SUM(dwell_ms) FROM rollup_daily "
+            "WHERE day >= ?"
+        )
+        params: tuple = (since,)
+        if section:
+            sql += " AND section = ?"
+            params += (section,)
+        sql += " GROUP BY day HAVING SUM(events) > 0 ORDER BY day"
+        return [
+            {"date": d, "views": v, "clicks": c, "dwell_ms": ms}
+            for d, v, c, ms in self._rows(sql, params)
+        ]
+
+    def countries(self, since: str) -> dict[str, int]:
+        rows = self._rows(
+            "SELECT country, SUM(events) FROM rollup_daily "
+            "WHERE day >= ? AND country <> '' GROUP BY country",
+            (since,),
+        )
+        return {k: int(v) for k, v in rows}
+
+    def variants(self, section: str, since: str) -> dict[str, dict[str, int]]:
+        rows = self._rows(
+            "SELECT variant, SUM(views), SUM(clicks), SUM(dwell_ms) FROM rollup_daily "
+            "WHERE day >= ? AND section = ? GROUP BY variant",
+            (since, section),
+        )
+        out: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"views": 0, "clicks": 0, "dwell_ms": 0}
+        )
+        for variant, v, c, d in rows:
+            agg = out[variant or "default"]
+            agg["views"] += v
+            agg["clicks"] += c
+            agg["dwell_ms"] += d
+        return dict(out)
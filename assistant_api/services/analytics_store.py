@@ -3,18 +3,30 @@ from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any, Dict, List
 
+from .analytics_rollup import AnalyticsRollup
+
 
 class AnalyticsStore:
     def __init__(self, dir_path: str):
         self.dir = Path(dir_path)
         self.dir.mkdir(parents=True, exist_ok=True)
         self.weights_path = self.dir / "weights.json"
+        self.rollup = AnalyticsRollup(self.dir)
 
     def append_jsonl(self, events: list[dict[str, Any]]):
         fname = self.dir / f"events-{datetime.now(UTC):%Y%m%d}.jsonl"
-        with fname.open("a", encoding="utf-8") as f:
-            for e in events:
-                f.write(json.dumps(e, separators=(",", ":"), default=str) + "\n")
+        payload = "".join(
+            json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in events
+        ).encode("utf-8")
+        with fname.open("ab") as f:
+            start = f.tell()
+            f.write(payload)
+            end = f.tell()
+        try:
+            if end - start == len(payload):
+                self.rollup.record_append(fname, start, end, events)
+        except Exception as e:  # rollup catches up from the log on next read
+            print(f"[analytics] rollup update skipped: {e}")
 
     def load_weights(self) -> dict[str, Any]:
         if self.weights_path.exists():
@@ -41,10 +41,28 @@ def analyze(
         if et == "dwell":
             dwell_ms[s] += e.get("dwell_ms") or 0
 
+    counts = {
+        s: {"views": counts_view[s], "clicks": counts_click[s], "dwell_ms": dwell_ms[s]}
+        for s in set(counts_view) | set(counts_click) | set(dwell_ms)
+    }
+    return analyze_counts(counts, prev, sections_default, ema_alpha, decay)
+
+
+def analyze_counts(
+    counts: dict[str, dict[str, int]],
+    prev: dict[str, Any],
+    sections_default: list[str],
+    ema_alpha=0.3,
+    decay=0.98,
+) -> dict[str, Any]:
+    """Same as ``analyze`` but from pre-aggregated {section: {views, clicks, dwell_ms}}."""
+    zero = {"views": 0, "clicks": 0, "dwell_ms": 0}
+
     # compute metrics
-    secs = set(sections_default) | set(counts_view) | set(counts_click) | set(dwell_ms)
-    ctr = {s: (counts_click[s] / max(counts_view[s], 1)) for s in secs}
-    avg_dwell = {s: (dwell_ms[s] / max(counts_view[s], 1)) for s in secs}
+    secs = set(sections_default) | set(counts)
+    c = {s: counts.get(s, zero) for s in secs}
+    ctr = {s: (c[s]["clicks"] / max(c[s]["views"], 1)) for s in secs}
+    avg_dwell = {s: (c[s]["dwell_ms"] / max(c[s]["views"], 1)) for s in secs}
 
     ctr_n = _norm(ctr)
     dwell_n = _norm(avg_dwell)
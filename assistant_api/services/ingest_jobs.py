@@ -0,0 +1,171 @@
+"""Background RAG ingest jobs.
+
+``/rag/ingest`` submits work here instead of awaiting ``rag_ingest.ingest`` on the
+event loop. Git clones, embedding and SQLite writes run on a dedicated worker
+thread that has its own event loop. Progress is recorded on the job, and
+concurrent requests for the same sources share a single job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+_MAX_JOBS = int(os.getenv("INGEST_JOBS_KEEP", "50"))  # finished jobs kept for status
+_MAX_EVENTS = 50
+
+_lock = threading.Lock()
+_jobs: OrderedDict[str, IngestJob] = OrderedDict()
+_active: dict[str, IngestJob] = {}  # coalescing key -> queued/running job
+_executor: ThreadPoolExecutor | None = None
+
+
+@dataclass
+class IngestJob:
+    id: str
+    key: str
+    request: dict[str, Any]
+    status: str = "queued"  # queued | running | done | error
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    progress: dict[str, Any] = field(
+        default_factory=lambda: {
+            "sources": 0,
+            "files_total": 0,
+            "files_done": 0,
+            "current": None,
+        }
+    )
+    events: deque = field(default_factory=lambda: deque(maxlen=_MAX_EVENTS))
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    coalesced: int = 0
+    future: Future | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        with _lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": dict(self.progress),
+                "events": list(self.events),
+                "coalesced": self.coalesced,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+def _key(req: dict[str, Any]) -> str:
+    raw = json.dumps(req, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, INGEST_WORKERS), thread_name_prefix="rag-ingest"
+        )
+    return _executor
+
+
+def _on_progress(job: IngestJob, event: str, fields: dict[str, Any]) -> None:
+    with _lock:
+        p = job.progress
+        if event == "source":
+            p["sources"] += 1
+        elif event == "files":
+            p["files_total"] += int(fields.get("total") or 0)
+        elif event == "file":
+            p["files_done"] += 1
+            p["current"] = fields.get("path")
+        job.events.append({"t": round(time.time(), 3), "event": event, **fields})
+
+
+def _run(job: IngestJob) -> dict[str, Any]:
+    from ..rag_ingest import ingest
+
+    with _lock:
+        job.status = "running"
+        job.started_at = time.time()
+    try:
+        result = asyncio.run(
+            ingest(job.request, progress=lambda e, f: _on_progress(job, e, f))
+        )
+    except BaseException as e:
+        with _lock:
+            job.status = "error"
+            job.error = str(e) or type(e).__name__
+            job.finished_at = time.time()
+            _active.pop(job.key, None)
+        raise
+    with _lock:
+        job.status = "done"
+        job.result = result
+        job.progress["current"] = None
+        job.finished_at = time.time()
+        _active.pop(job.key, None)
+    return result
+
+
+def submit(req: dict[str, Any] | None) -> tuple[IngestJob, bool]:
+    """Queue an ingest; returns (job, coalesced) where coalesced means an
+    identical queued/running job was reused."""
+    req = dict(req or {})
+    key = _key(req)
+    with _lock:
+        cur = _active.get(key)
+        if cur is not None:
+            cur.coalesced += 1
+            return cur, True
+        job = IngestJob(id=uuid.uuid4().hex, key=key, request=req)
+        _active[key] = job
+        _jobs[job.id] = job
+        # Keep the registry bounded; never evict jobs that are still in flight
+        for jid in list(_jobs):
+            if len(_jobs) <= _MAX_JOBS:
+                break
+            if _jobs[jid].status in ("done", "error"):
+                del _jobs[jid]
+        # assigned under the lock so a coalesced caller never sees future=None
+        job.future = _pool().submit(_run, job)
+    return job, False
+
+
+def get(job_id: str) -> IngestJob | None:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+async def wait(job: IngestJob) -> dict[str, Any]:
+    """Await the job's result without blocking the event loop."""
+    return await asyncio.wrap_future(job.future)
+
+
+def shutdown() -> None:
+    """Stop accepting work; queued jobs are cancelled, a running one finishes."""
+    global _executor
+    ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
+    with _lock:
+        for key, job in list(_active.items()):
+            if job.future is not None and job.future.cancelled():
+                job.status = "error"
+                job.error = "cancelled"
+                job.finished_at = time.time()
+                del _active[key]
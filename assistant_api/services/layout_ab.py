@@ -1,15 +1,37 @@
-"""A/B testing service for layout optimization."""
+"""A/B testing service for layout optimization.
+
+View/click counters live in memory: each thread increments its own shard, so
+``record_event`` never touches disk or contends on a lock. ``snapshot()`` folds
+this worker's unsaved counts into ``data/layout_ab_state.json`` (read-merge-write
+under a file lock, written to a temp file and renamed) every
+``AB_SNAPSHOT_S`` seconds from lifespan and at shutdown, so several uvicorn
+workers add up instead of overwriting each other. Reads (``suggest_weights``)
+combine the last snapshot with this worker's pending counts.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
+import os
 import pathlib
 import random
+import threading
 import time
+from collections import Counter
+from contextlib import contextmanager
 from typing import Any, Dict
 
+try:  # cross-process lock for the snapshot merge (POSIX only)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
 STATE_PATH = pathlib.Path("data/layout_ab_state.json")
+AB_SNAPSHOT_S = float(os.getenv("AB_SNAPSHOT_S", "5"))
+
+_FIELDS = {"view": "views", "click": "clicks"}
 
 
 def _ensure_state_dir():
@@ -30,14 +52,115 @@ def _load() -> dict[str, Any]:
 
 
 def _save(state: dict[str, Any]) -> dict[str, Any]:
-    """Save A/B testing state to disk."""
+    """Save A/B testing state to disk (write temp + rename, never torn)."""
     _ensure_state_dir()
-    STATE_PATH.write_text(
-        json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    tmp = STATE_PATH.with_name(f"{STATE_PATH.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, STATE_PATH)
     return state
 
 
+@contextmanager
+def _file_lock():
+    _ensure_state_dir()
+    if fcntl is None:
+        yield
+        return
+    with open(STATE_PATH.with_name(STATE_PATH.name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _ShardedCounters:
+    """Per-thread ``(bucket, field) -> n`` dicts; only a thread's first event
+    takes the registry lock. Totals are summed across shards on read."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[dict[tuple[str, str], int]] = []
+        self._reg = threading.Lock()
+
+    def incr(self, key: tuple[str, str]) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._reg:
+                self._shards.append(shard)
+        shard[key] = shard.get(key, 0) + 1
+
+    def totals(self) -> Counter:
+        out: Counter = Counter()
+        with self._reg:
+            shards = list(self._shards)
+        for shard in shards:
+            out.update(dict(shard))
+        return out
+
+
+_counters = _ShardedCounters()
+_flushed: Counter = Counter()  # totals already folded into STATE_PATH
+_disk: dict[str, Any] | None = None  # state as of the last snapshot
+_snap_lock = threading.Lock()
+
+
+def _merged(state: dict[str, Any], delta: Counter) -> dict[str, Any]:
+    out = json.loads(json.dumps(state))
+    for (bucket, field), n in delta.items():
+        m = out["metrics"].setdefault(bucket, {"clicks": 0, "views": 0})
+        m[field] = m.get(field, 0) + n
+    return out
+
+
+def _pending() -> tuple[Counter, Counter]:
+    totals = _counters.totals()
+    return totals, totals - _flushed
+
+
+def snapshot() -> dict[str, Any]:
+    """Fold this worker's pending counts into STATE_PATH and return the result."""
+    global _disk, _flushed
+    with _snap_lock:
+        totals, delta = _pending()
+        with _file_lock():
+            state = _load()
+            if delta:
+                state = _merged(state, delta)
+                state["last_update"] = int(time.time())
+                _save(state)
+        _flushed = totals
+        _disk = state
+        return state
+
+
+def _state() -> dict[str, Any]:
+    """Last snapshot plus this worker's pending counts (no disk I/O after warmup)."""
+    global _disk
+    if _disk is None:
+        with _snap_lock:
+            if _disk is None:
+                _disk = _load()
+    return _merged(_disk, _pending()[1])
+
+
+async def snapshot_loop(stopper: asyncio.Event) -> None:
+    """Background task: periodic snapshot; a final one runs on shutdown."""
+    try:
+        while not stopper.is_set():
+            try:
+                await asyncio.wait_for(stopper.wait(), timeout=AB_SNAPSHOT_S)
+            except TimeoutError:
+                pass
+            try:
+                await asyncio.to_thread(snapshot)
+            except Exception as e:
+                print(f"[layout_ab] snapshot failed: {e}")
+    finally:
+        snapshot()
+
+
 def assign_bucket(visitor_id: str | None = None) -> str:
     """
     Assign visitor to bucket A or B.
@@ -65,18 +188,14 @@ def record_event(bucket: str, event: str) -> dict[str, Any]:
         event: "view" or "click"
 
     Returns:
-        Updated state dict
+        Updated state dict (last snapshot + this worker's pending counts)
     """
-    state = _load()
-    metrics = state["metrics"].setdefault(bucket, {"clicks": 0, "views": 0})
-
-    if event == "click":
-        metrics["clicks"] += 1
-    elif event == "view":
-        metrics["views"] += 1
-
+    field = _FIELDS.get(event)
+    if field is not None:
+        _counters.incr((bucket, field))
+    state = _state()
     state["last_update"] = int(time.time())
-    return _save(state)
+    return state
 
 
 def suggest_weights() -> dict[str, Any]:
@@ -86,7 +205,7 @@ def suggest_weights() -> dict[str, Any]:
     Returns:
         Dict with better bucket, CTRs, and weight adjustment hints
     """
-    state = _load()
+    state = _state()
     metrics_a = state["metrics"]["A"]
     metrics_b = state["metrics"]["B"]
 
@@ -118,9 +237,15 @@ def reset_metrics() -> dict[str, Any]:
     Returns:
         Reset state dict
     """
+    global _disk, _flushed
     state = {
         "weights": {"A": None, "B": None},
         "metrics": {"A": {"clicks": 0, "views": 0}, "B": {"clicks": 0, "views": 0}},
         "last_update": int(time.time()),
     }
-    return _save(state)
+    with _snap_lock:
+        with _file_lock():
+            _save(state)
+        _flushed = _counters.totals()  # pending counts are discarded too
+        _disk = state
+    return _merged(state, Counter())
@@ -0,0 +1,268 @@
+"""Buffered, batched sinks.
+
+Request handlers call ``submit(item)``, which only enqueues. A background task
+drains the queue in batches, triggered by ``batch`` items or ``flush_ms``,
+whichever comes first. Each batch is written in a worker thread, so disk and
+fsync stalls never block the event loop. The queue is bounded: when it is full,
+events are dropped and counted rather than growing memory. ``close_all()``
+drains every sink on shutdown.
+
+``JsonlSink`` writes each batch with a single ``os.write`` on an ``O_APPEND``
+descriptor; other sinks (e.g. ``analytics_events.EventsDbSink``) subclass
+``BatchSink`` and implement ``_write_batch``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+_SINKS: weakref.WeakSet[BatchSink] = weakref.WeakSet()
+
+
+class BatchSink(ABC):
+    """Bounded queue + background batch writer; subclasses write the batches."""
+
+    def __init__(
+        self,
+        batch: int = 256,
+        flush_ms: float = 200.0,
+        max_queue: int = 10000,
+    ):
+        self.batch = max(1, int(batch))
+        self.flush_s = max(0.0, float(flush_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self._tlock = threading.Lock()  # serializes writes in worker threads
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[float, Any]] | None = None
+        self._wake: asyncio.Event | None = None
+        self._wlock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self._stats: dict[str, Any] = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "write_errors": 0,
+            "high_water": 0,
+            "last_flush_ms": None,
+            "last_flush_lag_ms": None,  # age of the oldest item in the last batch
+            "max_flush_lag_ms": 0.0,
+        }
+        _SINKS.add(self)
+
+    # ---- producer side ------------------------------------------------------
+    def submit(self, item: Any) -> bool:
+        """Queue one item; returns False (and counts a drop) when full."""
+        self._ensure_started()
+        q = self._queue
+        try:
+            q.put_nowait((time.monotonic(), item))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            return False
+        self._stats["enqueued"] += 1
+        depth = q.qsize()
+        if depth > self._stats["high_water"]:
+            self._stats["high_water"] = depth
+        if depth == 1 or depth >= self.batch:
+            self._wake.set()
+        return True
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # First use, or the previous loop went away (e.g. per-request test loops):
+        # persist anything stranded in the old queue, then rebind to this loop.
+        leftover = self._drain()
+        if leftover:
+            self._write(leftover)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._wake = asyncio.Event()
+        self._wlock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    # ---- consumer side ------------------------------------------------------
+    def _drain(self, limit: int | None = None) -> list[tuple[float, Any]]:
+        out: list[tuple[float, Any]] = []
+        q = self._queue
+        while q is not None and (limit is None or len(out) < limit):
+            try:
+                out.append(q.get_nowait())
+            except (asyncio.QueueEmpty, RuntimeError):
+                break
+        return out
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            if self._queue.empty():
+                await self._wake.wait()
+                self._wake.clear()
+            # give the batch a chance to fill unless it already has
+            if self._queue.qsize() < self.batch and self.flush_s:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_s)
+                except TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything currently queued (in order)."""
+        if self._wlock is None or self._loop is not asyncio.get_running_loop():
+            leftover = self._drain()
+            if leftover:
+                self._write(leftover)
+            return
+        async with self._wlock:
+            while batch := self._drain(self.batch):
+                await asyncio.to_thread(self._write, batch)
+
+    async def close(self) -> None:
+        task = self._task
+        if task is not None and not task.done():
+            if self._loop is asyncio.get_running_loop():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+        with self._tlock:
+            self._release()
+
+    # ---- writer side (worker thread) ----------------------------------------
+    def _write(self, batch: list[tuple[float, Any]]) -> None:
+        lag = (time.monotonic() - batch[0][0]) * 1000
+        t0 = time.perf_counter()
+        with self._tlock:
+            if self._write_batch([item for _, item in batch]):
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+            else:
+                self._stats["write_errors"] += 1
+                self._stats["dropped"] += len(batch)
+            self._stats["last_flush_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            self._stats["last_flush_lag_ms"] = round(lag, 3)
+            self._stats["max_flush_lag_ms"] = round(
+                max(self._stats["max_flush_lag_ms"], lag), 3
+            )
+
+    @abstractmethod
+    def _write_batch(self, items: list[Any]) -> bool:
+        """Persist one batch (called with the write lock held); False on failure."""
+
+    def _release(self) -> None:
+        """Close underlying handles (called with the write lock held)."""
+
+    def name(self) -> str:
+        return type(self).__name__
+
+    def stats(self) -> dict[str, Any]:
+        q = self._queue
+        return {
+            **self._stats,
+            "queue_depth": q.qsize() if q is not None else 0,
+            "max_queue": self.max_queue,
+            "batch": self.batch,
+            "flush_ms": self.flush_s * 1000,
+        }
+
+
+class JsonlSink(BatchSink):
+    def __init__(
+        self,
+        path: str | Path,
+        batch: int = 256,
+        flush_ms: float = 200.0,
+        max_queue: int = 10000,
+        max_bytes: int = 0,
+    ):
+        super().__init__(batch=batch, flush_ms=flush_ms, max_queue=max_queue)
+        self.path = Path(path)
+        self.max_bytes = max(0, int(max_bytes))  # 0 = no size rotation
+        self._fd: int | None = None
+        self._size = 0
+        self._stats["rotations"] = 0
+
+    def name(self) -> str:
+        return str(self.path)
+
+    # ---- file side (worker thread) ------------------------------------------
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _moved(self) -> bool:
+        """True if the path was rotated away externally (metrics_rotate.py)."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except OSError:
+            return True
+
+    def _rotate(self) -> None:
+        """Move the full file aside as ``<stem>-YYYY-MM-DD.N<suffix>`` and reopen.
+
+        Same shard naming as scripts/metrics_rotate.py, so its gzip/prune passes
+        pick these up too.
+        """
+        self._close_fd()
+        day = datetime.now(UTC).strftime("%Y-%m-%d")
+        i = 1
+        while True:
+            alt = self.path.with_name(f"{self.path.stem}-{day}.{i}{self.path.suffix}")
+            if not alt.exists():
+                break
+            i += 1
+        os.replace(self.path, alt)
+        self._stats["rotations"] += 1
+        self._open()
+
+    def _release(self) -> None:
+        self._close_fd()
+
+    def _write_batch(self, lines: list[str]) -> bool:
+        data = "".join(ln if ln.endswith("\n") else ln + "\n" for ln in lines)
+        buf = data.encode("utf-8")
+        try:
+            if self._fd is None or self._moved():
+                self._close_fd()
+                self._open()
+            if self.max_bytes and self._size and self._size + len(buf) > self.max_bytes:
+                self._rotate()
+            view = memoryview(buf)
+            while view:  # one write per batch unless the kernel short-writes
+                view = view[os.write(self._fd, view) :]
+            self._size += len(buf)
+            return True
+        except OSError as e:
+            self._close_fd()
+            print(f"[metrics_sink] write failed ({self.path}): {e}")
+            return False
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "max_bytes": self.max_bytes}
+
+
+async def close_all() -> None:
+    """Drain and close every sink (lifespan shutdown)."""
+    for sink in list(_SINKS):
+        try:
+            await sink.close()
+        except Exception as e:
+            print(f"[metrics_sink] close failed ({sink.name()}): {e}")
@@ -1,26 +1,14 @@
 from __future__ import annotations
 
 import gzip
-import re
-from datetime import UTC, date, datetime, timezone
+from datetime import UTC, datetime, timezone
 from pathlib import Path
 from typing import Any, Dict
 
+from .analytics_reader import PATTERN
+from .analytics_reader import file_day as _parse_day
 from .analytics_store import AnalyticsStore
 
-PATTERN = re.compile(r"^events-(\d{8})\.jsonl(\.gz)?$")
-
-
-def _parse_day(p: Path) -> date | None:
-    m = PATTERN.match(p.name)
-    if not m:
-        return None
-    ymd = m.group(1)
-    try:
-        return datetime.strptime(ymd, "%Y%m%d").date()
-    except Exception:
-        return None
-
 
 def _gzip_file(src: Path, dst: Path) -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
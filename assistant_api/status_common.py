@@ -1,5 +1,7 @@
+import asyncio
 import os
 import os.path
+import time
 from datetime import UTC, datetime, timezone
 
 import httpx
@@ -16,6 +18,7 @@ from .llm_client import (
     PRIMARY_MODELS,
 )
 from .metrics import primary_fail_reason, providers
+from .util.testmode import is_test_mode
 
 
 def _llm_path(
@@ -28,95 +31,122 @@ def _llm_path(
     return "down"
 
 
-async def build_status(base: str) -> dict:
-    async with httpx.AsyncClient(timeout=3.0) as client:
+async def probe_ready(client: httpx.AsyncClient, base: str) -> bool:
+    try:
+        return (await client.get(f"{base}/ready")).status_code == 200
+    except Exception:
+        return False
+
+
+async def probe_llm(client: httpx.AsyncClient, base: str) -> dict:
+    llm_status: dict = {}
+    primary_model = OPENAI_MODEL
+    try:
+        health_resp = await client.get(f"{base}/llm/health")
+        if health_resp.status_code == 200:
+            health_json = health_resp.json()
+            if isinstance(health_json, dict):
+                llm_status = health_json.get("status", {}) or {}
+                primary_model = health_json.get("primary_model", OPENAI_MODEL)
+    except Exception:
+        llm_status = {}
+
+    # Fallback: if HTTP health unavailable, use local shim (enables pytest monkeypatching)
+    if not llm_status:
         try:
-            ready_probe = (await client.get(f"{base}/ready")).status_code == 200
+            _shim = _llm_client.llm_health()
+            if _shim:
+                llm_status = {
+                    "ollama": getattr(_shim, "ollama", None),
+                    "primary_model_present": bool(
+                        getattr(_shim, "primary_model_present", False)
+                    ),
+                    "openai": getattr(_shim, "openai", None),
+                }
         except Exception:
-            ready_probe = False
+            llm_status = {}
+    return {"status": llm_status, "primary_model": primary_model}
+
 
-        llm_status: dict = {}
-        primary_model = OPENAI_MODEL
+def _direct_rag() -> tuple[bool, str | None]:
+    conn = None
+    try:
+        conn = connect()
+        dim = index_dim(conn)
+        if dim is None:
+            return False, None
+        # Heuristic mode inference (matches embed_query logic)
+        if dim in (1536, 3072):
+            mode = "openai" if is_openai_configured() else "local-fallback"
+        elif dim in (384, 768):
+            mode = "local-model"
+        else:
+            mode = "local-fallback"
+        return True, mode
+    except Exception:
+        return False, None
+    finally:
         try:
-            health_resp = await client.get(f"{base}/llm/health")
-            if health_resp.status_code == 200:
-                health_json = health_resp.json()
-                if isinstance(health_json, dict):
-                    llm_status = health_json.get("status", {}) or {}
-                    primary_model = health_json.get("primary_model", OPENAI_MODEL)
+            if conn is not None:
+                conn.close()
         except Exception:
-            llm_status = {}
+            pass
+
+
+async def probe_rag(client: httpx.AsyncClient, base: str) -> dict:
+    # --- RAG health (prefer direct) ---
+    rag_http_error = None
+    rag_timeout = float(os.getenv("RAG_PROBE_TIMEOUT", "3"))
+    force_http = os.getenv("STATUS_RAG_VIA_HTTP", "0") == "1"
 
-        # Fallback: if HTTP health unavailable, use local shim (enables pytest monkeypatching)
-        if not llm_status:
-            try:
-                _shim = _llm_client.llm_health()
-                if _shim:
-                    llm_status = {
-                        "ollama": getattr(_shim, "ollama", None),
-                        "primary_model_present": bool(
-                            getattr(_shim, "primary_model_present", False)
-                        ),
-                        "openai": getattr(_shim, "openai", None),
-                    }
-            except Exception:
-                llm_status = {}
-
-        # --- RAG health (prefer direct) ---
-        rag_ok = False
-        rag_mode = None
-        rag_http_error = None
-        rag_timeout = float(os.getenv("RAG_PROBE_TIMEOUT", "3"))
-        force_http = os.getenv("STATUS_RAG_VIA_HTTP", "0") == "1"
-
-        def _direct_rag() -> tuple[bool, str | None]:
-            conn = None
-            try:
-                conn = connect()
-                dim = index_dim(conn)
-                if dim is None:
-                    return False, None
-                # Heuristic mode inference (matches embed_query logic)
-                if dim in (1536, 3072):
-                    mode = "openai" if is_openai_configured() else "local-fallback"
-                elif dim in (384, 768):
-                    mode = "local-model"
-                else:
-                    mode = "local-fallback"
-                return True, mode
-            except Exception:
-                return False, None
-            finally:
+    rag_ok, rag_mode = await asyncio.to_thread(_direct_rag)
+
+    if force_http:
+        try:
+            rag_resp = await client.post(
+                f"{base}/api/rag/query",
+                json={"question": "ping", "k": 1},
+                timeout=rag_timeout,
+            )
+            if rag_resp.status_code == 200:
                 try:
-                    if conn is not None:
-                        conn.close()
+                    rag_json = rag_resp.json()
                 except Exception:
-                    pass
+                    rag_json = {}
+                rag_ok = True
+                rag_mode = (
+                    rag_json.get("mode") if isinstance(rag_json, dict) else rag_mode
+                ) or rag_mode
+            else:
+                rag_http_error = f"status:{rag_resp.status_code}"
+        except Exception as e:
+            rag_http_error = str(e)
+    return {"ok": rag_ok, "mode": rag_mode, "http_error": rag_http_error}
 
-        direct_ok, direct_mode = _direct_rag()
-        rag_ok = direct_ok
-        rag_mode = direct_mode
 
-        if force_http:
-            try:
-                rag_resp = await client.post(
-                    f"{base}/api/rag/query",
-                    json={"question": "ping", "k": 1},
-                    timeout=rag_timeout,
-                )
-                if rag_resp.status_code == 200:
-                    try:
-                        rag_json = rag_resp.json()
-                    except Exception:
-                        rag_json = {}
-                    rag_ok = True
-                    rag_mode = (
-                        rag_json.get("mode") if isinstance(rag_json, dict) else rag_mode
-                    ) or rag_mode
-                else:
-                    rag_http_error = f"status:{rag_resp.status_code}"
-            except Exception as e:
-                rag_http_error = str(e)
+# Probe name -> coroutine; each one is refreshed independently by StatusAggregator
+PROBES = {"ready": probe_ready, "llm": probe_llm, "rag": probe_rag}
+
+
+async def build_status(base: str) -> dict:
+    async with httpx.AsyncClient(timeout=3.0) as client:
+        results = {name: await fn(client, base) for name, fn in PROBES.items()}
+    return compose_status(**results)
+
+
+def metrics_hint() -> dict:
+    return {
+        "providers": dict(providers),
+        "primary_fail_reason": dict(primary_fail_reason),
+        "fields": ["req", "5xx", "p95_ms", "tok_in", "tok_out"],
+    }
+
+
+def compose_status(ready: bool, llm: dict, rag: dict) -> dict:
+    ready_probe = ready
+    llm_status = llm["status"]
+    primary_model = llm["primary_model"]
+    rag_ok, rag_mode, rag_http_error = rag["ok"], rag["mode"], rag["http_error"]
 
     rag_db = os.getenv("RAG_DB", "./data/rag.sqlite")
     openai_flag = is_openai_configured()
@@ -168,14 +198,147 @@ async def build_status(base: str) -> dict:
             "sha": os.getenv("BACKEND_BUILD_SHA", "local"),
             "time": datetime.now(UTC).isoformat(timespec="seconds"),
         },
-        "metrics_hint": {
-            "providers": dict(providers),
-            "primary_fail_reason": dict(primary_fail_reason),
-            "fields": ["req", "5xx", "p95_ms", "tok_in", "tok_out"],
-        },
+        "metrics_hint": metrics_hint(),
         "tooltip": (
             f"Ollama/OpenAI configured: {bool(openai_flag)}. "
             f"RAG DB: {rag_db}. "
             f"LLM path: {llm_path}"
         ),
     }
+
+
+def _probe_setting(kind: str, name: str, default: float) -> float:
+    return float(os.getenv(f"STATUS_{kind}_{name.upper()}_S", str(default)))
+
+
+# name -> (refresh interval, staleness threshold) in seconds
+PROBE_SCHEDULE: dict[str, tuple[float, float]] = {
+    name: (_probe_setting("REFRESH", name, every), _probe_setting("STALE", name, stale))
+    for name, every, stale in (("ready", 5, 30), ("llm", 10, 60), ("rag", 30, 120))
+}
+
+
+def snapshot_enabled() -> bool:
+    default = "0" if is_test_mode() else "1"
+    return os.getenv("STATUS_SNAPSHOT_ENABLED", default).lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+
+class StatusAggregator:
+    """Last-known status, refreshed per probe by a lifespan task.
+
+    ``get`` serves a copy of the composed document. Probes older than their
+    staleness threshold (or all of them with ``fresh=True``, or when no
+    background loop is running) are re-run inline first. Each probe has at most
+    one run in flight; concurrent callers await that run instead of starting
+    their own.
+    """
+
+    def __init__(self, schedule: dict[str, tuple[float, float]] = PROBE_SCHEDULE):
+        self.schedule = schedule
+        self.running = False
+        self._values: dict[str, object] = {}
+        self._at: dict[str, float] = {}  # last success
+        self._tried: dict[str, float] = {}  # last attempt (paces retries)
+        self._ms: dict[str, float] = {}
+        self._errors: dict[str, str] = {}
+        self._doc: dict | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def _run_probe(self, name: str, base: str):
+        t0 = time.perf_counter()
+        self._tried[name] = time.monotonic()
+        try:
+            # The run owns its client: it is shared by every waiter and must
+            # outlive whichever caller happened to start it
+            async with httpx.AsyncClient(timeout=3.0) as client:
+                self._values[name] = await PROBES[name](client, base)
+            self._at[name] = time.monotonic()
+            self._errors.pop(name, None)
+        except Exception as e:
+            self._errors[name] = str(e) or type(e).__name__
+        self._ms[name] = round((time.perf_counter() - t0) * 1000.0, 2)
+
+    async def refresh(self, base: str, names: list[str] | None = None) -> None:
+        names = list(self.schedule) if names is None else names
+        loop = asyncio.get_running_loop()
+        runs = []
+        for n in names:
+            t = self._inflight.get(n)
+            if t is None or t.done() or t.get_loop() is not loop:
+                t = self._inflight[n] = loop.create_task(self._run_probe(n, base))
+            runs.append(t)
+        # shield: a caller that goes away must not cancel a shared run
+        await asyncio.gather(*(asyncio.shield(t) for t in runs))
+        if all(n in self._values for n in self.schedule):
+            self._doc = compose_status(**self._values)
+
+    def _stale(self, name: str, now: float) -> bool:
+        at = self._at.get(name)
+        return at is None or now - at > self.schedule[name][1]
+
+    async def get(self, base: str, fresh: bool = False) -> dict:
+        now = time.monotonic()
+        if fresh or not self.running:
+            names = list(self.schedule)
+        else:
+            names = [n for n in self.schedule if self._stale(n, now)]
+        if names:
+            await self.refresh(base, names)
+            now = time.monotonic()
+        data = dict(self._doc or {})
+        data["metrics_hint"] = metrics_hint()
+        probes: dict[str, dict] = {}
+        for name, (every, stale) in self.schedule.items():
+            at = self._at.get(name)
+            probes[name] = {
+                "age_s": round(now - at, 3) if at is not None else None,
+                "stale": self._stale(name, now),
+                "refresh_s": every,
+                "stale_after_s": stale,
+                "ms": self._ms.get(name),
+            }
+            if name in self._errors:
+                probes[name]["error"] = self._errors[name]
+        data["snapshot"] = {
+            "source": "background" if self.running else "on-demand",
+            "refreshed": names,
+            # age of the oldest probe result the document was built from
+            "age_s": max((p["age_s"] or 0.0) for p in probes.values()),
+            "probes": probes,
+        }
+        return data
+
+    async def run(self, base: str, stopper: asyncio.Event) -> None:
+        """Refresh each probe when its interval elapses until ``stopper`` is set."""
+        self.running = True
+        try:
+            while not stopper.is_set():
+                now = time.monotonic()
+                due = [
+                    n
+                    for n, (every, _) in self.schedule.items()
+                    if n not in self._tried or now - self._tried[n] >= every
+                ]
+                if due:
+                    try:
+                        await self.refresh(base, due)
+                    except Exception as e:
+                        print(f"[status] refresh error (tolerated): {e}")
+                now = time.monotonic()
+                wait = min(
+                    self._tried.get(n, now) + every - now
+                    for n, (every, _) in self.schedule.items()
+                )
+                try:
+                    await asyncio.wait_for(stopper.wait(), timeout=max(0.5, wait))
+                except TimeoutError:
+                    pass
+        finally:
+            self.running = False
+
+
+aggregator = StatusAggregator()
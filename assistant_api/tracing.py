@@ -0,0 +1,201 @@
+"""Per-request span tracing for the chat pipeline.
+
+``start(name)`` opens a root trace for the current request (subject to
+``TRACE_SAMPLE_RATE``, or forced with an ``x-trace: 1`` header) and stores it
+in a ContextVar; ``span(stage)`` nests timed spans under whatever span is
+current, so stages called from helpers (llm_client, rag_query) attach to the
+request that triggered them. When no trace is active ``span`` only reads the
+ContextVar.
+
+``finish`` pushes the trace into a ring of the last ``TRACE_RING_SIZE``
+traces (``GET /api/trace/recent``), feeds each span into the ``span``
+latency series and returns the ``Server-Timing`` header value.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from .latency_hist import series
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_RING_SIZE = int(os.getenv("TRACE_RING_SIZE", "200"))
+# Request paths that open a trace (comma separated, exact match)
+TRACE_PATHS = frozenset(
+    p.strip() for p in os.getenv("TRACE_PATHS", "/chat").split(",") if p.strip()
+)
+
+
+@dataclass
+class Span:
+    name: str
+    id: int
+    parent: int | None
+    start: float
+    end: float | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+@dataclass
+class Trace:
+    id: str
+    name: str
+    t0: float
+    ts: float
+    spans: list[Span] = field(default_factory=list)
+    attrs: dict[str, Any] = field(default_factory=dict)
+    _ids: Any = field(default_factory=itertools.count)
+
+    def open(self, name: str, parent: int | None, attrs: dict) -> Span:
+        s = Span(name, next(self._ids), parent, time.perf_counter(), attrs=attrs)
+        self.spans.append(s)
+        return s
+
+    def to_dict(self) -> dict:
+        root = self.spans[0]
+        return {
+            "id": self.id,
+            "name": self.name,
+            "ts": self.ts,
+            "ms": _ms(root.start, root.end),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            "spans": [
+                {
+                    "id": s.id,
+                    "parent": s.parent,
+                    "name": s.name,
+                    "start_ms": _ms(self.t0, s.start),
+                    "ms": _ms(s.start, s.end),
+                    **({"attrs": s.attrs} if s.attrs else {}),
+                    **({"error": s.error} if s.error else {}),
+                }
+                for s in self.spans[1:]
+            ],
+        }
+
+
+def _ms(a: float, b: float | None) -> float | None:
+    return None if b is None else round((b - a) * 1000.0, 2)
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_current: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+_ring: deque[dict] = deque(maxlen=max(1, TRACE_RING_SIZE))
+_ring_lock = threading.Lock()
+_seq = itertools.count(1)
+
+
+def sampled(force: bool = False) -> bool:
+    if force:
+        return True
+    return TRACE_SAMPLE_RATE >= 1.0 or random.random() < TRACE_SAMPLE_RATE
+
+
+def start(name: str, force: bool = False, **attrs: Any) -> Trace | None:
+    """Open a root trace in the current context (None when not sampled)."""
+    if not sampled(force):
+        return None
+    tr = Trace(f"{int(time.time() * 1000):x}-{next(_seq)}", name, 0.0, time.time())
+    root = tr.open(name, None, attrs)
+    tr.t0 = root.start
+    _trace.set(tr)
+    _current.set(root)
+    return tr
+
+
+def current() -> Trace | None:
+    return _trace.get()
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach attributes (route, cache hit, ...) to the active trace."""
+    tr = _trace.get()
+    if tr is not None:
+        tr.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """Time a stage under the current span; a no-op outside a sampled trace."""
+    tr = _trace.get()
+    if tr is None:
+        yield None
+        return
+    parent = _current.get()
+    s = tr.open(name, parent.id if parent is not None else None, attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+def _server_timing(tr: Trace) -> str:
+    # Top-level stages only, summed per name (e.g. two "generate" spans)
+    root_id = tr.spans[0].id
+    totals: dict[str, float] = {}
+    for s in tr.spans[1:]:
+        if s.parent == root_id and s.end is not None:
+            totals[s.name] = totals.get(s.name, 0.0) + (s.end - s.start) * 1000.0
+    parts = [f"{n};dur={ms:.1f}" for n, ms in totals.items()]
+    root = tr.spans[0]
+    parts.append(f"total;dur={(root.end - root.start) * 1000.0:.1f}")
+    return ", ".join(parts)
+
+
+def finish(tr: Trace, **attrs: Any) -> str:
+    """Close ``tr``, keep it in the ring and return its Server-Timing value."""
+    root = tr.spans[0]
+    root.end = time.perf_counter()
+    tr.attrs.update(attrs)
+    for s in tr.spans[1:]:
+        if s.end is not None:
+            series("span", s.name).record((s.end - s.start) * 1000.0)
+    doc = tr.to_dict()
+    with _ring_lock:
+        _ring.append(doc)
+    return _server_timing(tr)
+
+
+def recent(limit: int = 50, name: str | None = None, min_ms: float = 0.0) -> list[dict]:
+    """Newest first, optionally filtered by trace name and total duration."""
+    with _ring_lock:
+        items = list(_ring)
+    out = []
+    for t in reversed(items):
+        if name and t["name"] != name:
+            continue
+        if (t["ms"] or 0.0) < min_ms:
+            continue
+        out.append(t)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def stats() -> dict:
+    with _ring_lock:
+        n = len(_ring)
+    return {
+        "sample_rate": TRACE_SAMPLE_RATE,
+        "ring_size": _ring.maxlen,
+        "traces": n,
+        "paths": sorted(TRACE_PATHS),
+    }
@@ -1,6 +1,8 @@
 import json
 import os
 import sqlite3
+import threading
+import time
 from typing import List, Optional, Tuple
 
 # Optional FAISS: allow backend to run without faiss installed (Windows-friendly)
@@ -9,7 +11,7 @@ try:
 except Exception:  # pragma: no cover - environment-specific
     faiss = None  # type: ignore
 from .embeddings import embed_texts, embed_texts_openai
-from .metrics import timer
+from .metrics import stage_annotate, stage_record_ms, timer
 
 IDX_DIR = os.getenv("RAG_INDEX_DIR", "data")
 _DENSE_DISABLED = os.getenv("RAG_DENSE_DISABLE", "0") in {
@@ -27,9 +29,9 @@ def _connect_db() -> sqlite3.Connection:
     path = os.environ.get("RAG_DB")
     if not path:
         raise RuntimeError("RAG_DB not set")
-    con = sqlite3.connect(path)
-    con.execute("PRAGMA journal_mode=WAL")
-    return con
+    from .db import connect
+
+    return connect()
 
 
 def _fetch_chunks(con, project_id: str | None = None) -> list[tuple[int, str]]:
@@ -77,25 +79,105 @@ def build_index(project_id: str | None = None) -> dict:
     with timer("embeddings", "build-index"):
         index.add(vecs)
 
-    faiss.write_index(index, IDX_PATH)  # type: ignore
-    with open(MAP_PATH, "w", encoding="utf-8") as f:
+    # Write to temp files then rename so concurrent readers never see a torn index
+    tmp_idx, tmp_map = IDX_PATH + ".tmp", MAP_PATH + ".tmp"
+    faiss.write_index(index, tmp_idx)  # type: ignore
+    with open(tmp_map, "w", encoding="utf-8") as f:
         json.dump([{"rowid": i, "chunk_id": int(cid)} for i, cid in enumerate(ids)], f)
+    os.replace(tmp_idx, IDX_PATH)
+    os.replace(tmp_map, MAP_PATH)
+    _DENSE.swap(index, np.asarray(ids, dtype=np.int64))
+    # Every dense query now ranks against the new index
+    from .answers_cache import invalidate
+
+    invalidate()
     return {"ok": True, "count": len(ids), "index": IDX_PATH}
 
 
+class _DenseIndex:
+    """Process-wide resident FAISS index + row->chunk_id map.
+
+    Loaded lazily on first query and kept in memory. A cheap stat() of the index
+    files on each lookup detects rebuilds by other processes; ``build_index`` in
+    this process swaps the fresh index in directly. Readers grab one immutable
+    (index, ids) tuple, so a swap never exposes a half-updated pair.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: tuple | None = None  # (index, ids: np.ndarray[int64])
+        self._sig: tuple | None = None
+        self.generation = 0
+
+    @staticmethod
+    def _signature() -> tuple | None:
+        try:
+            a, b = os.stat(IDX_PATH), os.stat(MAP_PATH)
+        except OSError:
+            return None
+        return (a.st_mtime_ns, a.st_size, b.st_mtime_ns, b.st_size)
+
+    def _publish(self, index, ids, sig, load_ms: float, backend: str) -> None:
+        self._state = (index, ids)
+        self._sig = sig
+        self.generation += 1
+        try:
+            idx_bytes = os.path.getsize(IDX_PATH)
+        except OSError:
+            idx_bytes = (
+                int(getattr(index, "ntotal", 0)) * int(getattr(index, "d", 0)) * 4
+            )
+        stage_record_ms("dense_index", backend, load_ms)
+        stage_annotate(
+            "dense_index",
+            rows=int(len(ids)),
+            bytes=int(idx_bytes + ids.nbytes),
+            generation=self.generation,
+        )
+
+    def swap(self, index, ids) -> None:
+        with self._lock:
+            self._publish(index, ids, self._signature(), 0.0, "build")
+
+    def get(self) -> tuple | None:
+        sig = self._signature()
+        if sig is None:
+            return None
+        if sig == self._sig and self._state is not None:
+            return self._state
+        with self._lock:
+            if sig == self._sig and self._state is not None:
+                return self._state
+            import numpy as np
+
+            t0 = time.perf_counter()
+            index = faiss.read_index(IDX_PATH)  # type: ignore
+            with open(MAP_PATH, encoding="utf-8") as f:
+                mapping = json.load(f)
+            ids = np.fromiter(
+                (m["chunk_id"] for m in mapping), dtype=np.int64, count=len(mapping)
+            )
+            self._publish(index, ids, sig, (time.perf_counter() - t0) * 1000.0, "faiss")
+            return self._state
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = None
+            self._sig = None
+
+
+_DENSE = _DenseIndex()
+
+
 def dense_search(query: str, topk: int = 50) -> list[int]:
     if _DENSE_DISABLED or faiss is None:
         return []
-    if not (os.path.exists(IDX_PATH) and os.path.exists(MAP_PATH)):
+    state = _DENSE.get()
+    if state is None:
         return []
-    index = faiss.read_index(IDX_PATH)  # type: ignore
-    with open(MAP_PATH, encoding="utf-8") as f:
-        mapping = json.load(f)
+    index, id_map = state
     qv = embed_texts([query])
     D, I = index.search(qv, topk)  # ignore scores here (we’ll rerank later)
-    ids = []
-    for idx in I[0]:
-        if idx < 0:
-            continue
-        ids.append(mapping[idx]["chunk_id"])
-    return ids
+    rows = I[0]
+    rows = rows[(rows >= 0) & (rows < len(id_map))]
+    return id_map[rows].tolist()
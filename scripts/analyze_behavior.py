@@ -1,5 +1,5 @@
 """
-Reads last 14 days of analytics JSONL from ./data/analytics,
+Reads last 14 days of analytics JSONL (plain or .gz) from ./data/analytics,
 computes section weights, writes weights.json (idempotent).
 """
 import json
@@ -11,32 +11,25 @@ import os
 # Add parent directory to path to import assistant_api
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from assistant_api.services.analytics_reader import iter_events
 from assistant_api.services.analytics_store import AnalyticsStore
 from assistant_api.services.behavior_learning import analyze
 from assistant_api.settings import get_settings
 
 
 def load_events(dir_path: Path):
-    files = sorted(dir_path.glob("events-*.jsonl"))[-14:]
-    cutoff = datetime.now(UTC) - timedelta(days=14)
+    since = (datetime.now(UTC) - timedelta(days=14)).date()
     events = []
-    for p in files:
-        with p.open() as f:
-            for line in f:
-                try:
-                    e = json.loads(line)
-                except Exception:
-                    continue
-                ts = e.get("ts")
-                if isinstance(ts, str):
-                    try:
-                        # tolerate "Z" suffix
-                        e["ts"] = datetime.fromisoformat(
-                            ts.replace("Z", "+00:00")
-                        ).isoformat()
-                    except Exception:
-                        continue
-                events.append(e)
+    # includes gzip-rotated days (events-YYYYMMDD.jsonl.gz)
+    for e in iter_events(dir_path, since=since):
+        ts = e.get("ts")
+        if isinstance(ts, str):
+            try:
+                # tolerate "Z" suffix
+                e["ts"] = datetime.fromisoformat(ts.replace("Z", "+00:00")).isoformat()
+            except Exception:
+                continue
+        events.append(e)
     return events
 
 
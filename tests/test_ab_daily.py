@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from assistant_api.services import ab_store
+
+DAY = 86400
+T0 = 1_700_000_000  # 2023-11-14/15 depending on TZ; tests use relative days
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ab_store, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(ab_store, "EVENTS", tmp_path / "ab_events.jsonl")
+    return tmp_path
+
+
+def test_legacy_log_is_folded_once(store):
+    log = store / "ab_events.jsonl"
+    lines = [ab_store._event("A", "view", T0), ab_store._event("A", "click", T0)]
+    log.write_text("".join(json.dumps(e) + "\n" for e in lines))
+
+    ab_store.append_event("B", "view", ts=T0)
+    s = ab_store.summary()
+    assert s["overall"]["A"] == {"views": 1, "clicks": 1}
+    assert s["overall"]["B"] == {"views": 1, "clicks": 0}
+    assert len(log.read_text().splitlines()) == 3
+
+
+def test_summary_reads_only_the_aggregate(store, monkeypatch):
+    for i in range(30):
+        ab_store.append_event("A", "view", ts=T0 + i * DAY)
+        ab_store.append_event("B", "click", ts=T0 + i * DAY)
+
+    def boom():
+        raise AssertionError("summary must not scan the raw log")
+
+    monkeypatch.setattr(ab_store, "iter_events", boom)
+    first = ab_store._daykey(T0 + 10 * DAY)
+    last = ab_store._daykey(T0 + 12 * DAY)
+    s = ab_store.summary(from_day=first, to_day=last)
+    assert [r["day"] for r in s["series"]] == [
+        ab_store._daykey(T0 + i * DAY) for i in (10, 11, 12)
+    ]
+    assert s["overall"]["A"]["views"] == 3 and s["overall"]["B"]["clicks"] == 3
+
+
+def test_compact_truncates_raw_events_but_keeps_counts(store):
+    for i in range(10):
+        ab_store.append_event("A", "view", ts=T0 + i * DAY)
+    before = ab_store.summary()
+    res = ab_store.compact(keep_days=3, now=T0 + 9 * DAY)
+    assert res == {**res, "kept": 4, "dropped": 6}
+    assert len(list(ab_store.iter_events())) == 4
+    assert ab_store.summary() == before
+    ab_store.append_event("A", "click", ts=T0 + 9 * DAY)
+    assert ab_store.summary()["overall"]["A"] == {"views": 10, "clicks": 1}
+
+
+def test_batch_written_during_compact_is_not_lost(store, monkeypatch):
+    import threading
+
+    for _ in range(3):
+        ab_store.append_event("A", "view")  # recent: kept by compact
+    sink = ab_store._EventsSink(ab_store.EVENTS)
+    reading, written = threading.Event(), threading.Event()
+    orig = ab_store.iter_events
+
+    def slow_iter():
+        yield from orig()
+        # log fully read, not yet replaced: the sink's write must wait for us
+        reading.set()
+        written.wait(0.3)
+
+    monkeypatch.setattr(ab_store, "iter_events", slow_iter)
+    t = threading.Thread(target=ab_store.compact, kwargs={"keep_days": 30})
+    t.start()
+    reading.wait(2)
+    w = threading.Thread(
+        target=lambda: (
+            sink._write_batch([ab_store._event("B", "click")]),
+            written.set(),
+        )
+    )
+    w.start()
+    t.join()
+    w.join()
+    monkeypatch.setattr(ab_store, "iter_events", orig)
+    assert [e["bucket"] for e in ab_store.iter_events()] == ["A", "A", "A", "B"]
+    sink._release()
+
+
+def test_sink_batch_lands_in_both_stores_or_neither(store, monkeypatch):
+    import sqlite3
+
+    ab_store.append_event("A", "view", ts=T0)
+    sink = ab_store._EventsSink(ab_store.EVENTS)
+    before = ab_store.summary()
+    fold = ab_store._fold
+
+    def broken_fold(con, events):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(ab_store, "_fold", broken_fold)
+    assert sink._write_batch([ab_store._event("B", "view", T0)]) is False
+    monkeypatch.setattr(ab_store, "_fold", fold)
+
+    # the commit fails after the lines were appended: they are taken back out
+    path, con = ab_store._daily_con
+
+    class FailingCommit:
+        def __getattr__(self, name):
+            return getattr(con, name)
+
+        def commit(self):
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(ab_store, "_daily_con", (path, FailingCommit()))
+    assert sink._write_batch([ab_store._event("B", "view", T0)]) is False
+    monkeypatch.setattr(ab_store, "_daily_con", (path, con))
+
+    assert ab_store.summary() == before
+    assert [e["bucket"] for e in ab_store.iter_events()] == ["A"]
+    assert sink._write_batch([ab_store._event("B", "click", T0)])
+    assert ab_store.summary()["overall"]["B"] == {"views": 0, "clicks": 1}
+    assert len(list(ab_store.iter_events())) == 2
+    sink._release()
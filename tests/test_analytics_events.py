@@ -0,0 +1,65 @@
+import asyncio
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from assistant_api import analytics
+from assistant_api.services import analytics_events
+from assistant_api.services.analytics_events import EventsDbSink
+
+
+def test_events_sink_batches_with_executemany(tmp_path):
+    db = tmp_path / "events.sqlite"
+    sink = EventsDbSink(db, batch=50, flush_ms=50)
+    statements: list[str] = []
+
+    async def main():
+        for i in range(120):
+            assert sink.submit(
+                analytics_events.row(1_700_000_000 + i, type="page_view", path="/")
+            )
+        await asyncio.sleep(0)  # let the writer open the DB
+        await sink.flush()
+        sink._con.set_trace_callback(statements.append)
+        sink.submit(analytics_events.row(1_700_000_500, type="dwell", seconds=3.0))
+        await sink.close()
+
+    asyncio.run(main())
+    st = sink.stats()
+    assert st["written"] == 121 and st["dropped"] == 0
+    assert st["batches"] == 4 and st["last_flush_lag_ms"] is not None
+    assert sum(s.startswith("INSERT INTO events") for s in statements) == 1
+
+    con = sqlite3.connect(db)
+    assert con.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 121
+    assert con.execute("SELECT DISTINCT day FROM events").fetchall() == [
+        ("2023-11-14",)
+    ]
+    idx = {r[1] for r in con.execute("PRAGMA index_list('events')")}
+    assert {"idx_events_ts", "idx_events_day_type"} <= idx
+    assert con.execute("SELECT SUM(events) FROM v_daily_summary").fetchone()[0] == 121
+    con.close()
+
+
+def test_collect_persists_write_behind_and_reports_metrics(tmp_path, monkeypatch):
+    from assistant_api.main import app
+
+    db = tmp_path / "events.sqlite"
+    sink = EventsDbSink(db, batch=1000, flush_ms=10_000)
+    monkeypatch.setattr(analytics_events, "_sink", sink)
+    monkeypatch.setattr(analytics, "ANALYTICS_PERSIST", True)
+    c = TestClient(app)
+    for _ in range(3):
+        r = c.post(
+            "/analytics/collect",
+            json={"type": "page_view", "path": "/projects/x", "persist": True},
+        )
+        assert r.status_code == 200
+    m = c.get("/api/metrics").json()
+    assert m["analytics_events"]["enqueued"] == 3
+
+    asyncio.run(sink.close())
+    con = sqlite3.connect(db)
+    rows = con.execute("SELECT type, path FROM events").fetchall()
+    assert rows == [("page_view", "/projects/x")] * 3
+    con.close()
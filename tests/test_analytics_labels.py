@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from prometheus_client import generate_latest
+
+from assistant_api import analytics_labels as lbl
+from assistant_api.main import app
+
+
+def test_bounded_labels_overflow_to_other():
+    reg = lbl.BoundedLabels(2, allow=["direct"])
+    assert reg("Proj-A") == "proj-a"
+    assert reg("proj b!") == "proj-b"
+    assert reg("proj-c") == "other"
+    assert reg("proj-a") == "proj-a"  # admitted values keep their label
+    assert reg("direct") == "direct" and reg(None) == "unknown"
+
+    strict = lbl.BoundedLabels(10, allow=["alpha"], strict=True)
+    assert strict("alpha") == "alpha" and strict("beta") == "other"
+
+
+def test_bins_hosts_and_percent_are_clamped():
+    assert lbl.bin_index(-5) == "0" and lbl.bin_index(10_000) == str(lbl.CLICK_BINS - 1)
+    assert lbl.bin_index("junk") == "0"
+    assert lbl.scroll_percent(63) == "50" and lbl.scroll_percent(400) == "100"
+    assert lbl.host("https://User@Example.com:8443/x?y") == "example.com"
+    assert lbl.region("us") == "US" and lbl.region("XXXX") == "ZZ"
+
+
+def test_collect_labels_stay_bounded(monkeypatch):
+    monkeypatch.setattr(lbl, "ref_hosts", lbl.BoundedLabels(3, ["direct"]))
+    c = TestClient(app)
+    for i in range(25):
+        c.post(
+            "/analytics/collect",
+            json={
+                "type": "page_view",
+                "path": f"/crawler/{i}?q={i}",
+                "ref_host": f"spam{i}.example",
+                "device": "desktop",
+                "theme": f"t{i}",
+            },
+        )
+        c.post(
+            "/analytics/collect",
+            json={"type": "click_bin", "x": i * 1000, "y": -i, "path": f"/x/{i}"},
+        )
+    m = generate_latest().decode()  # /metrics answers JSON in test mode
+    assert "crawler" not in m and 'path="other"' in m
+    assert 'ref_host="spam0.example"' in m and 'ref_host="spam20.example"' not in m
+    assert 'ref_host="other"' in m and 'theme="t3"' not in m
+    assert f'x_bin="{lbl.CLICK_BINS - 1}"' in m and 'x_bin="24000"' not in m
+    counts = lbl.series_counts()
+    assert counts["click_bin_total"] <= lbl.CLICK_BINS
+    assert 'analytics_label_series{metric="page_view_total"}' in m
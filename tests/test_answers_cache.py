@@ -0,0 +1,81 @@
+import sqlite3
+
+from assistant_api import answers_cache as ac
+from assistant_api import chat_cache
+from assistant_api import db as db_module
+
+
+def _con(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    return db_module.connect()
+
+
+def _keys(con):
+    return sorted(r[0] for r in con.execute("SELECT query_hash FROM answers_cache"))
+
+
+def test_ttl_is_enforced_at_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(ac, "ANSWERS_CACHE_TTL_S", 100)
+    con = _con(tmp_path, monkeypatch)
+    ac.put(con, "p", "h1", {"hits": [1]}, now=1_000_000)
+    assert ac.get(con, "p", "h1", now=1_000_050) == {"hits": [1]}
+    assert ac.get(con, "p", "h1", now=1_000_101) is None
+    assert _keys(con) == []
+    con.close()
+
+
+def test_compact_evicts_least_recently_hit(tmp_path, monkeypatch):
+    monkeypatch.setattr(ac, "ANSWERS_CACHE_TTL_S", 0)
+    monkeypatch.setattr(ac, "ANSWERS_CACHE_MAX_ROWS", 2)
+    con = _con(tmp_path, monkeypatch)
+    for i, h in enumerate(["a", "b", "c"]):
+        ac.put(con, "p", h, {"x": "y" * 100}, now=1_000 + i)
+    ac.get(con, "p", "a", now=2_000)  # a is now the most recently hit
+    res = ac.compact(con, now=2_001)
+    assert res["evicted"] == 1 and _keys(con) == ["a", "c"]
+
+    monkeypatch.setattr(ac, "ANSWERS_CACHE_MAX_BYTES", 150)
+    assert ac.compact(con, now=2_002)["evicted"] == 1 and _keys(con) == ["a"]
+    con.close()
+
+
+def test_invalidate_scoped_rows_and_chat_cache(tmp_path, monkeypatch):
+    con = _con(tmp_path, monkeypatch)
+    for pj, h in [("a", "1"), ("a,b", "2"), ("", "3"), ("b", "4"), ("ab", "5")]:
+        ac.put(con, pj, h, {})
+    calls = []
+    monkeypatch.setattr(chat_cache, "invalidate", calls.append)
+    assert ac.invalidate("a", con=con) == 3
+    assert _keys(con) == ["4", "5"] and calls == ["a"]
+    con.close()
+
+
+def test_legacy_table_gets_last_hit_at(tmp_path, monkeypatch):
+    path = tmp_path / "rag.sqlite"
+    raw = sqlite3.connect(path)
+    raw.execute(
+        "CREATE TABLE answers_cache(project_id TEXT, query_hash TEXT PRIMARY KEY,"
+        " answer TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    )
+    raw.execute(
+        "INSERT INTO answers_cache(project_id, query_hash, answer) VALUES('', 'h', '{}')"
+    )
+    raw.commit()
+    raw.close()
+    con = _con(tmp_path, monkeypatch)
+    (hit,) = con.execute("SELECT last_hit_at FROM answers_cache").fetchone()
+    assert hit is not None
+    con.close()
+
+
+def test_ingest_direct_invalidates_project(tmp_path, monkeypatch):
+    from assistant_api.ingest import ingest_direct
+
+    con = _con(tmp_path, monkeypatch)
+    ac.put(con, "proj", "h1", {})
+    ac.put(con, "other", "h2", {})
+    con.close()
+    ingest_direct(project_id="proj", doc_id="d1", text="hello world")
+    con = db_module.connect()
+    assert _keys(con) == ["h2"]
+    con.close()
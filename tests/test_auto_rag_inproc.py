@@ -0,0 +1,27 @@
+import asyncio
+
+from assistant_api import auto_rag
+from assistant_api.metrics import stage_snapshot
+
+
+def test_fetch_context_calls_retrieval_in_process(monkeypatch):
+    seen = {}
+
+    async def fake_retrieve(q, **kw):
+        seen["question"] = q.question
+        return {"ok": True, "matches": [{"repo": "r", "path": f"p{i}"} for i in range(9)]}
+
+    def no_http(*a, **kw):  # pragma: no cover - must not be reached
+        raise AssertionError("HTTP loopback used in inproc mode")
+
+    monkeypatch.setattr(auto_rag, "RAG_MODE", "inproc")
+    monkeypatch.setattr(auto_rag, "retrieve", fake_retrieve)
+    monkeypatch.setattr(auto_rag.httpx, "AsyncClient", no_http)
+
+    out = asyncio.run(auto_rag.fetch_context("what is ledgermind", k=3))
+    assert seen["question"] == "what is ledgermind"
+    assert [m["path"] for m in out] == ["p0", "p1", "p2"]
+
+
+def test_retrieval_stage_is_reported():
+    assert "retrieval" in stage_snapshot()
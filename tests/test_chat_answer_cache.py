@@ -0,0 +1,173 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from assistant_api import chat_cache
+from assistant_api.chat_cache import ChatAnswerCache
+
+
+def _payload(text: str) -> dict:
+    return {"choices": [{"message": {"content": text}}], "content": text}
+
+
+def _fake_model(question):
+    # Stand-in for the query embedder: the hashed vectors, treated as a model
+    return chat_cache.embed(chat_cache.normalize(question)), "model"
+
+
+def test_exact_then_semantic_lookup_is_scoped():
+    c = ChatAnswerCache(max_entries=10, ttl_s=60, min_sim=0.9, embedder=_fake_model)
+    scope = chat_cache.scope_key("rag", "ledgermind", "m1", None)
+    c.put(
+        scope, "What stack does LedgerMind use?", _payload("FastAPI."), "primary", 800
+    )
+
+    hit = c.get(scope, "what stack does ledgermind use")
+    assert hit.kind == "exact" and hit.payload["content"] == "FastAPI."
+    hit = c.get(scope, "What stack does LedgerMind use today?")
+    assert hit.kind == "semantic" and hit.similarity >= 0.9 and hit.saved_ms == 800
+
+    assert c.get(scope, "How does LedgerMind handle taxes?") is None
+    other = chat_cache.scope_key("rag", "siteagent", "m1", None)
+    assert c.get(other, "What stack does LedgerMind use?") is None
+    assert c.get(scope[:2] + ("m2", ""), "What stack does LedgerMind use?") is None
+
+
+def test_negated_question_misses_on_both_tiers():
+    calls = []
+
+    def lexical(question):
+        calls.append(question)
+        return chat_cache.embed(chat_cache.normalize(question)), "lexical"
+
+    scope = chat_cache.scope_key("rag", "ledgermind", "m1", None)
+    for embedder in (_fake_model, lexical):
+        # all three score >= 0.85 on the hashed vectors: the guard rejects them
+        c = ChatAnswerCache(min_sim=0.85, embedder=embedder)
+        c.put(scope, "Is the project open source?", _payload("Yes."), "primary", 500)
+        assert c.get(scope, "Is the project not open source?") is None
+        assert c.get(scope, "Isn't the project open source?") is None
+        assert c.get(scope, "Is the SiteAgent project open source?") is None
+
+    # lexical vectors need the stricter threshold; one embed per question
+    c = ChatAnswerCache(min_sim=0.9, lexical_min_sim=0.97, embedder=lexical)
+    calls.clear()
+    c.put(scope, "What stack does LedgerMind use?", _payload("x"), "primary", 1)
+    assert c.get(scope, "What stack does LedgerMind use today?") is None
+    assert c.get(scope, "What stack does LedgerMind use today?") is None
+    assert calls == [
+        "What stack does LedgerMind use?",
+        "What stack does LedgerMind use today?",
+    ]
+
+
+def test_module_lookups_embed_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def model(question):
+        threads.append(threading.current_thread())
+        return _fake_model(question)
+
+    c = ChatAnswerCache(min_sim=0.9, embedder=model)
+    monkeypatch.setattr(chat_cache, "_cache", c)
+    scope = chat_cache.scope_key("rag", "ledgermind", "m1", None)
+    q = "What stack does LedgerMind use?"
+
+    async def scenario():
+        assert await chat_cache.get(scope, q) is None
+        await chat_cache.put(scope, q, _payload("FastAPI."), "primary", 5)
+        assert (await chat_cache.get(scope, q.lower())).kind == "exact"
+        hit = await chat_cache.get(scope, "What stack does LedgerMind use today?")
+        assert hit.kind == "semantic"
+
+    asyncio.run(scenario())
+    # one embed per distinct question, never on the loop's thread
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_ttl_lru_and_project_invalidation(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(chat_cache.time, "monotonic", lambda: clock[0])
+    c = ChatAnswerCache(max_entries=2, ttl_s=30, min_sim=1.01)
+    a = chat_cache.scope_key("rag", "a", "m", None)
+    b = chat_cache.scope_key("rag", "b", "m", None)
+    c.put(a, "q1", _payload("1"), "primary", 10)
+    c.put(b, "q2", _payload("2"), "primary", 10)
+    assert c.get(a, "q1")  # q1 becomes most recent
+    c.put(a, "q3", _payload("3"), "primary", 10)
+    assert c.get(b, "q2") is None and c.get(a, "q1")
+
+    assert c.invalidate("a") == 2 and c.get(a, "q3") is None
+    c.put(b, "q2", _payload("2"), "primary", 10)
+    clock[0] += 31
+    assert c.get(b, "q2") is None and c.stats()["entries"] == 0
+
+
+def test_chat_repeats_skip_retrieval_and_generation(monkeypatch):
+    from assistant_api import main
+
+    calls = {"gen": 0, "retrieve": 0}
+
+    async def fake_generate(q):
+        calls["gen"] += 1
+        return "LedgerMind is a finance assistant. Want the case study?", "primary"
+
+    async def fake_fetch(q, k=5):
+        calls["retrieve"] += 1
+        return []
+
+    monkeypatch.setenv("CHAT_CACHE_ENABLED", "1")
+    monkeypatch.delenv("DEV_ALLOW_NO_LLM", raising=False)
+    monkeypatch.setattr(chat_cache, "_cache", ChatAnswerCache())
+    monkeypatch.setattr(main, "generate_brief_answer", fake_generate)
+    monkeypatch.setattr(main, "fetch_context", fake_fetch)
+    monkeypatch.setattr(main, "route_query", lambda q: None)
+
+    client = TestClient(main.app)
+    ask = lambda q: client.post(  # noqa: E731
+        "/chat", json={"messages": [{"role": "user", "content": q}]}
+    ).json()
+    first = ask("Tell me about LedgerMind")
+    again = ask("tell me about ledgermind!")
+    assert calls == {"gen": 1, "retrieve": 1}
+    assert "cache" not in first and again["cache"]["hit"] == "exact"
+    assert again["content"] == first["content"]
+    assert again["_served_by"] == "primary"
+
+    chat_cache.invalidate("ledgermind")  # unscoped answers go too
+    ask("Tell me about LedgerMind")
+    assert calls["gen"] == 2
+
+    m = client.get("/api/metrics").json()["answer_cache"]
+    assert m["entries"] == 1 and m["hits_exact"] >= 1 and m["saved_ms"] >= 0
+    assert 0 < m["hit_ratio"] < 1
+
+
+def test_faq_answers_are_cached(monkeypatch):
+    from types import SimpleNamespace
+
+    from assistant_api import main
+
+    calls = []
+
+    def fake_faq(q):
+        calls.append(q)
+        return SimpleNamespace(q="What is LedgerMind?", a="A finance app.", score=0.9)
+
+    monkeypatch.setenv("CHAT_CACHE_ENABLED", "1")
+    monkeypatch.delenv("DEV_ALLOW_NO_LLM", raising=False)
+    monkeypatch.setattr(chat_cache, "_cache", ChatAnswerCache())
+    monkeypatch.setattr(main, "faq_search_best", fake_faq)
+    monkeypatch.setattr(
+        main,
+        "route_query",
+        lambda q: SimpleNamespace(route="faq", reason="faq", project_id=None),
+    )
+    client = TestClient(main.app)
+    body = {"messages": [{"role": "user", "content": "What is LedgerMind?"}]}
+    first = client.post("/chat", json=body).json()
+    again = client.post("/chat", json=body).json()
+    assert len(calls) == 1 and again["cache"]["hit"] == "exact"
+    assert again["content"] == first["content"]
+    assert first["content"].startswith("A finance app.")
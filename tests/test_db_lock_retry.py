@@ -29,7 +29,7 @@ def test_connect_retries_on_locked_db(monkeypatch, tmp_path):
 
     original_connect = db_module.sqlite3.connect
 
-    def fake_connect(path, timeout, check_same_thread):
+    def fake_connect(path, timeout, check_same_thread, **kwargs):
         attempts["count"] += 1
         assert path == db_module.DB_PATH
         if attempts["count"] < 3:
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from assistant_api import db as db_module
+
+
+def test_connect_reuses_pooled_connection(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    db_module.reset_pool()
+    before = db_module.pool_stats()
+
+    c1 = db_module.connect()
+    c1.execute("INSERT INTO chunks(content) VALUES ('x')")  # left uncommitted
+    c1.close()
+    c1.close()  # double close is harmless
+    c2 = db_module.connect()
+    assert c2 is c1
+    assert not c2.in_transaction
+    assert c2.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 0
+    c3 = db_module.connect()  # pool empty -> new connection, no re-bootstrap
+    assert c3 is not c2
+
+    after = db_module.pool_stats()
+    assert after["reused"] - before["reused"] == 1
+    assert after["bootstraps"] - before["bootstraps"] == 1
+    c2.close()
+    c3.close()
+
+
+def test_pool_follows_rag_db_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "a.sqlite"))
+    a = db_module.connect()
+    a.close()
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "b.sqlite"))
+    b = db_module.connect()
+    assert b is not a
+    # new file was bootstrapped on first use
+    assert "created_at" in db_module.table_columns(b, "chunks")
+    b.close()
+
+
+def test_metrics_exposes_pool_stats():
+    from assistant_api.main import app
+
+    r = TestClient(app).get("/api/metrics")
+    assert r.status_code == 200
+    assert "idle" in r.json()["db_pool"]
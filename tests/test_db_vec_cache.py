@@ -0,0 +1,158 @@
+import sqlite3
+
+import numpy as np
+
+from assistant_api import db as db_module
+
+
+def _seed(con, n=50, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, dim)).astype(np.float32)
+    for i in range(n):
+        db_module.upsert_doc(
+            con,
+            {
+                "id": f"d{i}",
+                "repo": "r",
+                "path": f"p{i}.md",
+                "sha": "x",
+                "title": f"T{i}",
+                "text": f"text {i}",
+                "meta": {"i": i},
+            },
+        )
+        db_module.upsert_vec(con, f"d{i}", X[i])
+    con.commit()
+    return X
+
+
+def _expected(X, q, k):
+    Xn = X / np.linalg.norm(X, axis=1, keepdims=True)
+    return [f"d{i}" for i in np.argsort(-(Xn @ (q / np.linalg.norm(q))))[:k]]
+
+
+def test_search_uses_cached_matrix_and_one_hydration_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    monkeypatch.setattr(db_module, "_VECS", db_module._VecMatrix())
+    con = db_module.connect()
+    X = _seed(con)
+    q = X[7] + 0.1
+
+    statements: list[str] = []
+    con.set_trace_callback(statements.append)
+    hits = db_module.search(con, q, k=5)
+    hits2 = db_module.search(con, q, k=5)
+    assert [h["id"] for h in hits] == _expected(X, q, 5) == [h["id"] for h in hits2]
+    assert hits[0]["id"] == "d7" and hits[0]["meta"] == {"i": 7}
+    assert db_module.vec_cache_stats()["builds"] == 1
+    assert sum("FROM vecs" in s and "embedding" in s for s in statements) == 1
+    assert sum("FROM docs" in s for s in statements) == 2  # one per search
+
+    # in-process write bumps the generation
+    db_module.upsert_vec(con, "d0", q)
+    con.commit()
+    assert db_module.search(con, q, k=1)[0]["id"] == "d0"
+    assert db_module.vec_cache_stats()["builds"] == 2
+
+    # a write from another connection/process is caught by the fingerprint
+    other = sqlite3.connect(tmp_path / "rag.sqlite")
+    other.execute("DELETE FROM vecs WHERE id='d0'")
+    other.commit()
+    other.close()
+    assert db_module.search(con, q, k=1)[0]["id"] != "d0"
+    assert db_module.vec_cache_stats()["builds"] == 3
+
+    # query with a dimension that is not indexed
+    assert db_module.search(con, np.ones(8, dtype=np.float32), k=3) == []
+    con.close()
+
+
+def test_rewrite_from_another_connection_keeps_count_and_max_rowid(
+    tmp_path, monkeypatch
+):
+    path = tmp_path / "rag.sqlite"
+    monkeypatch.setenv("RAG_DB", str(path))
+    monkeypatch.setattr(db_module, "_VECS", db_module._VecMatrix())
+    con = db_module.connect()
+    X = _seed(con, n=5, dim=4)
+    q = -X[0]
+    assert db_module.search(con, q, k=1)[0]["id"] != "d4"
+    fp = con.execute("SELECT COUNT(*), MAX(rowid) FROM vecs").fetchone()
+
+    # delete + re-insert of the max-rowid row reuses its rowid
+    other = sqlite3.connect(path)
+    other.execute("DELETE FROM vecs WHERE id='d4'")
+    other.execute(
+        "INSERT INTO vecs(id, embedding) VALUES('d4', ?)",
+        (q.astype(np.float32).tobytes(),),
+    )
+    other.commit()
+    other.close()
+    assert con.execute("SELECT COUNT(*), MAX(rowid) FROM vecs").fetchone() == fp
+    assert db_module.search(con, q, k=1)[0]["id"] == "d4"
+
+    # an uncommitted write on the caller's connection is searched, not cached
+    db_module.upsert_vec(con, "d3", q * 2)
+    assert db_module.search(con, q, k=1)[0]["id"] in ("d3", "d4")
+    con.rollback()
+    assert db_module.search(con, q, k=1)[0]["id"] == "d4"
+    con.close()
+
+
+def test_search_memory_maps_saved_matrix(tmp_path, monkeypatch):
+    path = tmp_path / "rag.sqlite"
+    monkeypatch.setenv("RAG_DB", str(path))
+    monkeypatch.setenv("RAG_VEC_MMAP", "1")
+    monkeypatch.setattr(db_module, "_VECS", db_module._VecMatrix())
+    con = db_module.connect()
+    X = _seed(con, dim=8)
+    q = X[3]
+    first = [h["id"] for h in db_module.search(con, q, k=4)]
+    assert (tmp_path / "rag.sqlite.vecs8.npy").exists()
+
+    # a fresh process-level cache maps the saved .npy instead of reading blobs
+    monkeypatch.setattr(db_module, "_VECS", db_module._VecMatrix())
+    statements: list[str] = []
+    con.set_trace_callback(statements.append)
+    again = [h["id"] for h in db_module.search(con, q, k=4)]
+    assert again == first == _expected(X, q, 4)
+    assert not any("SELECT id, embedding FROM vecs" in s for s in statements)
+    con.close()
+
+
+def test_saved_matrix_is_not_reused_for_a_recreated_db(tmp_path, monkeypatch):
+    path = tmp_path / "rag.sqlite"
+    monkeypatch.setenv("RAG_DB", str(path))
+    monkeypatch.setenv("RAG_VEC_MMAP", "1")
+    q = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+    def build(rows):
+        db_module.reset_pool()
+        path.unlink(missing_ok=True)
+        monkeypatch.setattr(db_module, "_VECS", db_module._VecMatrix())
+        con = db_module.connect()
+        for i, v in enumerate(rows):
+            db_module.upsert_doc(
+                con,
+                {
+                    "id": f"d{i}",
+                    "repo": "r",
+                    "path": f"p{i}",
+                    "sha": "x",
+                    "title": "t",
+                    "text": f"text {i}",
+                    "meta": {},
+                },
+            )
+            db_module.upsert_vec(con, f"d{i}", np.array(v, dtype=np.float32))
+        con.commit()
+        return con
+
+    con = build([[1, 0, 0], [0, 1, 0]])
+    assert db_module.search(con, q, k=1)[0]["id"] == "d0"
+    con.close()
+    # reset + re-ingest: same row count and rowids, swapped vectors
+    con = build([[0, 1, 0], [1, 0, 0]])
+    assert db_module.search(con, q, k=1)[0]["id"] == "d1"
+    con.close()
+    db_module.reset_pool()
@@ -0,0 +1,61 @@
+import json
+import os
+
+import numpy as np
+
+from assistant_api import vector_store
+from assistant_api.metrics import stage_snapshot
+
+
+class _FakeIndex:
+    def __init__(self, n: int):
+        self.ntotal = n
+        self.d = 4
+
+    def search(self, qv, topk):
+        rows = np.array([list(range(min(topk, self.ntotal))) + [-1]], dtype=np.int64)
+        return np.zeros_like(rows, dtype=np.float32), rows
+
+
+class _FakeFaiss:
+    def __init__(self):
+        self.reads = 0
+
+    def read_index(self, path):
+        self.reads += 1
+        with open(path, encoding="utf-8") as f:
+            return _FakeIndex(int(f.read()))
+
+
+def _write(tmp_path, chunk_ids):
+    (tmp_path / "index.faiss").write_text(str(len(chunk_ids)), encoding="utf-8")
+    (tmp_path / "index.map.json").write_text(
+        json.dumps([{"rowid": i, "chunk_id": c} for i, c in enumerate(chunk_ids)]),
+        encoding="utf-8",
+    )
+
+
+def test_dense_index_loads_once_and_hot_swaps(tmp_path, monkeypatch):
+    fake = _FakeFaiss()
+    monkeypatch.setattr(vector_store, "faiss", fake)
+    monkeypatch.setattr(vector_store, "_DENSE_DISABLED", False)
+    monkeypatch.setattr(vector_store, "IDX_PATH", str(tmp_path / "index.faiss"))
+    monkeypatch.setattr(vector_store, "MAP_PATH", str(tmp_path / "index.map.json"))
+    monkeypatch.setattr(vector_store, "embed_texts", lambda texts: np.zeros((1, 4)))
+    vector_store._DENSE.reset()
+
+    _write(tmp_path, [10, 11, 12])
+    assert vector_store.dense_search("q", topk=5) == [10, 11, 12]
+    assert vector_store.dense_search("q", topk=2) == [10, 11]
+    assert fake.reads == 1
+
+    snap = stage_snapshot()["dense_index"]
+    assert snap["rows"] == 3 and snap["bytes"] > 0
+
+    # Rebuild on disk (new mtime/size) -> picked up on next query
+    _write(tmp_path, [20, 21, 22, 23])
+    st = os.stat(tmp_path / "index.faiss")
+    os.utime(tmp_path / "index.faiss", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert vector_store.dense_search("q", topk=10) == [20, 21, 22, 23]
+    assert fake.reads == 2
+    vector_store._DENSE.reset()
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+
+def _poll(client, job_id, until=("done", "error"), timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        st = client.get(f"/api/rag/ingest/{job_id}").json()
+        if st["status"] in until:
+            return st
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck: {st}")
+
+
+def test_ingest_job_async_progress_and_coalescing(monkeypatch):
+    from assistant_api import rag_ingest
+    from assistant_api.main import app
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    async def fake_ingest(req=None, progress=None):
+        calls.append(req)
+        progress("source", {"type": "fs", "path": "/x"})
+        progress("files", {"total": 2})
+        progress("file", {"path": "a.md"})
+        started.set()
+        release.wait(5)
+        progress("file", {"path": "b.md"})
+        return {"ok": True, "chunks": 7, "sources": []}
+
+    monkeypatch.setattr(rag_ingest, "ingest", fake_ingest)
+    client = TestClient(app)
+    body = {"repos": [{"type": "fs", "path": "/x"}], "async": True}
+    r1 = client.post("/api/rag/ingest", json=body)
+    assert r1.status_code == 202
+    job_id = r1.json()["job_id"]
+    assert started.wait(5)
+
+    # same sources while the first is running -> same job
+    r2 = client.post("/api/rag/ingest?wait=false", json={"repos": body["repos"]})
+    assert r2.json()["job_id"] == job_id and r2.json()["coalesced"] is True
+
+    st = client.get(f"/api/rag/ingest/{job_id}").json()
+    assert st["status"] == "running"
+    assert st["progress"]["files_total"] == 2 and st["progress"]["files_done"] == 1
+    assert st["progress"]["current"] == "a.md"
+
+    release.set()
+    st = _poll(client, job_id)
+    assert st["status"] == "done" and st["result"]["chunks"] == 7
+    assert st["progress"]["files_done"] == 2 and st["coalesced"] == 1
+    assert [e["event"] for e in st["events"]] == ["source", "files", "file", "file"]
+    assert len(calls) == 1
+
+    assert client.get("/api/rag/ingest/nope").status_code == 404
+
+
+def test_ingest_default_waits_for_job(monkeypatch, tmp_path):
+    from assistant_api import rag_ingest
+    from assistant_api.main import app
+
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    monkeypatch.setattr(rag_ingest, "embed", lambda t: _aw(rag_ingest._hash_embed(t)))
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.md").write_text("# A\n\nalpha beta gamma\n")
+    client = TestClient(app)
+    body = {"repos": [{"type": "fs", "path": str(tmp_path), "include": ["docs/*.md"]}]}
+    r = client.post("/api/rag/ingest", json=body)
+    j = r.json()
+    assert r.status_code == 200 and j["ok"] is True and j["chunks"] >= 1
+    st = client.get(f"/api/rag/ingest/{j['job_id']}").json()
+    assert st["status"] == "done" and st["progress"]["files_done"] == 1
+
+
+async def _aw(v):
+    return v
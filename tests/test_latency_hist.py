@@ -0,0 +1,58 @@
+import random
+
+from prometheus_client import generate_latest
+
+from assistant_api import metrics
+from assistant_api.latency_hist import LatencyHistogram
+
+
+def test_quantiles_track_exact_within_bucket_width():
+    rng = random.Random(7)
+    xs = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    h = LatencyHistogram.from_values(xs)
+    s = sorted(xs)
+    for q in (0.5, 0.95, 0.99):
+        exact = s[int(q * (len(s) - 1))]
+        assert abs(h.quantile(q) - exact) / exact < 0.07
+    st = h.stats()
+    assert st["count"] == len(xs) and st["min_ms"] == s[0] and st["max_ms"] == s[-1]
+
+
+def test_windows_drop_old_slots():
+    h = LatencyHistogram()
+    t0 = 1_000_000.0
+    h.record(10.0, now=t0)
+    h.record(500.0, now=t0 + 120)  # two minutes later
+    now = t0 + 125
+    assert h.counts("1m", now=now).count == 1
+    assert h.counts("1m", now=now).max == 500.0
+    assert h.counts("5m", now=now).count == 2
+    assert h.counts("1h", now=t0 + 3 * 3600).count == 0
+    assert h.counts().count == 2  # all-time keeps everything
+
+
+def test_record_feeds_status_stats_and_prometheus():
+    for ms in (12.0, 40.0, 90.0):
+        metrics.record(200, ms, provider="hist-test", route="hist-route")
+    by_prov = metrics.recent_latency_stats_by_provider()["hist-test"]
+    assert by_prov["count"] == 3 and by_prov["max_ms"] == 90.0
+    assert metrics.route_latency_stats()["hist-route"]["count"] == 3
+    assert metrics.recent_latency_stats()["count"] >= 3
+    assert "hist-route" in metrics.snapshot()["route_p95_ms"]
+
+    text = generate_latest().decode()
+    line = 'assistant_latency_seconds_count{kind="provider",name="hist-test"} 3.0'
+    assert line in text
+    bucket = (
+        'assistant_latency_seconds_bucket{kind="provider",le="%s",name="hist-test"}'
+    )
+    assert bucket % "0.016" + " 1.0" in text and bucket % "0.064" + " 2.0" in text
+
+
+def test_quantile_stays_inside_its_bucket():
+    from assistant_api.latency_hist import bucket_index, bucket_lower
+
+    h = LatencyHistogram.from_values([10.0, 20.0, 30.0])
+    hi = bucket_lower(bucket_index(20.0) + 1)
+    assert 20.0 <= h.quantile(0.95) <= hi
+    assert h.quantile(0.99) <= hi and h.quantile(1.0) == 30.0
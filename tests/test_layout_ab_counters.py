@@ -0,0 +1,78 @@
+import json
+import threading
+from collections import Counter
+
+import pytest
+
+from assistant_api.services import ab_store, layout_ab
+
+
+@pytest.fixture
+def ab(tmp_path, monkeypatch):
+    monkeypatch.setattr(layout_ab, "STATE_PATH", tmp_path / "layout_ab_state.json")
+    monkeypatch.setattr(ab_store, "EVENTS", tmp_path / "ab_events.jsonl")
+    fresh = {"_counters": layout_ab._ShardedCounters(), "_flushed": Counter()}
+    for k, v in {**fresh, "_disk": None}.items():
+        monkeypatch.setattr(layout_ab, k, v)
+    return layout_ab
+
+
+def _new_worker(ab, monkeypatch):
+    """Emulate another uvicorn worker: its own counters, same state file."""
+    monkeypatch.setattr(ab, "_counters", ab._ShardedCounters())
+    monkeypatch.setattr(ab, "_flushed", Counter())
+    monkeypatch.setattr(ab, "_disk", None)
+
+
+def test_concurrent_events_are_not_lost(ab):
+    def hammer():
+        for _ in range(2000):
+            ab.record_event("A", "view")
+        ab.record_event("B", "click")
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not ab.STATE_PATH.exists()  # hot path never writes
+    m = ab.suggest_weights()["metrics"]
+    assert m["A"]["views"] == 16000 and m["B"]["clicks"] == 8
+
+
+def test_snapshots_merge_workers_atomically(ab, monkeypatch):
+    for _ in range(3):
+        ab.record_event("A", "view")
+    ab.snapshot()
+    ab.snapshot()  # nothing pending: no double counting
+    _new_worker(ab, monkeypatch)
+    ab.record_event("A", "click")
+    ab.record_event("B", "view")
+    assert ab.suggest_weights()["metrics"]["A"] == {"clicks": 1, "views": 3}
+    ab.snapshot()
+
+    disk = json.loads(ab.STATE_PATH.read_text())
+    assert disk["metrics"]["A"] == {"clicks": 1, "views": 3}
+    assert disk["metrics"]["B"] == {"clicks": 0, "views": 1}
+    assert [p.name for p in ab.STATE_PATH.parent.glob("*.tmp")] == []
+
+
+def test_event_endpoint_feeds_counters_and_log(ab):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from assistant_api.main import app
+
+    c = TestClient(app)
+    for i in range(200):
+        r = c.post(
+            f"/agent/ab/event/{'AB'[i % 2]}/{'click' if i % 10 == 0 else 'view'}"
+        )
+        assert r.status_code == 200
+    s = c.get("/agent/ab/suggest").json()
+    assert s["metrics"]["A"] == {"clicks": 20, "views": 80}
+    assert s["metrics"]["B"] == {"clicks": 0, "views": 100}
+
+    asyncio.run(ab_store._sink.close())
+    assert len(list(ab_store.iter_events())) == 200
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from assistant_api import llm_client, metrics
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = json.dumps(
+            {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def primary_server(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    monkeypatch.setattr(
+        llm_client, "PRIMARY_BASE", f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    )
+    monkeypatch.setattr(llm_client, "DISABLE_PRIMARY", False)
+    monkeypatch.setattr(llm_client, "PRIMARY_MODEL_PRESENT", None)
+    monkeypatch.setitem(metrics.llm_pool, "primary", metrics.Counter())
+    yield
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_primary_calls_reuse_one_connection(primary_server):
+    async def main():
+        await llm_client.open_clients()
+        client = llm_client.get_client("primary")
+        for _ in range(3):
+            j, reason, status = await llm_client.primary_chat(
+                [{"role": "user", "content": "hi"}]
+            )
+            assert reason is None and status == 200
+        assert llm_client.get_client("primary") is client
+        await llm_client.close_clients()
+        return client
+
+    client = asyncio.run(main())
+    assert client.is_closed
+    pool = metrics.snapshot()["llm_pool"]["primary"]
+    assert pool["requests"] == 3
+    assert pool["connects"] == 1 and pool["reused"] == 2
+    assert pool["in_flight"] == 0 and pool["max_connections"] > 0
+
+
+def test_client_rebinds_to_new_event_loop():
+    async def get():
+        return llm_client.get_client("fallback")
+
+    a = asyncio.run(get())
+    b = asyncio.run(get())
+    assert a is not b
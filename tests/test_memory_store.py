@@ -0,0 +1,72 @@
+import pytest
+
+from assistant_api import memory
+from assistant_api.memory import MemoryStore, SqliteMemoryStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kw):
+        if request.param == "sqlite":
+            return SqliteMemoryStore(tmp_path / "mem.sqlite", **kw)
+        return MemoryStore(**kw)
+
+    return make
+
+
+def test_window_is_token_budgeted(make_store):
+    s = make_store(token_budget=10, max_messages=50)
+    for i in range(6):
+        s.remember("u", "user", f"msg{i} " + "x" * 8)  # ~4 tokens each
+    got = s.recall("u")
+    assert got[-1] == ("user", "msg5 xxxxxxxx")
+    assert len(got) == 2  # 2 * 4 tokens fit in 10, 3 would not
+    s.remember("u", "assistant", "y" * 400)  # oversize: kept alone
+    assert s.recall("u") == [("assistant", "y" * 400)]
+
+
+def test_lru_eviction_and_idle_ttl(make_store, monkeypatch):
+    s = make_store(max_users=2, ttl_s=60)
+    clock = [1000.0]
+    monkeypatch.setattr(memory.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(memory.time, "time", lambda: clock[0])
+    if isinstance(s, SqliteMemoryStore):
+        monkeypatch.setattr(s, "_SWEEP_EVERY_S", 0)
+
+    def tick(fn, *args):
+        clock[0] += 1
+        return fn(*args)
+
+    tick(s.remember, "a", "user", "hi a")
+    tick(s.remember, "b", "user", "hi b")
+    tick(s.recall, "a")  # a becomes most recent
+    tick(s.remember, "c", "user", "hi c")
+    assert s.recall("b") == [] and s.recall("a") and s.recall("c")
+    assert s.stats()["evicted"] == 1
+
+    clock[0] += 61
+    s.remember("d", "user", "new session")  # sweeps the idle ones
+    assert s.stats()["users"] == 1
+    assert s.recall("a") == []
+    st = s.stats()
+    assert st["users"] == 1 and st["expired"] == 2
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    a = SqliteMemoryStore(tmp_path / "mem.sqlite")
+    b = SqliteMemoryStore(tmp_path / "mem.sqlite")
+    a.remember("u", "user", "from worker a")
+    assert b.recall("u") == [("user", "from worker a")]
+    b.clear("u")
+    assert a.recall("u") == []
+
+
+def test_memory_size_in_api_metrics():
+    from fastapi.testclient import TestClient
+
+    from assistant_api.main import app
+
+    memory.remember("metrics-user", "user", "hello")
+    m = TestClient(app).get("/api/metrics").json()["memory"]
+    assert m["users"] >= 1 and m["tokens"] >= 1 and m["backend"] == "memory"
+    memory.clear("metrics-user")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+
+from assistant_api.services import metrics_sink
+from assistant_api.services.metrics_sink import JsonlSink
+
+
+def test_sink_batches_into_single_write(tmp_path, monkeypatch):
+    writes = []
+    real_write = os.write
+
+    def counting_write(fd, data):
+        writes.append(len(data))
+        return real_write(fd, data)
+
+    monkeypatch.setattr(metrics_sink.os, "write", counting_write)
+    path = tmp_path / "m.jsonl"
+    sink = JsonlSink(path, batch=100, flush_ms=50)
+
+    async def main():
+        for i in range(40):
+            assert sink.submit(json.dumps({"i": i}))
+        assert not path.exists() or path.read_text() == ""  # nothing written inline
+        await asyncio.sleep(0.2)  # time-based flush
+        await sink.close()
+
+    asyncio.run(main())
+    lines = path.read_text().splitlines()
+    assert [json.loads(x)["i"] for x in lines] == list(range(40))
+    assert len(writes) == 1
+    st = sink.stats()
+    assert st["written"] == 40 and st["batches"] == 1 and st["dropped"] == 0
+
+
+def test_sink_bounded_queue_counts_drops(tmp_path):
+    sink = JsonlSink(tmp_path / "m.jsonl", batch=1000, flush_ms=1000, max_queue=5)
+
+    async def main():
+        results = [sink.submit("{}") for _ in range(8)]  # no await: writer can't run
+        await sink.close()
+        return results
+
+    results = asyncio.run(main())
+    assert results.count(False) == 3
+    st = sink.stats()
+    assert st["dropped"] == 3 and st["written"] == 5 and st["high_water"] == 5
+
+
+def test_sink_rotates_by_size_and_follows_external_rotation(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    sink = JsonlSink(path, batch=1, flush_ms=0, max_bytes=64)
+
+    async def main():
+        for i in range(6):
+            sink.submit(json.dumps({"i": i, "pad": "x" * 20}))
+            await sink.flush()
+        # an external rotator moves the live file away; next batch reopens the path
+        os.replace(path, tmp_path / "moved.jsonl")
+        sink.submit(json.dumps({"i": 6}))
+        await sink.close()
+
+    asyncio.run(main())
+    shards = sorted(tmp_path.glob("metrics-*.jsonl"))
+    assert shards and sink.stats()["rotations"] == len(shards)
+    assert json.loads(path.read_text())["i"] == 6
+    total = sum(len(p.read_text().splitlines()) for p in tmp_path.glob("*.jsonl"))
+    assert total == 7
+
+
+def test_ingest_endpoint_enqueues_and_lifespan_flushes(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from assistant_api.main import app
+    from assistant_api.routers import metrics_behavior
+
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(metrics_behavior, "_SINK_PATH", path)
+    monkeypatch.setattr(metrics_behavior, "_sink", JsonlSink(path, flush_ms=10_000))
+    monkeypatch.setenv("SAFE_LIFESPAN", "1")
+    ev = {
+        "visitor_id": "visitor-1",
+        "event": "page_view",
+        "timestamp": "2025-01-01T00:00:00Z",
+    }
+    with TestClient(app) as client:
+        for _ in range(3):
+            r = client.post("/api/metrics/event", json=ev)
+            assert r.status_code == 202 and r.json()["stored"] == 1
+        health = client.get("/api/metrics/behavior/health").json()
+        assert health["sink"]["enqueued"] == 3
+    # shutdown drained the queue
+    assert len(path.read_text().splitlines()) == 3
@@ -0,0 +1,89 @@
+"""Micro-benchmark: candidate hydration in rag_query is set-based.
+
+Counts statements that touch chunks/docs (excluding FTS snippet lookups) for a
+200-candidate pool. The old per-candidate loop issued ~2 SELECTs per id.
+"""
+
+import asyncio
+import time
+
+from assistant_api import db as db_module
+from assistant_api import rag_query as rq
+
+N = 200
+
+
+def _seed(con):
+    with con:
+        con.executemany(
+            "INSERT INTO docs(id,repo,path,sha,title,text,meta) VALUES(?,?,?,?,?,?,?)",
+            [
+                (f"d{i}", "repo", f"docs/{i}.md", "x", f"T{i}", f"doc {i}", "{}")
+                for i in range(N)
+            ],
+        )
+        con.executemany(
+            "INSERT INTO chunks(content, text, source_path, title, project_id, doc_id, ordinal) "
+            "VALUES (?,?,?,?,?,?,?)",
+            [
+                (
+                    f"hydration {i}",
+                    f"hydration {i}",
+                    f"docs/{i}.md",
+                    f"T{i}",
+                    "demo",
+                    f"d{i}",
+                    i,
+                )
+                for i in range(N)
+            ],
+        )
+    return [r[0] for r in con.execute("SELECT id FROM chunks ORDER BY id")]
+
+
+def test_hydration_is_set_based(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    ids = _seed(db_module.connect())
+    statements: list[str] = []
+
+    def traced_connect():
+        con = db_module.connect()
+        con.set_trace_callback(statements.append)
+        return con
+
+    monkeypatch.setattr(rq, "connect", traced_connect)
+    monkeypatch.setattr(rq, "bm25_search", lambda q, topk=50: list(ids))
+    monkeypatch.setattr(rq, "dense_search", lambda q, topk=50: [])
+    monkeypatch.setattr(
+        rq, "rerank", lambda q, pairs, topk: [(cid, 1.0) for cid, _ in pairs][:topk]
+    )
+    monkeypatch.setattr(rq, "RAG_ENABLE_CACHE", False)
+    monkeypatch.setattr(rq, "RAG_ENABLE_FUSION", False)
+
+    t0 = time.perf_counter()
+    res = asyncio.run(rq.retrieve(rq.QueryIn(question="hydration", k=5), limit=5))
+    elapsed = (time.perf_counter() - t0) * 1000.0
+
+    hydrate = [
+        s
+        for s in statements
+        if ("FROM chunks" in s or "JOIN chunks" in s or "FROM docs" in s)
+        and "chunks_fts" not in s
+    ]
+    print(
+        f"\n[bench] candidates={N} hydration_queries={len(hydrate)} (legacy ~{2 * N + 2}) {elapsed:.1f}ms"
+    )
+    assert res["matches"] and res["matches"][0]["repo"] == "repo"
+    assert len(res["hits"]) == 5
+    assert len(hydrate) <= 2
+    assert sum("PRAGMA table_info" in s for s in statements) <= 1
+
+
+def test_schema_probe_cached_per_connection(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    con = db_module.connect()
+    statements: list[str] = []
+    con.set_trace_callback(statements.append)
+    for _ in range(3):
+        assert "created_at" in db_module.table_columns(con, "chunks")
+    assert sum("PRAGMA table_info" in s for s in statements) == 1
@@ -0,0 +1,78 @@
+import asyncio
+import sqlite3
+
+from assistant_api import rag_ingest
+
+
+def _setup(monkeypatch, tmp_path):
+    db = tmp_path / "rag.sqlite"
+    monkeypatch.setenv("RAG_DB", str(db))
+    embedded: list[str] = []
+
+    async def counting_embed(texts):
+        embedded.extend(t for t in texts if t != "warmup")
+        return rag_ingest._hash_embed(texts)
+
+    monkeypatch.setattr(rag_ingest, "embed", counting_embed)
+    monkeypatch.setattr(rag_ingest, "_model", None)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    return db, docs, embedded
+
+
+def _run(docs):
+    req = {"repos": [{"type": "fs", "path": str(docs.parent), "include": ["docs/*.md"]}]}
+    return asyncio.run(rag_ingest.ingest(req))
+
+
+def test_reingest_skips_unchanged_and_reuses_chunk_embeddings(monkeypatch, tmp_path):
+    db, docs, embedded = _setup(monkeypatch, tmp_path)
+    (docs / "a.md").write_text("# A\n\nalpha one\n\n## A2\n\nalpha two\n")
+    (docs / "b.md").write_text("# B\n\nbeta\n")
+
+    first = _run(docs)
+    assert first["added"] == 2 and first["skipped"] == 0
+    n_first = len(embedded)
+    assert n_first == first["embedded"] == first["chunks"]
+
+    again = _run(docs)
+    assert again["skipped"] == 2 and again["chunks"] == 0
+    assert len(embedded) == n_first  # nothing re-embedded
+
+    # edit one section of a.md: only that chunk is embedded again
+    (docs / "a.md").write_text("# A\n\nalpha one\n\n## A2\n\nalpha changed\n")
+    embedded.clear()
+    upd = _run(docs)
+    assert upd["updated"] == 1 and upd["skipped"] == 1
+    assert upd["embedded"] == 1 and upd["reused"] == upd["chunks"] - 1
+    assert embedded and "changed" in embedded[0]
+
+    con = sqlite3.connect(db)
+    texts = [r[0] for r in con.execute("SELECT text FROM docs WHERE path LIKE '%a.md'")]
+    assert any("changed" in t for t in texts) and not any("two" in t for t in texts)
+    assert con.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == con.execute(
+        "SELECT COUNT(*) FROM vecs"
+    ).fetchone()[0]
+    con.close()
+
+
+def test_reingest_removes_rows_of_deleted_files(monkeypatch, tmp_path):
+    db, docs, _ = _setup(monkeypatch, tmp_path)
+    (docs / "a.md").write_text("# A\n\nalpha\n")
+    (docs / "b.md").write_text("# B\n\nbeta\n")
+    _run(docs)
+
+    (docs / "b.md").unlink()
+    res = _run(docs)
+    assert res["deleted"] == 1 and res["skipped"] == 1
+    assert res["sources"][0]["deleted"] == 1
+
+    con = sqlite3.connect(db)
+    paths = {r[0] for r in con.execute("SELECT path FROM docs")}
+    assert all("b.md" not in p for p in paths)
+    assert con.execute("SELECT COUNT(*) FROM vecs").fetchone()[0] == len(
+        list(con.execute("SELECT id FROM docs"))
+    )
+    manifest = {r[0] for r in con.execute("SELECT path FROM ingest_manifest")}
+    assert manifest == {"docs/a.md"}
+    con.close()
@@ -0,0 +1,64 @@
+"""Micro-benchmark: rag_ingest embeds in cross-file batches.
+
+Ingests a synthetic tree of small markdown files (``BENCH_FILES``, default 300;
+set 5000 for the full run). The embed stub charges a fixed cost per encode
+call, like a SentenceTransformer forward pass over a mostly empty batch.
+Every file has exactly two chunks, so ``EMBED_BATCH=2`` reproduces the legacy
+one-encode-call-per-file pattern (plus a commit per file).
+"""
+
+import asyncio
+import os
+import time
+
+from assistant_api import rag_ingest
+
+N = int(os.getenv("BENCH_FILES", "300"))
+CALL_OVERHEAD_S = 0.002
+
+
+def _tree(root):
+    for i in range(N):
+        d = root / "docs" / f"d{i % 50}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"f{i}.md").write_text(
+            f"# Note {i}\n\nalpha {i} beta\n\n## Details\n\ngamma {i} delta\n"
+        )
+
+
+def _ingest(root, db, batch, monkeypatch):
+    calls = []
+
+    async def slow_embed(texts):
+        calls.append(len(texts))
+        time.sleep(CALL_OVERHEAD_S)
+        return rag_ingest._hash_embed(texts)
+
+    monkeypatch.setenv("RAG_DB", str(db))
+    monkeypatch.setenv("EMBED_BATCH", str(batch))
+    monkeypatch.setattr(rag_ingest, "embed", slow_embed)
+    monkeypatch.setattr(rag_ingest, "_model", None)
+    req = {"repos": [{"type": "fs", "path": str(root), "include": ["docs/**/*.md"]}]}
+    t0 = time.perf_counter()
+    res = asyncio.run(rag_ingest.ingest(req))
+    return res, calls[1:], time.perf_counter() - t0  # drop the warmup call
+
+
+def test_ingest_embeds_across_files_in_batches(tmp_path, monkeypatch):
+    _tree(tmp_path)
+    legacy, legacy_calls, t_legacy = _ingest(
+        tmp_path, tmp_path / "legacy.sqlite", 2, monkeypatch
+    )
+    batched, calls, t_batched = _ingest(
+        tmp_path, tmp_path / "batched.sqlite", 256, monkeypatch
+    )
+    chunks = batched["chunks"]
+    print(
+        f"\n[bench] files={N} chunks={chunks} "
+        f"per-file: {len(legacy_calls)} calls {chunks / t_legacy:.0f} chunks/s | "
+        f"batched: {len(calls)} calls {chunks / t_batched:.0f} chunks/s"
+    )
+    assert legacy["chunks"] == chunks and batched["added"] == N
+    assert len(legacy_calls) == N
+    assert len(calls) == -(-batched["embedded"] // 256)
+    assert max(calls) <= 256
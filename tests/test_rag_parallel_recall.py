@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from assistant_api import rag_query
+from assistant_api.ingest import ingest_direct
+from assistant_api.metrics import stage_snapshot
+from assistant_api.rag_query import QueryIn
+
+
+def _seed(tmp_path, monkeypatch) -> list[int]:
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    monkeypatch.setattr(rag_query, "RAG_ENABLE_CACHE", False)
+    monkeypatch.setattr(
+        rag_query, "rerank", lambda q, pairs, topk: [(c, 1.0) for c, _ in pairs][:topk]
+    )
+    ingest_direct(project_id="p", doc_id="d1", text="parallel recall keeps latency low")
+    ingest_direct(project_id="p", doc_id="d2", text="dense vectors and bm25 together")
+    con = rag_query.connect()
+    ids = [r[0] for r in con.execute("SELECT id FROM chunks ORDER BY id")]
+    con.close()
+    return ids
+
+
+def test_branches_run_concurrently(tmp_path, monkeypatch):
+    ids = _seed(tmp_path, monkeypatch)
+
+    def slow(ret):
+        def fn(q, topk=50):
+            time.sleep(0.3)
+            return ret
+
+        return fn
+
+    monkeypatch.setattr(rag_query, "bm25_search", slow(ids[:1]))
+    monkeypatch.setattr(rag_query, "dense_search", slow(ids[1:]))
+    t0 = time.perf_counter()
+    res = asyncio.run(rag_query.retrieve(QueryIn(question="recall", k=5)))
+    assert time.perf_counter() - t0 < 0.55  # not 0.3 + 0.3
+    recall = res["meta"]["recall"]
+    assert recall["bm25"]["status"] == recall["dense"]["status"] == "ok"
+    assert recall["bm25"]["ms"] >= 250 and len(res["matches"]) == 2
+
+
+def test_slow_branch_is_dropped_after_budget(tmp_path, monkeypatch):
+    ids = _seed(tmp_path, monkeypatch)
+
+    def hung(q, topk=50):
+        time.sleep(1.0)
+        return ids
+
+    monkeypatch.setattr(rag_query, "RAG_DENSE_TIMEOUT_MS", 100)
+    monkeypatch.setattr(rag_query, "dense_search", hung)
+    monkeypatch.setattr(rag_query, "bm25_search", lambda q, topk=50: ids[:1])
+    t0 = time.perf_counter()
+    res = asyncio.run(rag_query.retrieve(QueryIn(question="recall", k=5)))
+    assert time.perf_counter() - t0 < 0.6
+    recall = res["meta"]["recall"]
+    assert recall["dense"]["status"] == "timeout" and recall["dense"]["hits"] == 0
+    assert recall["bm25"] == {**recall["bm25"], "status": "ok", "hits": 1}
+    assert len(res["matches"]) == 1  # only the bm25 chunk
+    snap = stage_snapshot()
+    assert snap["recall_dense"]["last_backend"] == "timeout"
+    assert snap["recall_dense"]["timeouts"] >= 1
+    assert snap["recall_bm25"]["last_backend"] == "ok"
@@ -36,3 +36,44 @@ def test_route_query_chitchat(monkeypatch):
     monkeypatch.setenv("FAQ_PATH", str((pytest.Path.cwd() / "nonexistent.json") if hasattr(pytest, 'Path') else "nonexistent.json"))
     r = route_query("How's your day?")
     assert r.route in ("chitchat", "rag", "faq")
+
+
+def test_faq_matrix_cached_and_persisted(tmp_path, monkeypatch):
+    import numpy as np
+
+    from assistant_api import faq
+
+    p = tmp_path / "faq.json"
+    p.write_text(json.dumps([
+        {"q": "alpha", "a": "A"},
+        {"q": "beta", "a": "B", "project_id": "core"},
+        {"q": "gamma", "a": "G"},
+    ]), encoding="utf-8")
+    monkeypatch.setenv("FAQ_PATH", str(p))
+    vocab = {"alpha": [1, 0, 0], "beta": [0, 1, 0], "gamma": [0, 0, 1]}
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(list(texts))
+        return np.array([vocab.get(t, [0.1, 0.9, 0.2]) for t in texts], dtype="float32")
+
+    monkeypatch.setattr(faq, "embed_texts_local_first", fake_embed)
+    faq._cache["ready"] = False
+
+    hits = faq.faq_search_topk("beta-ish", k=2)
+    assert [h.a for h in hits] == ["B", "G"]
+    faq.faq_search_best("alpha")
+    # FAQ questions embedded once; afterwards only the query is embedded
+    assert calls[0] == ["alpha", "beta", "gamma"]
+    assert all(len(c) == 1 for c in calls[1:])
+    assert list(tmp_path.glob("faq.emb-*.npy"))
+    n = len(calls)
+    faq.faq_search_best("alpha")  # router + chat branch: query vector memoized
+    assert len(calls) == n
+
+    # Fresh process (cache cleared) warms from the .npy sidecar
+    faq._cache["ready"] = False
+    calls.clear()
+    assert faq.faq_search_best("gamma").a == "G"
+    assert calls == [["gamma"]]
+    faq._cache["ready"] = False
@@ -16,3 +16,25 @@ def test_snippet_marks(tmp_path, monkeypatch):
     # Prefer hits list (fusion path)
     hits = body.get("hits", [])
     assert any("<mark>" in (h.get("snippet") or "") for h in hits)
+
+
+def test_page_snippets_single_query(tmp_path, monkeypatch):
+    from assistant_api.rag_query import _build_snippets
+
+    monkeypatch.setenv("RAG_DB", str(tmp_path / "rag.sqlite"))
+    con = get_conn()
+    with con:
+        con.executemany(
+            "INSERT INTO chunks(content, text, project_id, doc_id, ordinal) VALUES (?,?,?,?,?)",
+            [(f"ledger row {i}", f"ledger row {i}", "demo", "x", i) for i in range(100)]
+            + [("unrelated text", "unrelated text", "demo", "y", 0)],
+        )
+    items = [(int(r[0]), r[1]) for r in con.execute("SELECT id, text FROM chunks")]
+    statements = []
+    con.set_trace_callback(statements.append)
+    snips = _build_snippets(con, items, "ledger")
+    # Ignore FTS5-internal statements (traced with a leading "--")
+    assert len([s for s in statements if not s.startswith("--")]) == 1
+    assert len(snips) == 101
+    assert all("<mark>" in snips[cid] for cid, txt in items if "ledger" in txt)
+    assert snips[items[-1][0]] == "unrelated text"
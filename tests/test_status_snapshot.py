@@ -0,0 +1,140 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from assistant_api import status_common
+from assistant_api.main import app
+from assistant_api.status_common import StatusAggregator
+
+
+def _fake_probes(monkeypatch, calls):
+    async def ready(client, base):
+        calls.append("ready")
+        return True
+
+    async def llm(client, base):
+        calls.append("llm")
+        return {
+            "status": {"ollama": "up", "primary_model_present": True},
+            "primary_model": "m",
+        }
+
+    async def rag(client, base):
+        calls.append("rag")
+        return {"ok": True, "mode": "local-model", "http_error": None}
+
+    monkeypatch.setitem(status_common.PROBES, "ready", ready)
+    monkeypatch.setitem(status_common.PROBES, "llm", llm)
+    monkeypatch.setitem(status_common.PROBES, "rag", rag)
+
+
+def test_background_snapshot_and_staleness(monkeypatch):
+    calls: list[str] = []
+    _fake_probes(monkeypatch, calls)
+    clock = [100.0]
+    monkeypatch.setattr(status_common.time, "monotonic", lambda: clock[0])
+    agg = StatusAggregator({"ready": (5, 30), "llm": (10, 60), "rag": (30, 120)})
+
+    async def scenario():
+        await agg.refresh("http://x")
+        agg.running = True
+        calls.clear()
+
+        clock[0] += 20  # within every threshold: served from the snapshot
+        doc = await agg.get("http://x")
+        assert calls == [] and doc["ready"] is True
+        snap = doc["snapshot"]
+        assert snap["source"] == "background" and snap["refreshed"] == []
+        assert snap["probes"]["ready"]["age_s"] == 20 and snap["age_s"] == 20
+
+        clock[0] += 20  # ready is now stale (40 > 30): only it is re-run
+        doc = await agg.get("http://x")
+        assert calls == ["ready"] and doc["snapshot"]["refreshed"] == ["ready"]
+        assert doc["snapshot"]["probes"]["llm"]["age_s"] == 40
+
+        calls.clear()
+        doc = await agg.get("http://x", fresh=True)
+        assert sorted(calls) == ["llm", "rag", "ready"]
+        assert doc["snapshot"]["age_s"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_refreshes_share_one_probe_run(monkeypatch):
+    calls: list[str] = []
+    _fake_probes(monkeypatch, calls)
+    gate = asyncio.Event()
+    fast_ready = status_common.PROBES["ready"]
+
+    async def slow_ready(client, base):
+        await gate.wait()
+        return await fast_ready(client, base)
+
+    monkeypatch.setitem(status_common.PROBES, "ready", slow_ready)
+    agg = StatusAggregator({"ready": (5, 30), "llm": (10, 60), "rag": (30, 120)})
+
+    async def scenario():
+        gets = [asyncio.create_task(agg.get("http://x", fresh=True)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        gate.set()
+        docs = await asyncio.gather(*gets)
+        assert all(d["ready"] is True for d in docs)
+
+    asyncio.run(scenario())
+    assert sorted(calls) == ["llm", "rag", "ready"]
+
+
+def test_shared_probe_survives_the_caller_that_started_it(monkeypatch):
+    calls: list[str] = []
+    _fake_probes(monkeypatch, calls)
+    gate = asyncio.Event()
+
+    async def slow_ready(client, base):
+        await gate.wait()
+        if client.is_closed:
+            raise RuntimeError("client has been closed")
+        return True
+
+    monkeypatch.setitem(status_common.PROBES, "ready", slow_ready)
+    agg = StatusAggregator({"ready": (5, 30), "llm": (10, 60), "rag": (30, 120)})
+
+    async def scenario():
+        first = asyncio.create_task(agg.get("http://x", fresh=True))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(agg.get("http://x", fresh=True))
+        await asyncio.sleep(0.01)
+        first.cancel()  # e.g. a ?fresh=1 client disconnecting
+        await asyncio.gather(first, return_exceptions=True)
+        gate.set()
+        doc = await second
+        assert doc["ready"] is True
+        assert "error" not in doc["snapshot"]["probes"]["ready"]
+
+    asyncio.run(scenario())
+
+
+def test_run_loop_refreshes_on_schedule(monkeypatch):
+    calls: list[str] = []
+    _fake_probes(monkeypatch, calls)
+    agg = StatusAggregator({"ready": (0, 30), "llm": (60, 60), "rag": (60, 120)})
+
+    async def scenario():
+        stopper = asyncio.Event()
+        task = asyncio.create_task(agg.run("http://x", stopper))
+        await asyncio.sleep(0.7)  # loop sleeps >= 0.5s between passes
+        assert agg.running
+        stopper.set()
+        await task
+
+    asyncio.run(scenario())
+    assert not agg.running
+    assert calls.count("ready") >= 2 and calls.count("llm") == 1
+
+
+def test_status_summary_reports_snapshot(monkeypatch):
+    _fake_probes(monkeypatch, [])
+    monkeypatch.setattr(status_common.aggregator, "running", False)
+    body = TestClient(app).get("/api/status/summary?fresh=1").json()
+    assert body["ready"] is True and body["llm"]["path"] == "primary"
+    assert body["snapshot"]["source"] == "on-demand"
+    assert set(body["snapshot"]["probes"]) == {"ready", "llm", "rag"}
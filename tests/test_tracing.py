@@ -0,0 +1,65 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from assistant_api import tracing
+
+
+def test_spans_nest_across_awaits_and_tasks():
+    async def branch(name):
+        with tracing.span(name):
+            await asyncio.sleep(0)
+
+    async def handler():
+        tr = tracing.start("/unit", force=True)
+        with tracing.span("outer"):
+            await asyncio.gather(branch("a"), branch("b"))
+        try:
+            with tracing.span("boom"):
+                raise ValueError("x")
+        except ValueError:
+            pass
+        return tr, tracing.finish(tr, status=200)
+
+    tr, timing = asyncio.run(handler())
+    spans = {s["name"]: s for s in tr.to_dict()["spans"]}
+    assert spans["a"]["parent"] == spans["b"]["parent"] == spans["outer"]["id"]
+    assert spans["outer"]["parent"] == 0 and spans["boom"]["error"] == "ValueError"
+    assert timing.startswith("outer;dur=") and "total;dur=" in timing
+    assert "a;dur" not in timing  # only top-level stages in the header
+    assert tracing.recent(limit=1)[0]["attrs"] == {"status": 200}
+
+
+def test_span_is_noop_without_trace():
+    with tracing.span("idle") as sp:
+        assert sp is None
+
+
+def test_chat_emits_server_timing_and_recent_trace(monkeypatch):
+    from assistant_api import main
+
+    async def fake_generate(q):
+        return "Hello there. Want the case study?", "primary"
+
+    async def fake_fetch(q, k=5):
+        return []
+
+    monkeypatch.delenv("DEV_ALLOW_NO_LLM", raising=False)
+    monkeypatch.setattr(main, "generate_brief_answer", fake_generate)
+    monkeypatch.setattr(main, "fetch_context", fake_fetch)
+    monkeypatch.setattr(main, "route_query", lambda q: None)
+    client = TestClient(main.app)
+    body = {"messages": [{"role": "user", "content": "hi"}]}
+
+    r = client.post("/chat", json=body)
+    timing = r.headers["server-timing"]
+    for stage in ("guardrails", "route", "retrieve", "generate", "total"):
+        assert f"{stage};dur=" in timing
+    items = client.get("/api/trace/recent", params={"name": "/chat"}).json()["items"]
+    assert items[0]["id"] == r.headers["x-trace-id"]
+    assert items[0]["attrs"]["route"] == "chitchat"
+
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    assert "server-timing" not in client.post("/chat", json=body).headers
+    forced = client.post("/chat", json=body, headers={"x-trace": "1"})
+    assert "generate;dur=" in forced.headers["server-timing"]